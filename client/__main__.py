@@ -22,8 +22,10 @@ except sound.SoundEnvironmentError as e:
     fatal(str(e))
 
 import core.logger as logger
+from core import trace
 from client.client import Client
 from core.config import Config
+from core.network.protocol import PROTOCOLS, PROTOCOL_VERSION, CODEC_BINARY, CODECS
 from client.interface import run_client, set_simulation_mode
 
 
@@ -39,14 +41,24 @@ if __name__ == "__main__":
     parser.add_argument("-n", "--no-cookie", action="store_true", default=False, help="disable cookies")
     parser.add_argument("-s", "--simulate", action="store_true", default=False,
                         help="simulation mode: auto play/skip without user input")
+    parser.add_argument("--protocol", type=int, choices=PROTOCOLS, default=PROTOCOL_VERSION,
+                        help="highest protocol version to request, 1 = legacy without handshake (default: %(default)s)")
+    parser.add_argument("--codec", choices=CODECS, default=CODEC_BINARY,
+                        help="wire encoding requested at handshake (default: %(default)s)")
+    parser.add_argument("--trace", choices=sorted(trace.LEVEL_NAMES), default="off",
+                        help="trace rule validation / auto play (default: %(default)s)")
+    parser.add_argument("--trace-sample", type=float, default=1.0,
+                        help="fraction of traced calls to log (default: %(default)s)")
     args = parser.parse_args()
 
     logger.init_logger()
+    trace.set_trace_level(args.trace)
+    trace.set_trace_sample_rate(args.trace_sample)
     register_signal_handler(ctrl_c_handler)
     if args.simulate:
         set_simulation_mode(True)
 
-    client = Client(args.no_cookie)
+    client = Client(args.no_cookie, args.protocol, args.codec)
     if args.ip is None or args.port is None or args.user_name is None:
         client.load_config()
     else:
@@ -12,10 +12,15 @@ import core.logger as logger
 from client.terminal_utils import user_confirm, error, success, fatal
 from client.card_utils import last_played
 from client.playing_handler import playing
-from core.network.my_network import send_data_to_socket, recv_data_from_socket
+from core.network.my_network import send_data_to_socket, recv_data_from_socket, set_socket_codec
+from core.network.protocol import (
+    PROTOCOL_VERSION, PROTOCOL_PLAY_ONLY, PROTOCOL_ROUND_FRAME, PROTOCOL_LEGACY, CODEC_BINARY, apply_round_frame, make_hello,
+)
 from client.interface import main_interface, game_over_interface, waiting_hall_interface
 from core.config import Config, CONFIG_NAME
 from core.card import Card
+from core.hand import Hand
+from core.playingrules import PlayInfo, classify_play
 
 ASCII_ART = '''
     __    _              ___          ______                 
@@ -28,12 +33,12 @@ ASCII_ART = '''
 
 
 class Client:
-    def __init__(self, no_cookie: bool):
+    def __init__(self, no_cookie: bool, protocol: int = PROTOCOL_VERSION, codec: str = CODEC_BINARY):
         self.client             : socket           = socket.socket(socket.AF_INET, socket.SOCK_STREAM) # 连接到服务端
         self.config             : Config           = None                   # 客户端配置文件
         self.no_cookie          : bool             = no_cookie              # 禁用cookie恢复
         self.client_player      : int              = 0                      # 客户端用户标识，是所处位置吗？
-        self.client_cards       : list[Card]       = []                     # 持有牌
+        self.client_cards       : Hand             = Hand()                 # 持有牌
         self.users_cards        : list[list[Card]] = [[] for _ in range(6)] # 所有用户的牌，用于最后游戏结束时展现寻找战犯
         self.is_player          : bool             = False                  # 玩家/旁观者
         self.users_name         : list[str]        = ["" for _ in range(6)] # 用户名字，按照出牌顺序排序
@@ -47,7 +52,11 @@ class Client:
         self.his_now_score      : int              = 0                      # 历史场上分数，用于判断是否发生了得分
         self.his_last_player    : int              = None                   # 历史上一个打牌的人，用于判断是否上次发生打牌事件
         self.is_start           : bool             = False                  # 记录是否游戏还在开局, False代表游戏尚未开始
+        self.last_play          : PlayInfo         = None                   # 上一出牌玩家所出牌的牌型与牌力，每轮只判断一次
         self.logger             : logging.Logger   = None                   # 日志 01/05/2025: 每个用户都使用自己的looger
+        self.protocol           : int              = protocol               # 协议版本，握手后为双方协商结果
+        self.codec              : str              = codec                  # 希望使用的编码，握手后为协商结果
+        self.round_info         : dict             = None                   # 服务端最近一次的完整轮次信息，增量帧在此基础上更新
 
     # 记录日志
     def take_log(self, last_player):
@@ -187,6 +196,14 @@ class Client:
     # 11/03/2024: 把网络相关代码移动到MyNetwork.py中了
 
     def send_user_info(self):
+        # 协议握手，旧版协议不发送握手
+        if self.protocol > PROTOCOL_LEGACY:
+            send_data_to_socket(make_hello(self.protocol, self.codec), self.client)
+            reply = recv_data_from_socket(self.client)
+            self.protocol, self.codec = reply["protocol"], reply["codec"]
+            set_socket_codec(self.client, self.codec) # 握手之后按协商的编码收发
+            logger.info(f"protocol: {reply}")
+
         # 发送本地的cookie信息
         logger.info(f"Client coockie {self.config.cookie}")
         if self.no_cookie:
@@ -232,20 +249,38 @@ class Client:
 
     # 接收场上信息
     def recv_round_info(self):
+        if self.protocol >= PROTOCOL_ROUND_FRAME:
+            round_info = apply_round_frame(self.round_info, recv_data_from_socket(self.client))
+            self.round_info = round_info
+            self.game_over = round_info["game_over"]
+            self.users_score = round_info["users_score"]
+            self.users_cards_num = round_info["users_cards_num"]
+            self.users_played_cards = list(round_info["users_played_cards"]) # 本地出牌时会修改
+            if self.game_over != 0:
+                self.users_cards = round_info["users_cards"]
+            self.client_cards = Hand(round_info["client_cards"])
+            self.now_score = round_info["now_score"]
+            self.now_player = round_info["now_player"]
+            self.head_master = round_info["head_master"]
+            return
+
         self.game_over = recv_data_from_socket(self.client)
         self.users_score = recv_data_from_socket(self.client)
         self.users_cards_num = recv_data_from_socket(self.client)
         self.users_played_cards = recv_data_from_socket(self.client)
         if self.game_over != 0:
             self.users_cards = recv_data_from_socket(self.client)
-        self.client_cards = recv_data_from_socket(self.client)
+        self.client_cards = Hand(recv_data_from_socket(self.client))
         self.now_score = recv_data_from_socket(self.client)
         self.now_player = recv_data_from_socket(self.client)
         self.head_master = recv_data_from_socket(self.client)
 
     # 向server发送打出牌或skip的信息
     def send_player_info(self):
-        send_data_to_socket(self.client_cards, self.client) # 发送用户手牌
+        if self.protocol >= PROTOCOL_PLAY_ONLY: # 手牌与分数由服务端计算
+            send_data_to_socket(self.users_played_cards[self.client_player], self.client)
+            return
+        send_data_to_socket(self.client_cards.to_list(), self.client) # 发送用户手牌
         send_data_to_socket(self.users_played_cards[self.client_player], self.client) # 发送自己出的牌
         send_data_to_socket(self.now_score, self.client) # 发送场上分数
 
@@ -291,6 +326,9 @@ class Client:
             # 要不然会触发出牌的效果音(如果历史中最后打牌的人与当前判断最后打牌的人一致视为过牌，否则视为打牌)
             if last_player == self.now_player and last_player != self.his_last_player:
                 self.his_last_player = last_player
+            # 本轮需要压过的出牌只判断一次，界面音效、出牌校验与托管共用
+            self.last_play = None if last_player == self.now_player \
+                else classify_play(self.users_played_cards[last_player])
 
             # 用户界面
             main_interface(
@@ -302,7 +340,8 @@ class Client:
                 # 运行时数据
                 self.now_score, self.now_player, last_player,
                 # 历史数据
-                self.his_now_score, self.his_last_player
+                self.his_now_score, self.his_last_player,
+                last_play=self.last_play,
             )
             self.take_log(last_player)
 
@@ -328,7 +367,8 @@ class Client:
                         last_player,
                         self.client_player,
                         self.users_played_cards,
-                        self
+                        self,
+                        self.last_play,
                     )
                     self.logger.info(f"New played cards: {new_played_cards}")
                     if new_played_cards != ['F']:
@@ -345,8 +385,4 @@ class Client:
                 self.handle_connection_error(player_playing_cards, "在游戏时与服务器链接失效(用户打牌)")
 
     def remove_cards(self, cards: list[Card]):
-        for card in cards:
-            for i in range(len(self.client_cards)):
-                if self.client_cards[i] == card:
-                    self.client_cards.pop(i) # 更新剩余手牌
-                    break
+        self.client_cards.remove_cards(cards) # 更新剩余手牌
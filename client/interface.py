@@ -2,7 +2,7 @@
 客户端用户接口抽象层：通过消息传递机制通知 UI 更新，不直接依赖 CLI 实现。
 """
 from core.sound import playsound, playsounds
-from core.playingrules import judge_and_transform_cards, CardType
+from core.playingrules import CardType, PlayInfo
 from core.card import Card
 from core.FieldInfo import FieldInfo
 from client.terminal_utils import disable_echo, enable_echo
@@ -54,14 +54,14 @@ def main_interface(
     is_start, is_player, client_cards, client_player: int,
     users_name, users_score, users_cards_num, users_cards,
     users_played_cards, head_master, now_score, now_player, last_player,
-    his_now_score, his_last_player,
+    his_now_score, his_last_player, last_play: PlayInfo = None,
 ) -> None:
-    """通知 UI 更新牌局信息。"""
+    """通知 UI 更新牌局信息。last_play 为本轮已判断好的上家出牌，避免重复判断牌型。"""
     field_info = FieldInfo(
         is_start, is_player, client_player, client_cards,
         users_name, users_score, users_cards_num, users_cards,
         users_played_cards, head_master, now_score, now_player,
-        last_player, his_now_score, his_last_player,
+        last_player, his_now_score, his_last_player, last_play,
     )
 
     if _ui_handler and hasattr(_ui_handler, "on_field_info"):
@@ -73,7 +73,7 @@ def main_interface(
         now_player=now_player,
         his_last_player=his_last_player,
         his_now_score=his_now_score,
-        users_played_cards=users_played_cards,
+        last_play=last_play,
     )
 
 
@@ -83,7 +83,7 @@ def _play_sound(
     now_player: int,
     his_last_player: int,
     his_now_score: int,
-    users_played_cards: list,
+    last_play: PlayInfo,
 ):
     # 在模拟模式下默认不播放任何音效，避免占用系统资源
     if is_simulation_mode():
@@ -95,24 +95,21 @@ def _play_sound(
     elif last_player == his_last_player:
         playsound("pass", True, None)
     else:
-        last_played_cards = [c.value for c in users_played_cards[last_player]]
-        last_played_cards.sort(reverse=True)
-        (cardtype, _) = judge_and_transform_cards(last_played_cards)
-        assert cardtype != CardType.illegal_type, (last_player, last_played_cards)
+        assert last_play is not None and last_play.card_type != CardType.illegal_type, (last_player, last_play)
         bombs = [
             CardType.black_joker_bomb,
             CardType.red_joker_bomb,
             CardType.normal_bomb,
         ]
-        if cardtype in bombs:
-            if len(last_played_cards) >= 7:
+        if last_play.card_type in bombs:
+            if last_play.length >= 7:
                 playsound("bomb3", True, None)
-            elif len(last_played_cards) >= 5:
+            elif last_play.length >= 5:
                 playsound("bomb2", True, None)
             else:
                 playsound("bomb1", True, None)
         else:
-            if len(last_played_cards) >= 5:
+            if last_play.length >= 5:
                 playsound("throw2", True, None)
             else:
                 playsound("throw1", True, None)
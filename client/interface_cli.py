@@ -110,10 +110,13 @@ def _gen_score_chapter(now_score: int, client_player: int, users_score) -> Chapt
 
 def _gen_cards_string(cards) -> str:
     string = ""
-    for i in range(len(cards)):
-        if i != 0 and cards[i].get_cli_str() != cards[i - 1].get_cli_str():
+    prev = None
+    for card in cards:
+        cli_str = card.get_cli_str()
+        if prev is not None and cli_str != prev:
             string += " "
-        string += cards[i].get_cli_str()
+        string += cli_str
+        prev = cli_str
     return string
 
 
@@ -6,7 +6,7 @@ from logging import Logger
 from client.card_utils import str_to_int, get_card_count, strs_to_ints, calculate_score, draw_cards
 from client.terminal_utils import fatal
 from enum import Enum, auto
-from core.playingrules import validate_user_input
+from core.playingrules import validate_user_input, PlayInfo
 from client.terminal_printer import *
 from core import sound
 from core.card import Card
@@ -248,7 +248,11 @@ def get_legal_user_input_from_cli(
     client_id     : int,        # 客户端正在输入的玩家
     users_played_cards: list[Card], # 场上所有牌信息
     tcp_handler,              # 客户端句柄，用于检测远端是否关闭了
+    last_play: PlayInfo = None, # 已判断好的上家出牌，为空时从场上牌判断
 ) -> tuple[list[Card], int]:
+    last_played = users_played_cards[last_player] if last_player != client_id else None
+    if last_played is not None and last_play is not None:
+        last_played = last_play
     while True:
         user_input = read_userinput(client_cards)
         # 11/03/2024: 支持Card类
@@ -259,7 +263,7 @@ def get_legal_user_input_from_cli(
         legal_input, new_score = validate_user_input(
             strs_to_ints(user_input),
             client_cards,
-            users_played_cards[last_player] if last_player != client_id else None
+            last_played
         )
         if not legal_input:
             tcp_handler.logger.info(f"illegal input: {user_input}")
@@ -274,6 +278,7 @@ def _get_simulated_play(
     last_player: int,
     client_player: int,
     users_played_cards: list,
+    last_play: PlayInfo = None,
 ) -> tuple[list[Card] | list[str], int]:
     """模拟模式下由 auto_select_cards 自动选择出牌。"""
     from core.auto_play.strategy import auto_select_cards
@@ -298,6 +303,7 @@ def _get_simulated_play(
         last_player=last_player,
         his_now_score=0,
         his_last_player=None,
+        last_play=last_play,
     )
     selected = auto_select_cards(info)
     if selected is None:
@@ -312,6 +318,7 @@ def playing(
     client_player     : int,        # 客户端正在输入的玩家
     users_played_cards: list[Card], # 场上所有牌信息
     tcp_handler,                    # 客户端句柄，用于检测远端是否关闭了
+    last_play: PlayInfo = None,     # 已判断好的上家出牌
 ) -> tuple[list[Card], int]:
     tcp_handler.logger.info("playing")
     tcp_handler.logger.info(f"last played: {users_played_cards[last_player] if last_player != client_player else None}")
@@ -320,7 +327,7 @@ def playing(
 
     if is_simulation_mode():
         new_played_cards, new_score = _get_simulated_play(
-            client_cards, last_player, client_player, users_played_cards
+            client_cards, last_player, client_player, users_played_cards, last_play
         )
         if new_played_cards == ["F"]:
             pass  # 已是正确格式
@@ -339,7 +346,7 @@ def playing(
     g_terminal_handler = PlayingTerminalHandler()
 
     print('请输入要出的手牌(\'F\'表示跳过):')
-    user_input, new_score = get_legal_user_input_from_cli(client_cards, last_player, client_player, users_played_cards, tcp_handler)
+    user_input, new_score = get_legal_user_input_from_cli(client_cards, last_player, client_player, users_played_cards, tcp_handler, last_play)
     if user_input == ['F']:
         new_played_cards = ['F']
     else:
@@ -1,6 +1,7 @@
 """牌面与字符串/序列化、分数与队伍计算等纯逻辑。供 server 与 client 共用。"""
 
 from core.card import Card
+from core.hand import Hand
 
 
 def str_to_int(c: str = "") -> int:
@@ -75,8 +76,10 @@ def cards_to_strs(cards: list[Card] | None):
     return [str(c) for c in cards]
 
 
-def draw_cards(cards: list[Card], targets: list[str]) -> list[Card]:
-    """双指针遍历 cards 和 targets，找到 value 与 targets 中 int 值相同的 card。"""
+def draw_cards(cards: list[Card] | Hand, targets: list[str]) -> list[Card]:
+    """双指针遍历 cards 和 targets，找到 value 与 targets 中 int 值相同的 card。Hand 直接按点数分桶选取。"""
+    if isinstance(cards, Hand):
+        return cards.draw(str_to_int(t) for t in targets)
     result = []
     i, j = 0, 0
     while i < len(cards) and j < len(targets):
@@ -99,8 +102,10 @@ def calculate_score(cards: list[Card]) -> int:
     return score
 
 
-def get_card_count(client_cards: list[Card], card: str) -> int:
+def get_card_count(client_cards: list[Card] | Hand, card: str) -> int:
     """统计某一牌面在手牌中的数量。"""
+    if isinstance(client_cards, Hand):
+        return client_cards.count(str_to_int(card))
     result = 0
     for c in client_cards:
         if c.get_cli_str() == card:
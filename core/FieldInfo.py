@@ -1,4 +1,5 @@
 from core.card import Card
+from core.playingrules import PlayInfo
 
 class FieldInfo:
     def __init__(
@@ -22,6 +23,7 @@ class FieldInfo:
         last_player       : int,              # 上一出牌的玩家
         his_now_score     : int,              # 历史场上分数
         his_last_player   : int,              # 历史上一出牌的玩家
+        last_play         : PlayInfo = None,  # 上一出牌玩家所出牌的牌型与牌力，每轮只判断一次
     ):
         self.start_flag = start_flag
         self.is_player = is_player
@@ -37,4 +39,5 @@ class FieldInfo:
         self.now_player = now_player
         self.last_player = last_player
         self.his_now_score = his_now_score
-        self.his_last_player = his_last_player
\ No newline at end of file
+        self.his_last_player = his_last_player
+        self.last_play = last_play
\ No newline at end of file
@@ -2,7 +2,27 @@ from typing import List, Dict, Iterable, Optional
 
 from core.card import Card
 from core.FieldInfo import FieldInfo
-from core import playingrules
+from core.hand import Hand
+from core.packed_hand import PackedHand
+from core import playingrules, trace
+
+# 跟牌快速路径：只运行可能压过上家的生成器，关闭后依次尝试全部生成器（用于对比）
+_fast_follow_enabled = True
+
+_BOMB_TYPES = (
+    playingrules.CardType.normal_bomb,
+    playingrules.CardType.black_joker_bomb,
+    playingrules.CardType.red_joker_bomb,
+)
+
+
+def set_fast_follow_enabled(enabled: bool) -> None:
+    global _fast_follow_enabled
+    _fast_follow_enabled = enabled
+
+
+def is_fast_follow_enabled() -> bool:
+    return _fast_follow_enabled
 
 
 def _group_by_value(cards: List[Card]) -> Dict[int, List[Card]]:
@@ -135,6 +155,61 @@ def _generate_bombs(by_value: Dict[int, List[Card]], values_sorted: List[int]) -
             yield by_value[v][:4]
 
 
+def _all_generators(by_value: Dict[int, List[Card]], values_sorted: List[int]) -> list:
+    return [
+        lambda: _generate_singles(by_value, values_sorted),
+        lambda: _generate_pairs(by_value, values_sorted),
+        lambda: _generate_triples(by_value, values_sorted),
+        lambda: _generate_straights(by_value),
+        lambda: _generate_straight_pairs(by_value),
+        lambda: _generate_straight_triples(by_value),
+        lambda: _generate_triple_pairs(by_value, values_sorted),
+        lambda: _generate_flights(by_value, values_sorted),
+        lambda: _generate_bombs(by_value, values_sorted),
+    ]
+
+
+def _may_be_bomb(combo: List[Card]) -> bool:
+    """至少 4 张且只含一种普通点数（其余为大小王），如三带二生成器给出的 AAA + 大小王对。"""
+    return len(combo) >= 4 and len({c.value for c in combo if c.value <= 15}) <= 1
+
+
+def _follow_generators(
+    by_value: Dict[int, List[Card]],
+    values_sorted: List[int],
+    last_play: playingrules.PlayInfo,
+) -> list:
+    """跟牌时的生成器：非炸弹之间只比较张数与关键牌，因此只保留张数相同的候选
+    （单张、对子、三张还要求点数大于关键牌）以及可能成为炸弹的候选。
+    顺序与完整路径一致，选出的牌也一致。"""
+    n = None if last_play.card_type in _BOMB_TYPES else last_play.length
+
+    def keep(combos: Iterable[List[Card]]) -> Iterable[List[Card]]:
+        return (c for c in combos if len(c) == n or _may_be_bomb(c))
+
+    generators = []
+    if n is not None:
+        above = [v for v in values_sorted if v > last_play.key_card]
+        if n == 1:
+            generators.append(lambda: _generate_singles(by_value, above))
+        elif n == 2:
+            generators.append(lambda: _generate_pairs(by_value, above))
+        elif n == 3:
+            generators.append(lambda: _generate_triples(by_value, above))
+        if n == 5:
+            generators.append(lambda: keep(_generate_straights(by_value)))
+        if n >= 4 and n % 2 == 0:
+            generators.append(lambda: keep(_generate_straight_pairs(by_value)))
+        if n >= 6 and n % 3 == 0:
+            generators.append(lambda: keep(_generate_straight_triples(by_value)))
+    # 三带二可能用大小王对凑成炸弹（AAA00），张数不同也要保留
+    generators.append(lambda: keep(_generate_triple_pairs(by_value, values_sorted)))
+    if n is not None and n >= 10 and n % 5 == 0:
+        generators.append(lambda: keep(_generate_flights(by_value, values_sorted)))
+    generators.append(lambda: _generate_bombs(by_value, values_sorted))
+    return generators
+
+
 def auto_select_cards(info: FieldInfo) -> Optional[List[Card]]:
     """根据当前手牌和场面，生成一手“尽量小但可出的牌”。
 
@@ -149,11 +224,16 @@ def auto_select_cards(info: FieldInfo) -> Optional[List[Card]]:
     - 飞机（简单组合：连三张 + 若干对子，不考虑大小王凑牌）
     - 炸弹（最后再考虑，避免轻易浪费炸弹）
     """
-    hand = list(info.client_cards)
-    if not hand:
+    if not info.client_cards:
         return None
 
-    by_value = _group_by_value(hand)
+    # Hand 已按点数分桶并维护了计数，直接复用
+    if isinstance(info.client_cards, Hand):
+        by_value = info.client_cards.by_value()
+        packed_hand = info.client_cards.packed
+    else:
+        by_value = _group_by_value(info.client_cards)
+        packed_hand = PackedHand.from_cards(info.client_cards)
     values_sorted = sorted(by_value.keys())
 
     last_played = (
@@ -161,25 +241,30 @@ def auto_select_cards(info: FieldInfo) -> Optional[List[Card]]:
         if info.last_player != info.client_id
         else None
     )
-
-    generators = [
-        lambda: _generate_singles(by_value, values_sorted),
-        lambda: _generate_pairs(by_value, values_sorted),
-        lambda: _generate_triples(by_value, values_sorted),
-        lambda: _generate_straights(by_value),
-        lambda: _generate_straight_pairs(by_value),
-        lambda: _generate_straight_triples(by_value),
-        lambda: _generate_triple_pairs(by_value, values_sorted),
-        lambda: _generate_flights(by_value, values_sorted),
-        lambda: _generate_bombs(by_value, values_sorted),
-    ]
-
+    # 手牌只压缩一次、上家出牌只判断一次（场面已缓存时直接复用），避免每个候选都重新统计
+    if last_played is None:
+        last_play = None
+    elif info.last_play is not None:
+        last_play = info.last_play
+    else:
+        last_play = playingrules.classify_play(last_played)
+
+    if _fast_follow_enabled and last_play is not None and \
+            last_play.card_type is not playingrules.CardType.illegal_type:
+        generators = _follow_generators(by_value, values_sorted, last_play)
+    else:
+        generators = _all_generators(by_value, values_sorted)
+
+    # 每个生成器的候选一次性批量校验，上家出牌只判断一次
     for gen in generators:
-        for combo in gen():
-            if playingrules.validate_user_selected_cards(
-                combo, info.client_cards, last_played
-            ):
+        combos = list(gen())
+        verdicts = playingrules.validate_many(combos, packed_hand, last_play)
+        for combo, (legal, _) in zip(combos, verdicts):
+            if legal:
+                trace.trace("auto_select_cards", "last=%s choice=%s", last_play, trace.lazy_values(combo),
+                            level=trace.INFO)
                 return combo
 
+    trace.trace("auto_select_cards", "last=%s pass", last_play, level=trace.INFO)
     return None
 
@@ -1,3 +1,4 @@
+import random
 from enum import Enum
 
 class Suits(Enum): # 花色
@@ -7,11 +8,37 @@ class Suits(Enum): # 花色
     diamond = "Diamond" # 方块
     empty   = "" # 空，大小王没有花色
 
+# 享元：同一花色与牌面的 Card 全局只有一个实例，构造时直接返回已驻留的对象。
+# 每张牌有固定的小整数 id：四种花色的 3~2 为 (value - 3) * 4 + 花色序号（0~51），小王 52，大王 53，
+# 其余花色与牌面的组合（如无花色的普通牌）排在 54 之后，只为兼容而保留。
+# Card 实例不可修改，深拷贝、序列化后仍是同一个对象。
 class Card:
-    # 3~10为数字牌, 11~13为JQK, 14为2, 15为小王, 16为大王
-    def __init__(self, suit: Suits, value: int):
-        self.suit  = suit  # 花色
-        self.value = value # 牌面
+    # 3~10为数字牌, 11~13为JQK, 14为A, 15为2, 16为小王, 17为大王
+    __slots__ = ("suit", "value", "id", "_dict")
+
+    def __new__(cls, suit: Suits, value: int):
+        try:
+            return _INTERNED[suit, value]
+        except KeyError:
+            raise ValueError(f"invalid card: {suit}, {value}") from None
+
+    @classmethod
+    def _create(cls, suit: Suits, value: int, card_id: int) -> "Card":
+        card = object.__new__(cls)
+        object.__setattr__(card, "suit", suit)       # 花色
+        object.__setattr__(card, "value", value)     # 牌面
+        object.__setattr__(card, "_dict", {'suit': suit.value, 'value': value}) # to_dict 的模板
+        object.__setattr__(card, "id", card_id)      # 固定编号，最后设置：之后不再允许修改
+        return card
+
+    def __setattr__(self, name, value):
+        # 所有同花色同牌面的牌共用一个实例，修改一张会影响全部
+        if hasattr(self, "id"):
+            raise AttributeError(f"Card is immutable: cannot set {name!r}")
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError(f"Card is immutable: cannot delete {name!r}")
 
     # def __le__(self, other):
     #     if isinstance(other, Card):
@@ -74,19 +101,32 @@ class Card:
     #     if isinstance(other, int):
     #         return self.value + other
     
-    # def __hash__(self):
-    #     return hash((self.suit, self.value))
+    # Card 与 int 按牌面比较相等，哈希也只取牌面以保持一致
+    def __hash__(self):
+        return hash(self.value)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return card_from_id, (self.id,)
     
     def __str__(self):
         return f"{self.suit}_{self.get_cli_str()}"
     
     @classmethod
     def from_dict(cls, card_dict):
-        return cls(Suits(card_dict['suit']), card_dict['value'])
+        try:
+            return _BY_DICT[card_dict['suit'], card_dict['value']]
+        except (KeyError, TypeError): # 不存在的牌，按原逻辑报错
+            return cls(Suits(card_dict['suit']), card_dict['value'])
     
     def to_dict(self):
-        # 返回一个可以被 json.dumps() 序列化的字典
-        return {'suit': self.suit.value, 'value': self.value}
+        # 返回一个可以被 json.dumps() 序列化的字典（副本，修改不影响共享的实例）
+        return dict(self._dict)
     
     # 用于在 CLI 中显示
     def get_cli_str(self):
@@ -109,21 +149,38 @@ class Card:
         else:
             return str(self.value)
 
+_NORMAL_SUITS = [Suits.spade, Suits.heart, Suits.club, Suits.diamond]
+
+# 驻留表：先按编号生成一副牌的 54 张，再补齐其余组合
+CARDS: list[Card] = [] # 下标即 id
+for _value in range(3, 16):
+    for _suit in _NORMAL_SUITS:
+        CARDS.append(Card._create(_suit, _value, len(CARDS)))
+for _value in range(16, 18):
+    CARDS.append(Card._create(Suits.empty, _value, len(CARDS)))
+DECK_SIZE = len(CARDS) # 一副牌 54 张
+for _suit in Suits:
+    for _value in range(3, 18):
+        if not any(c.suit is _suit and c.value == _value for c in CARDS[:DECK_SIZE]):
+            CARDS.append(Card._create(_suit, _value, len(CARDS)))
+_INTERNED = {(c.suit, c.value): c for c in CARDS}
+_BY_DICT = {(c.suit.value, c.value): c for c in CARDS}
+
+
+def card_from_id(card_id: int) -> Card:
+    return CARDS[card_id]
+
+
 def generate_cards() -> list[Card]:
-    cards = []
-
-    for _ in range(4): # 六家统使用四副牌
-        # 洗入普通牌
-        for value in range(3, 16): # 3~15
-            for suit in Suits: # 4种花色
-                if suit == Suits.empty:
-                    continue
-                cards.append(Card(suit, value))
-        
-        # 洗入大小王
-        for value in range(16, 18): # 16~17
-            cards.append(Card(Suits.empty, value))
-    return cards
+    # 六家统使用四副牌，每副按 3~2 各四种花色、再小王大王的顺序排列
+    return CARDS[:DECK_SIZE] * 4
+
+
+def deal_cards(seed: int = None) -> list[list[Card]]:
+    # 洗牌后按 0~5 号座位轮流发牌；同一个 seed 发出的牌相同，牌局日志与回放据此复现发牌
+    all_cards = generate_cards()
+    random.Random(seed).shuffle(all_cards)
+    return [all_cards[i::6] for i in range(6)]
 
 SPADE_10 = Card(Suits.spade, 10)
 HEART_JACK = Card(Suits.heart, 11)
@@ -0,0 +1,86 @@
+"""
+手牌容器：按点数分桶保存 Card，并同步维护 PackedHand 计数。
+
+- 按点数计数为 O(1)（直接读 PackedHand）；
+- 打出 k 张牌只需在对应点数的桶内查找，为 O(k)（单个桶最多 16 张）；
+- 按点数从小到大遍历即为显示顺序，无需重新排序。
+"""
+from collections import Counter
+from itertools import chain
+from typing import Iterable, Iterator
+
+from core.card import Card
+from core.packed_hand import PackedHand, RANK_MAX
+
+
+class Hand:
+    __slots__ = ("_buckets", "packed")
+
+    def __init__(self, cards: Iterable[Card] = ()):
+        self._buckets: list[list[Card]] = [[] for _ in range(RANK_MAX + 1)] # 下标即点数，桶内保持加入顺序
+        self.packed = PackedHand() # 各点数张数，供规则校验直接使用
+        for c in cards:
+            self.add(c)
+
+    def add(self, card: Card) -> None:
+        self.packed.add(card.value)
+        self._buckets[card.value].append(card)
+
+    def count(self, value: int) -> int:
+        return self.packed.count(value)
+
+    def remove_cards(self, cards: Iterable[Card]) -> None:
+        """移除打出的牌（花色与点数都需相同），手牌中不够时抛出 ValueError 且手牌不变。"""
+        cards = list(cards)
+        for card, n in Counter(cards).items():
+            if self._buckets[card.value].count(card) < n:
+                raise ValueError(f"card not in hand: {card}")
+        for card in cards:
+            self._buckets[card.value].remove(card)
+            self.packed.remove(card.value)
+
+    def draw(self, values: Iterable[int]) -> list[Card]:
+        """按点数选出手牌中的牌（不移除），同一点数依次取桶内靠前的牌，不足时抛出 ValueError。"""
+        need: dict[int, int] = {}
+        for v in values:
+            need[v] = need.get(v, 0) + 1
+        result = []
+        for v in sorted(need):
+            if self.count(v) < need[v]:
+                raise ValueError(f"not enough cards of value {v}")
+            result.extend(self._buckets[v][:need[v]])
+        return result
+
+    def take(self, values: Iterable[int]) -> list[Card]:
+        """按点数选出并移除手牌中的牌，返回按点数升序排列的 Card 列表。"""
+        cards = self.draw(values)
+        self.remove_cards(cards)
+        return cards
+
+    def by_value(self) -> dict[int, list[Card]]:
+        """按点数分组（从小到大），返回 {value -> [Card,...]}。"""
+        return {v: list(bucket) for v, bucket in enumerate(self._buckets) if bucket}
+
+    def to_list(self) -> list[Card]:
+        return list(self)
+
+    def __iter__(self) -> Iterator[Card]:
+        return chain.from_iterable(self._buckets)
+
+    def __len__(self) -> int:
+        return self.packed.size
+
+    def __contains__(self, card: Card) -> bool:
+        return card in self._buckets[card.value]
+
+    def __eq__(self, other):
+        if isinstance(other, Hand):
+            return self.to_list() == other.to_list()
+        if isinstance(other, list):
+            return self.to_list() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Hand({[str(c) for c in self]})"
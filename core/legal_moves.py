@@ -0,0 +1,185 @@
+"""
+合法出牌枚举：从手牌中惰性地生成所有不同的合法出牌（含大小王替换）。
+
+每种牌型先列出“点数模板”（每个点数需要几张），再枚举模板中各点数使用多少张真牌、
+其余由大小王补齐，最后交给 playingrules 判断牌型与牌力。按点数签名去重，
+同一签名只会产出一次。给定上家出牌时，只枚举张数相同的牌型与炸弹，
+并跳过关键牌不可能更大的模板。
+"""
+from typing import Iterable, Iterator
+
+from core.card import Card
+from core.packed_hand import PackedHand, pack_values
+from core.playingrules import CardType, PlayInfo, beats, classify_play
+
+BOMB_TYPES = (CardType.normal_bomb, CardType.black_joker_bomb, CardType.red_joker_bomb)
+
+
+# 枚举模板 slots=[(点数, 张数)] 的真牌用量，优先多用真牌，返回 ((点数, 真牌张数), ...)
+def _iter_fills(slots: list[tuple[int, int]], counts: list[int], jokers: int, i: int = 0):
+    if i == len(slots):
+        yield ()
+        return
+    rank, width = slots[i]
+    for used in range(min(counts[rank], width), max(width - jokers, 0) - 1, -1):
+        for rest in _iter_fills(slots, counts, jokers - (width - used), i + 1):
+            yield ((rank, used),) + rest
+
+
+def _classify(values: list[int]) -> PlayInfo:
+    return classify_play(PackedHand.from_values(values))
+
+
+# 各牌型的模板，返回 [(名义关键牌, slots)]，按关键牌从小到大排列
+def _run_templates(width: int, length: int) -> list[tuple[int, list[tuple[int, int]]]]:
+    return [
+        (start + length - 1, [(v, width) for v in range(start, start + length)])
+        for start in range(3, 15 - length + 1)
+    ]
+
+
+def _flight_templates(length: int) -> list[tuple[int, list[tuple[int, int]]]]:
+    templates = []
+    for start in range(3, 15 - length + 1):
+        for pair_start in range(3, 15 - length + 1):
+            widths = {v: 3 for v in range(start, start + length)}
+            for v in range(pair_start, pair_start + length):
+                widths[v] = widths.get(v, 0) + 2
+            templates.append((start + length - 1, sorted(widths.items())))
+    return templates
+
+
+def _non_bomb_templates(card_len: int | None) -> Iterator[tuple[int, list[tuple[int, int]]]]:
+    """按牌型顺序产出非炸弹模板；card_len 不为空时只产出该张数的模板。"""
+    def wanted(n: int) -> bool:
+        return card_len is None or card_len == n
+
+    for width in (1, 2, 3): # 单张、对子、三张
+        if wanted(width):
+            yield from ((v, [(v, width)]) for v in range(3, 16))
+    if wanted(5): # 顺子
+        yield from _run_templates(1, 5)
+    for pairs_num in range(2, 13): # 连对，AA22 为最小的二连对
+        if wanted(pairs_num * 2):
+            if pairs_num == 2:
+                yield 1, [(14, 2), (15, 2)]
+            yield from _run_templates(2, pairs_num)
+    for triples_num in range(2, 13): # 连三张
+        if wanted(triples_num * 3):
+            yield from _run_templates(3, triples_num)
+    if wanted(5): # 三带二
+        for v in range(3, 16):
+            yield from ((v, [(p, 2), (v, 3)] if p < v else [(v, 3), (p, 2)]) for p in range(3, 16) if p != v)
+    for triple_pair_num in range(2, 13): # 飞机
+        if wanted(triple_pair_num * 5):
+            yield from _flight_templates(triple_pair_num)
+
+
+def iter_legal_moves(
+    hand       : Iterable[Card],
+    last_played: list[Card] | PackedHand | PlayInfo = None,
+) -> Iterator[list[Card]]:
+    """
+    惰性产出手牌中所有不同的合法出牌（按点数签名去重），每手牌为按点数升序的 Card 列表。
+
+    产出顺序：单张、对子、三张、顺子、连对、连三张、三带二、飞机、纯大小王组成的牌，
+    最后是按牌力从小到大排列的炸弹；同一牌型内关键牌从小到大，优先使用真牌。
+    last_played 不为空时只产出能压过它的出牌。
+    """
+    by_value: dict[int, list[Card]] = {}
+    for c in hand:
+        by_value.setdefault(c.value, []).append(c)
+    counts = [len(by_value.get(v, ())) for v in range(18)]
+    black, red = counts[16], counts[17]
+    jokers = black + red
+
+    if last_played is not None and not isinstance(last_played, PlayInfo):
+        last_played = classify_play(last_played)
+    last_is_bomb = last_played is not None and last_played.card_type in BOMB_TYPES
+
+    seen: set[int] = set()
+
+    def emit(naturals, black_num: int, red_num: int):
+        """naturals 为 [(点数, 张数)]，判断牌型并在合法（且能压过上家）时返回 Card 列表。"""
+        values = [v for v, n in naturals for _ in range(n)] + [16] * black_num + [17] * red_num
+        signature = pack_values(values)
+        if signature in seen:
+            return None
+        seen.add(signature)
+        play = _classify(values)
+        if play.card_type is CardType.illegal_type:
+            return None
+        if last_played is not None and not beats(play.strength, last_played.strength):
+            return None
+        cards = []
+        for v, n in naturals:
+            cards.extend(by_value[v][:n])
+        cards.extend(by_value.get(16, [])[:black_num])
+        cards.extend(by_value.get(17, [])[:red_num])
+        return sorted(cards, key=lambda c: c.value)
+
+    def joker_splits(need: int):
+        """need 张大小王的分配方式，优先使用小王。"""
+        return ((b, need - b) for b in range(min(need, black), max(0, need - red) - 1, -1))
+
+    # 非炸弹：上家为炸弹时全部跳过
+    if not last_is_bomb:
+        card_len = last_played.length if last_played is not None else None
+        for key, slots in _non_bomb_templates(card_len):
+            if last_played is not None and key <= last_played.key_card:
+                continue
+            for fill in _iter_fills(slots, counts, jokers):
+                total = sum(width for _, width in slots)
+                need = total - sum(n for _, n in fill)
+                if need == total:
+                    continue # 全部由大小王组成的出牌在后面统一处理
+                for b, r in joker_splits(need):
+                    cards = emit([f for f in fill if f[1] > 0], b, r)
+                    if cards is not None:
+                        yield cards
+
+    # 纯大小王：非炸弹部分直接产出，炸弹与其他炸弹一起排序
+    bombs: list[tuple[int, list[tuple[int, int]], int, int]] = []
+    for b in range(black + 1):
+        for r in range(red + 1):
+            if b + r == 0:
+                continue
+            if _classify([16] * b + [17] * r).card_type in BOMB_TYPES:
+                bombs.append((0, [], b, r))
+                continue
+            if last_is_bomb or (last_played is not None and last_played.length != b + r):
+                continue
+            cards = emit([], b, r)
+            if cards is not None:
+                yield cards
+
+    # 炸弹：一种真牌加任意张大小王，至少 4 张
+    for v in range(3, 16):
+        for used in range(1, counts[v] + 1):
+            for need in range(max(0, 4 - used), jokers + 1):
+                for b, r in joker_splits(need):
+                    bombs.append((0, [(v, used)], b, r))
+    ranked = []
+    for _, naturals, b, r in bombs:
+        values = [v for v, n in naturals for _ in range(n)] + [16] * b + [17] * r
+        play = _classify(values)
+        if play.card_type in BOMB_TYPES:
+            ranked.append((play.strength, naturals, b, r))
+    ranked.sort(key=lambda item: item[0])
+    for _, naturals, b, r in ranked:
+        cards = emit(naturals, b, r)
+        if cards is not None:
+            yield cards
+
+
+def can_beat(hand: Iterable[Card], last_played: list[Card] | PackedHand | PlayInfo) -> bool:
+    """
+    手牌中是否有能压过 last_played 的出牌：惰性枚举，找到第一手即返回。
+    不足 4 张（凑不出炸弹）且张数不够时不必枚举。
+    """
+    if not isinstance(last_played, PlayInfo):
+        last_played = classify_play(last_played)
+    hand = list(hand)
+    if len(hand) < 4 and (last_played.card_type in BOMB_TYPES or len(hand) < last_played.length):
+        return False
+    return next(iter_legal_moves(hand, last_played), None) is not None
@@ -0,0 +1,221 @@
+"""
+二进制编解码：与 JSON 编码承载相同的数据，但体积与解码耗时都小得多，供 Python 客户端在握手时选用。
+
+每个值以 1 字节类型标记开头：
+- None / False / True：仅标记；
+- int：8 字节小端有符号整数；str：4 字节长度 + UTF-8；
+- Card：1 字节牌编号（Card.id）；全部由 Card 组成的列表：1 字节长度 + 每张牌 1 字节；
+- 其它列表：2 字节长度 + 各元素；dict：2 字节长度 + (str 键, 值) 对；
+- 轮次信息（键与 ROUND_INFO_FIELDS 一致的 dict）：固定格式，client_cards 放在最后，
+  这样同一轮发给不同座位的帧只有末尾不同。
+"""
+import struct
+
+from core.card import CARDS, Card
+from core.network.protocol import ROUND_INFO_FIELDS
+
+TAG_NONE       = 0
+TAG_FALSE      = 1
+TAG_TRUE       = 2
+TAG_INT        = 3
+TAG_STR        = 4
+TAG_CARD       = 5
+TAG_CARD_LIST  = 6
+TAG_LIST       = 7
+TAG_DICT       = 8
+TAG_ROUND_INFO = 9
+
+SKIP_LEN = 0xFF # 出牌列表长度为该值表示过牌 ['F']
+
+_INT    = struct.Struct("<q")
+_U32    = struct.Struct("<I")
+_U16    = struct.Struct("<H")
+# game_over, users_score * 6, users_cards_num * 6, now_score, now_player, head_master
+_ROUND_HEAD = struct.Struct("<b6i6Bibb")
+
+_ROUND_KEYS = frozenset(ROUND_INFO_FIELDS) - {"users_cards"}
+_ROUND_KEYS_WITH_CARDS = frozenset(ROUND_INFO_FIELDS)
+
+
+def _is_round_info(obj: dict) -> bool:
+    keys = obj.keys()
+    return keys == _ROUND_KEYS or keys == _ROUND_KEYS_WITH_CARDS
+
+
+def _card_ids(cards) -> bytes:
+    if len(cards) >= SKIP_LEN:
+        raise ValueError(f"too many cards in one list: {len(cards)}")
+    return bytes([len(cards)] + [c.id for c in cards])
+
+
+def _encode_pile(pile, out: bytearray) -> None:
+    """出牌列表：过牌 ['F'] 或 Card 列表。"""
+    if pile == ['F']:
+        out.append(SKIP_LEN)
+    else:
+        out += _card_ids(pile)
+
+
+def _encode_round_info(obj: dict, out: bytearray) -> None:
+    out.append(TAG_ROUND_INFO)
+    out += _ROUND_HEAD.pack(
+        obj["game_over"], *obj["users_score"], *obj["users_cards_num"],
+        obj["now_score"], obj["now_player"], obj["head_master"],
+    )
+    for pile in obj["users_played_cards"]:
+        _encode_pile(pile, out)
+    users_cards = obj.get("users_cards")
+    out.append(users_cards is not None)
+    if users_cards is not None:
+        for cards in users_cards:
+            out += _card_ids(cards)
+    out += _card_ids(obj["client_cards"]) # 必须放在最后
+
+
+def _encode(obj, out: bytearray) -> None:
+    if obj is None:
+        out.append(TAG_NONE)
+    elif obj is True:
+        out.append(TAG_TRUE)
+    elif obj is False:
+        out.append(TAG_FALSE)
+    elif isinstance(obj, int):
+        out.append(TAG_INT)
+        out += _INT.pack(obj)
+    elif isinstance(obj, str):
+        data = obj.encode("utf-8")
+        out.append(TAG_STR)
+        out += _U32.pack(len(data))
+        out += data
+    elif isinstance(obj, Card):
+        out.append(TAG_CARD)
+        out.append(obj.id)
+    elif isinstance(obj, (list, tuple)):
+        if obj and all(isinstance(c, Card) for c in obj):
+            out.append(TAG_CARD_LIST)
+            out += _card_ids(obj)
+        else:
+            out.append(TAG_LIST)
+            out += _U16.pack(len(obj))
+            for item in obj:
+                _encode(item, out)
+    elif isinstance(obj, dict):
+        if _is_round_info(obj):
+            _encode_round_info(obj, out)
+            return
+        out.append(TAG_DICT)
+        out += _U16.pack(len(obj))
+        for key, value in obj.items():
+            _encode(key, out)
+            _encode(value, out)
+    else:
+        raise TypeError(f"cannot encode {type(obj).__name__}")
+
+
+def encode(obj) -> bytes:
+    out = bytearray()
+    _encode(obj, out)
+    return bytes(out)
+
+
+def encode_dict_header(n: int) -> bytes:
+    """dict 的类型标记与长度，之后跟 n 个 encode_dict_items 编码的键值对。"""
+    return bytes([TAG_DICT]) + _U16.pack(n)
+
+
+def encode_dict_items(obj: dict) -> bytes:
+    out = bytearray()
+    for key, value in obj.items():
+        _encode(key, out)
+        _encode(value, out)
+    return bytes(out)
+
+
+def encode_card_ids(cards) -> bytes:
+    """轮次信息末尾的 client_cards 部分。"""
+    return _card_ids(cards)
+
+
+def _decode_cards(buf, pos: int) -> tuple[list[Card], int]:
+    n = buf[pos]
+    pos += 1
+    return [CARDS[i] for i in buf[pos:pos + n]], pos + n
+
+
+def _decode_round_info(buf, pos: int) -> tuple[dict, int]:
+    head = _ROUND_HEAD.unpack_from(buf, pos)
+    pos += _ROUND_HEAD.size
+    played = []
+    for _ in range(6):
+        if buf[pos] == SKIP_LEN:
+            played.append(['F'])
+            pos += 1
+        else:
+            pile, pos = _decode_cards(buf, pos)
+            played.append(pile)
+    obj = {
+        "game_over"         : head[0],
+        "users_score"       : list(head[1:7]),
+        "users_cards_num"   : list(head[7:13]),
+        "users_played_cards": played,
+        "now_score"         : head[13],
+        "now_player"        : head[14],
+        "head_master"       : head[15],
+    }
+    has_users_cards = buf[pos]
+    pos += 1
+    if has_users_cards:
+        users_cards = []
+        for _ in range(6):
+            cards, pos = _decode_cards(buf, pos)
+            users_cards.append(cards)
+        obj["users_cards"] = users_cards
+    obj["client_cards"], pos = _decode_cards(buf, pos)
+    return obj, pos
+
+
+def _decode(buf, pos: int):
+    tag = buf[pos]
+    pos += 1
+    if tag == TAG_NONE:
+        return None, pos
+    if tag == TAG_FALSE:
+        return False, pos
+    if tag == TAG_TRUE:
+        return True, pos
+    if tag == TAG_INT:
+        return _INT.unpack_from(buf, pos)[0], pos + _INT.size
+    if tag == TAG_STR:
+        n = _U32.unpack_from(buf, pos)[0]
+        pos += _U32.size
+        return bytes(buf[pos:pos + n]).decode("utf-8"), pos + n
+    if tag == TAG_CARD:
+        return CARDS[buf[pos]], pos + 1
+    if tag == TAG_CARD_LIST:
+        return _decode_cards(buf, pos)
+    if tag == TAG_LIST:
+        n = _U16.unpack_from(buf, pos)[0]
+        pos += _U16.size
+        items = []
+        for _ in range(n):
+            item, pos = _decode(buf, pos)
+            items.append(item)
+        return items, pos
+    if tag == TAG_DICT:
+        n = _U16.unpack_from(buf, pos)[0]
+        pos += _U16.size
+        obj = {}
+        for _ in range(n):
+            key, pos = _decode(buf, pos)
+            obj[key], pos = _decode(buf, pos)
+        return obj, pos
+    if tag == TAG_ROUND_INFO:
+        return _decode_round_info(buf, pos)
+    raise ValueError(f"unknown tag: {tag}")
+
+
+def decode(buf: bytes | bytearray | memoryview):
+    obj, pos = _decode(buf, 0)
+    if pos != len(buf):
+        raise ValueError(f"trailing bytes: {len(buf) - pos}")
+    return obj
@@ -5,9 +5,12 @@ JSON 协议网络模块：与 my_network.py 接口兼容，使用 JSON 替代 pi
 使用方式：在 game_handler 中改为
     from network.my_network_json import send_data_to_socket, recv_data_from_socket
 """
+import asyncio
 import json
+import select
 import struct
-from socket import socket
+import weakref
+from socket import socket, MSG_PEEK
 from socketserver import ThreadingTCPServer
 
 try:
@@ -17,6 +20,92 @@ except ImportError:
     Card = None
     Suits = None
 
+from core.network import binary_codec
+from core.network.protocol import CODEC_JSON, CODEC_BINARY, CODECS
+
+# 每个连接在握手后选定的编码，未设置时为 JSON
+_socket_codecs: "weakref.WeakKeyDictionary[socket, str]" = weakref.WeakKeyDictionary()
+
+
+def set_socket_codec(sock: socket, codec: str) -> None:
+    if codec not in CODECS:
+        raise ValueError(f"unknown codec: {codec}")
+    _socket_codecs[sock] = codec
+
+
+def get_socket_codec(sock: socket) -> str:
+    return _socket_codecs.get(sock, CODEC_JSON)
+
+
+def encode_body(data, codec: str = CODEC_JSON) -> bytes:
+    if codec == CODEC_BINARY:
+        return binary_codec.encode(data)
+    return json.dumps(_to_json_serializable(data), ensure_ascii=False).encode("utf-8")
+
+
+def decode_body(body, codec: str = CODEC_JSON):
+    if codec == CODEC_BINARY:
+        return binary_codec.decode(body)
+    return _from_json_object(json.loads(bytes(body).decode("utf-8")))
+
+
+class EncodedDict:
+    """
+    预先编码好的公共键值对，之后与每个接收方私有的键值对拼成一帧 body，
+    解码结果与 encode_body({**public, **private}) 相同；wrap 不为空时整体作为 {wrap: {...}}。
+    同一份数据发给很多连接时，公共部分只编码一次。
+    """
+    __slots__ = ("codec", "count", "items", "wrap")
+
+    def __init__(self, public: dict, codec: str = CODEC_JSON, wrap: str = None):
+        self.codec = codec
+        self.count = len(public)
+        if codec == CODEC_BINARY:
+            self.items = binary_codec.encode_dict_items(public)
+            self.wrap = None if wrap is None else binary_codec.encode_dict_header(1) + binary_codec.encode(wrap)
+        else:
+            self.items = _json_dict_items(public)
+            self.wrap = None if wrap is None else b"{" + encode_body(wrap) + b": "
+
+    def splice(self, private: dict) -> bytes:
+        if self.codec == CODEC_BINARY:
+            body = binary_codec.encode_dict_header(self.count + len(private)) + self.items \
+                + binary_codec.encode_dict_items(private)
+        else:
+            items = _json_dict_items(private)
+            sep = b", " if self.items and items else b""
+            body = b"{" + self.items + sep + items + b"}"
+        if self.wrap is None:
+            return body
+        return self.wrap + body + (b"" if self.codec == CODEC_BINARY else b"}")
+
+
+class EncodedRoundInfo:
+    """
+    预先编码好的轮次信息（不含 client_cards），之后为每个座位追加各自的手牌。
+    二进制编码中 client_cards 固定在末尾，直接拼接手牌编号；JSON 编码中 client_cards 作为最后一个键。
+    """
+    __slots__ = ("codec", "prefix", "public")
+
+    def __init__(self, public: dict, codec: str = CODEC_JSON):
+        self.codec = codec
+        if codec == CODEC_BINARY:
+            # 空手牌编码为 1 字节长度 0，去掉后即为公共前缀
+            self.prefix = binary_codec.encode({**public, "client_cards": []})[:-1]
+        else:
+            self.public = EncodedDict(public, codec)
+
+    def splice(self, client_cards: list) -> bytes:
+        if self.codec == CODEC_BINARY:
+            return self.prefix + binary_codec.encode_card_ids(client_cards)
+        return self.public.splice({"client_cards": client_cards})
+
+
+def _json_dict_items(obj: dict) -> bytes:
+    """JSON 对象去掉两侧花括号后的键值对部分，分隔符与 encode_body 一致。"""
+    return encode_body(obj)[1:-1]
+
+
 class ReusableTCPServer(ThreadingTCPServer):
     allow_reuse_address = True
     allow_reuse_port = True
@@ -59,44 +148,137 @@ def _from_json_object(obj):
         return [_from_json_object(item) for item in obj]
     if isinstance(obj, dict):
         # 若为 Card 格式：{"suit": "...", "value": N}
-        if set(obj.keys()) == {"suit", "value"} and Card is not None:
+        if len(obj) == 2 and "suit" in obj and "value" in obj and Card is not None:
             return Card.from_dict(obj)
         return {k: _from_json_object(v) for k, v in obj.items()}
     return obj
 
 
+HEADER = struct.Struct("<i") # 4 字节长度头，小端序
+MAX_BODY_LEN = 1024 * 1024 * 10 # 最大 10MB
+
+
+class FrameReader:
+    """
+    单个连接的缓冲读取器：用 recv_into 读入可复用的 bytearray，一次读取中可能包含多帧或半个长度头，
+    都在缓冲区内拼好后再切分。返回的 memoryview 直接指向缓冲区，下一次读取前有效。
+    """
+    __slots__ = ("buf", "start", "end")
+
+    def __init__(self, size: int = 16 * 1024):
+        self.buf = bytearray(size)
+        self.start = 0 # 未消费数据的起点
+        self.end = 0   # 已读入数据的终点
+
+    def _fill(self, sock: socket, need: int) -> None:
+        """保证缓冲区中至少有 need 字节未消费数据。"""
+        while self.end - self.start < need:
+            if self.start + need > len(self.buf):
+                # 剩余空间不够：数据挪到开头，仍不够则换更大的缓冲区
+                pending = self.end - self.start
+                if need > len(self.buf):
+                    buf = bytearray(max(need, len(self.buf) * 2))
+                    buf[:pending] = self.buf[self.start:self.end]
+                    self.buf = buf
+                else:
+                    self.buf[:pending] = self.buf[self.start:self.end]
+                self.start, self.end = 0, pending
+            with memoryview(self.buf) as view:
+                got = sock.recv_into(view[self.end:])
+            if got == 0:
+                raise ConnectionError(
+                    f"Connection closed: expected {need} bytes, got {self.end - self.start}"
+                )
+            self.end += got
+
+    def read_frame(self, sock: socket) -> memoryview:
+        self._fill(sock, HEADER.size)
+        body_len = HEADER.unpack_from(self.buf, self.start)[0]
+        if body_len < 0 or body_len > MAX_BODY_LEN:
+            raise ValueError(f"Invalid body length: {body_len}")
+        self._fill(sock, HEADER.size + body_len)
+        begin = self.start + HEADER.size
+        self.start = begin + body_len
+        if self.start == self.end: # 缓冲区已读空，下次从头开始
+            self.start = self.end = 0
+        return memoryview(self.buf)[begin:begin + body_len]
+
+
+# 每个连接一个读取器，连接关闭后随之回收
+_socket_readers: "weakref.WeakKeyDictionary[socket, FrameReader]" = weakref.WeakKeyDictionary()
+
+
+def get_frame_reader(sock: socket) -> FrameReader:
+    reader = _socket_readers.get(sock)
+    if reader is None:
+        reader = _socket_readers[sock] = FrameReader()
+    return reader
+
+
+def send_frame(sock: socket, body: bytes) -> None:
+    """长度头与 body 合并为一次发送（支持 sendmsg 时不拷贝 body）。"""
+    header = HEADER.pack(len(body))
+    if not hasattr(sock, "sendmsg"): # Windows 没有 sendmsg
+        sock.sendall(header + body)
+        return
+    sent = sock.sendmsg([header, body])
+    if sent < len(header):
+        sock.sendall(header[sent:])
+        sock.sendall(body)
+    elif sent < len(header) + len(body):
+        sock.sendall(memoryview(body)[sent - len(header):])
+
+
 def send_data_to_socket(data, sock: socket) -> None:
     """
-    发送数据，格式：4 字节长度头（小端 int）+ JSON 编码的 body。
+    发送数据，格式：4 字节长度头（小端 int）+ body，body 按该连接选定的编码（默认 JSON）。
     与 my_network.py 中 send_data_to_socket 接口一致，可直接替换。
     """
-    serializable = _to_json_serializable(data)
-    body = json.dumps(serializable, ensure_ascii=False).encode("utf-8")
-    header = struct.pack("<i", len(body))  # 小端序，与 Python struct 'i' 在 x86 上一致
-    sock.sendall(header)
-    sock.sendall(body)
+    send_frame(sock, encode_body(data, get_socket_codec(sock)))
+
+
+def is_peer_closed(sock: socket) -> bool:
+    """
+    不阻塞地检查对端是否已关闭连接，不消费数据。
+    只用于对端不会发送数据的阶段（如等待大厅），此时可读即意味着连接已关闭或出错。
+    """
+    readable, _, _ = select.select([sock], [], [], 0)
+    if not readable:
+        return False
+    try:
+        return sock.recv(1, MSG_PEEK) == b""
+    except OSError:
+        return True
 
 
 def recv_data_from_socket(sock: socket):
     """
-    接收数据，格式：先读 4 字节得长度，再读 body 并 JSON 解析。
+    接收数据，格式：先读 4 字节得长度，再读 body 并按该连接选定的编码解析。
     自动将 Card 格式的 dict 转回 Card 对象。
     与 my_network.py 中 recv_data_from_socket 接口一致，可直接替换。
     """
-    HEADER_LEN = 4
-    header_bytes = sock.recv(HEADER_LEN)
-    if len(header_bytes) < HEADER_LEN:
-        raise ConnectionError(f"Connection closed: expected {HEADER_LEN} header bytes, got {len(header_bytes)}")
-    body_len = struct.unpack("<i", header_bytes)[0]
-    if body_len < 0 or body_len > 1024 * 1024 * 10:  # 最大 10MB
-        raise ValueError(f"Invalid body length: {body_len}")
-
-    body_bytes = b""
-    while len(body_bytes) < body_len:
-        chunk = sock.recv(body_len - len(body_bytes))
-        if not chunk:
-            raise ConnectionError("Connection closed while reading body")
-        body_bytes += chunk
-
-    parsed = json.loads(body_bytes.decode("utf-8"))
-    return _from_json_object(parsed)
+    with get_frame_reader(sock).read_frame(sock) as body:
+        return decode_body(body, get_socket_codec(sock))
+
+
+async def recv_data_from_stream(reader: asyncio.StreamReader, codec: str = CODEC_JSON):
+    """asyncio 版本的 recv_data_from_socket：帧格式相同，连接关闭时抛出 ConnectionError。"""
+    try:
+        header = await reader.readexactly(HEADER.size)
+        body_len = HEADER.unpack(header)[0]
+        if body_len < 0 or body_len > MAX_BODY_LEN:
+            raise ValueError(f"Invalid body length: {body_len}")
+        body = await reader.readexactly(body_len)
+    except asyncio.IncompleteReadError as e:
+        raise ConnectionError(f"Connection closed: expected {e.expected} bytes, got {len(e.partial)}") from e
+    return decode_body(body, codec)
+
+
+def write_data_to_stream(data, writer: asyncio.StreamWriter, codec: str = CODEC_JSON) -> None:
+    """asyncio 版本的 send_data_to_socket：只写入发送缓冲区，由调用方 await writer.drain()。"""
+    write_frame_to_stream(encode_body(data, codec), writer)
+
+
+def write_frame_to_stream(body: bytes, writer: asyncio.StreamWriter) -> None:
+    """asyncio 版本的 send_frame：写入已编码好的 body。"""
+    writer.writelines((HEADER.pack(len(body)), body))
@@ -0,0 +1,86 @@
+"""
+协议版本协商与轮次信息帧。
+
+新版客户端连接后先发送握手 {"protocol": N, "codec": C}，服务端回复双方都支持的最高版本与
+本连接使用的编码 {"protocol": M, "codec": C'}，握手本身总是 JSON 编码，之后按 C' 收发；
+旧版客户端（如 Dart 客户端）第一条消息直接是 if_has_cookie（bool），服务端据此按旧版协议处理。
+详见 docs/protocol.md。
+"""
+
+PROTOCOL_LEGACY      = 1 # 旧版：无握手，轮次信息逐字段发送
+PROTOCOL_ROUND_FRAME = 2 # 轮次信息合并为一帧
+PROTOCOL_DELTA       = 3 # 轮次信息只发送与上一帧相比变化的字段，定期发送完整关键帧
+PROTOCOL_PLAY_ONLY   = 4 # 出牌时只发送所出的牌，手牌与分数由服务端维护并校验
+PROTOCOL_VERSION     = PROTOCOL_PLAY_ONLY # 本端支持的最高版本
+PROTOCOLS            = (PROTOCOL_LEGACY, PROTOCOL_ROUND_FRAME, PROTOCOL_DELTA, PROTOCOL_PLAY_ONLY)
+
+KEYFRAME_INTERVAL = 16 # 增量模式下每隔多少帧发送一次完整关键帧
+
+CODEC_JSON   = "json"   # 默认编码，Dart 客户端使用
+CODEC_BINARY = "binary" # 紧凑二进制编码，见 binary_codec.py
+CODECS = (CODEC_JSON, CODEC_BINARY)
+
+# 轮次信息帧的字段，顺序与旧版逐字段发送一致；users_cards 仅在游戏结束时出现
+ROUND_INFO_FIELDS = (
+    "game_over", "users_score", "users_cards_num", "users_played_cards",
+    "users_cards", "client_cards", "now_score", "now_player", "head_master",
+)
+
+
+def is_hello(message) -> bool:
+    """判断连接后的第一条消息是否为握手（旧版客户端发送的是 bool）。"""
+    return isinstance(message, dict) and isinstance(message.get("protocol"), int)
+
+
+def make_hello(protocol: int = PROTOCOL_VERSION, codec: str = CODEC_JSON) -> dict:
+    return {"protocol": protocol, "codec": codec}
+
+
+def negotiate(hello: dict, supported: int = PROTOCOL_VERSION) -> dict:
+    """服务端根据客户端握手确定本连接使用的协议与编码，返回回复给客户端的握手。"""
+    protocol = max(PROTOCOL_LEGACY, min(hello["protocol"], supported))
+    codec = hello.get("codec", CODEC_JSON)
+    if codec not in CODECS or protocol < PROTOCOL_ROUND_FRAME: # 未知编码或旧版协议时回退到 JSON
+        codec = CODEC_JSON
+    return {"protocol": protocol, "codec": codec}
+
+
+# 按座位存放的字段，增量中以 [[座位, 新值], ...] 表示
+_SEAT_FIELDS = ("users_score", "users_cards_num", "users_played_cards")
+# 整体替换的字段
+_WHOLE_FIELDS = ("game_over", "client_cards", "now_score", "now_player", "head_master")
+
+
+def diff_round_info(last: dict, current: dict) -> dict:
+    """
+    增量模式下 current 相对 last 变化的字段，发送为 {"delta": {...}}，客户端用 apply_round_frame 还原。
+    只比较 current 中出现的字段：服务端广播时公共部分与各座位的 client_cards 分开计算，见 server/broadcast.py。
+    """
+    delta = {}
+    for key in _SEAT_FIELDS:
+        if key in current:
+            changed = [[i, v] for i, (old, v) in enumerate(zip(last[key], current[key])) if old != v]
+            if changed:
+                delta[key] = changed
+    for key in _WHOLE_FIELDS:
+        if key in current and last[key] != current[key]:
+            delta[key] = current[key]
+    return delta
+
+
+def apply_round_frame(state: dict | None, frame: dict) -> dict:
+    """客户端将收到的轮次信息帧（关键帧或增量）应用到上一状态，返回新的完整轮次信息。"""
+    if "delta" not in frame:
+        return frame
+    if state is None:
+        raise ValueError("received a delta frame before any keyframe")
+    state = dict(state)
+    for key, value in frame["delta"].items():
+        if key in _SEAT_FIELDS:
+            seats = list(state[key])
+            for i, v in value:
+                seats[i] = v
+            state[key] = seats
+        else:
+            state[key] = value
+    return state
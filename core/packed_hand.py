@@ -0,0 +1,124 @@
+"""
+压缩手牌：把 3~17 共 15 种点数的张数打包进一个 Python int。
+
+四副牌中每种点数最多 16 张、大小王各最多 8 张，每个槽位 5 bit 足够，
+因此增删查计数都是 O(1) 的位运算，且 bits 本身就是该手牌的规范签名，
+可直接作为牌型缓存的键。
+"""
+from typing import Iterable
+
+from core.card import Card, Suits
+
+RANK_MIN  = 3  # 最小点数
+RANK_MAX  = 17 # 最大点数（大王）
+SLOT_BITS = 5  # 每种点数占用的位数
+SLOT_MASK = (1 << SLOT_BITS) - 1
+
+# 各点数对应槽位的偏移与单位值，下标即点数
+_SHIFT = [0] * (RANK_MAX + 1)
+_UNIT = {}
+for _v in range(RANK_MIN, RANK_MAX + 1):
+    _SHIFT[_v] = (_v - RANK_MIN) * SLOT_BITS
+    _UNIT[_v] = 1 << _SHIFT[_v]
+
+# 普通牌按花色轮转生成，大小王无花色
+_NORMAL_SUITS = [Suits.spade, Suits.heart, Suits.club, Suits.diamond]
+
+
+def pack_values(values: Iterable[int]) -> int:
+    """将点数序列打包为签名，点数越界时抛出 KeyError。调用方需保证单种点数不超过 31 张。"""
+    bits = 0
+    for v in values:
+        bits += _UNIT[v]
+    return bits
+
+
+def unpack_values(bits: int) -> list[int]:
+    """将签名还原为降序排列的点数序列（与 judge_and_transform_cards 的输入格式一致）。"""
+    values = []
+    for v in range(RANK_MAX, RANK_MIN - 1, -1):
+        n = (bits >> _SHIFT[v]) & SLOT_MASK
+        if n:
+            values.extend([v] * n)
+    return values
+
+
+class PackedHand:
+    __slots__ = ("bits", "size")
+
+    def __init__(self, bits: int = 0, size: int = None):
+        self.bits = bits # 各点数张数
+        self.size = size if size is not None else len(unpack_values(bits)) # 总张数
+
+    @classmethod
+    def from_values(cls, values: Iterable[int]) -> "PackedHand":
+        hand = cls()
+        for v in values:
+            hand.add(v)
+        return hand
+
+    @classmethod
+    def from_cards(cls, cards: Iterable[Card]) -> "PackedHand":
+        return cls.from_values(c.value for c in cards)
+
+    def to_values(self) -> list[int]:
+        return unpack_values(self.bits)
+
+    def to_cards(self) -> list[Card]:
+        """还原为升序的 Card 列表，花色按黑桃、红心、梅花、方块轮转分配。"""
+        cards = []
+        for v in range(RANK_MIN, RANK_MAX + 1):
+            for i in range(self.count(v)):
+                suit = Suits.empty if v >= 16 else _NORMAL_SUITS[i % 4]
+                cards.append(Card(suit, v))
+        return cards
+
+    def count(self, value: int) -> int:
+        if value not in _UNIT:
+            return 0
+        return (self.bits >> _SHIFT[value]) & SLOT_MASK
+
+    def add(self, value: int, n: int = 1) -> None:
+        if self.count(value) + n > SLOT_MASK:
+            raise ValueError(f"too many cards of value {value}")
+        self.bits += _UNIT[value] * n
+        self.size += n
+
+    def remove(self, value: int, n: int = 1) -> None:
+        if self.count(value) < n:
+            raise ValueError(f"not enough cards of value {value}")
+        self.bits -= _UNIT[value] * n
+        self.size -= n
+
+    def contains_all(self, other: "PackedHand") -> bool:
+        """判断 other 中每种点数的张数都不超过本手牌。"""
+        bits, mine = other.bits, self.bits
+        while bits:
+            # 取最低的非空槽位比较
+            shift = (((bits & -bits).bit_length() - 1) // SLOT_BITS) * SLOT_BITS
+            if (bits >> shift) & SLOT_MASK > (mine >> shift) & SLOT_MASK:
+                return False
+            bits &= ~(SLOT_MASK << shift)
+        return True
+
+    def score(self) -> int:
+        return self.count(5) * 5 + (self.count(10) + self.count(13)) * 10
+
+    def copy(self) -> "PackedHand":
+        return PackedHand(self.bits, self.size)
+
+    def __contains__(self, value: int) -> bool:
+        return self.count(value) > 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __eq__(self, other):
+        if isinstance(other, PackedHand):
+            return self.bits == other.bits
+        return NotImplemented
+
+    __hash__ = None # 可变对象，需要作为键时请使用 bits
+
+    def __repr__(self):
+        return f"PackedHand({self.to_values()})"
@@ -1,8 +1,11 @@
-import copy
 from collections import Counter
 from enum import Enum
+from functools import lru_cache
+from typing import NamedTuple
 from core.card import Card
-import core.logger as logger
+from core.hand import Hand
+from core.packed_hand import PackedHand, SLOT_MASK, pack_values, unpack_values
+from core import trace
 
 '''
 3 ~ 15 -> 3 ~ 10 + J Q K A 2
@@ -61,6 +64,9 @@ def if_straight(cards: list[int], card_num: dict[int, int], type_num, joker_num)
     # 保证为5张牌，且非5单张时有王可替
     if len(cards) != 5 or (type_num.get(1, 0) != 5 and joker_num == 0):
         return CardType.illegal_type, 0
+    # 纯大小王不是顺子（下面用 cards[joker_num] 取除大小王外最大的牌）
+    if joker_num == len(cards):
+        return CardType.illegal_type, 0
 
     # 保证除大小王外最大与最小牌相差不超过5
     if cards[joker_num] - cards[-1] + 1 > 5:
@@ -98,6 +104,10 @@ def if_straight_pairs(cards, card_num, joker_num):
                 # 关键牌设为 1，使 AA22 成为最小的二连对
                 return CardType.straight_pairs, 1
 
+    # 其余情况下纯大小王不是连对（下面用 cards[joker_num] 取除大小王外最大的牌）
+    if joker_num == len(cards):
+        return CardType.illegal_type, 0
+
     # 连对数不超过12次，且除大小王外最大与最小牌相差不超过连对数
     if pairs_num > 12 or cards[joker_num] - cards[-1] + 1 > pairs_num:
         return CardType.illegal_type, 0
@@ -118,6 +128,9 @@ def if_straight_triples(cards, card_num, joker_num):
     # 至少6张牌，且为3的倍数
     if len(cards) < 6 or len(cards) % 3 != 0:
         return CardType.illegal_type, 0
+    # 纯大小王不是连三张（同上）
+    if joker_num == len(cards):
+        return CardType.illegal_type, 0
 
     triples_num = int(len(cards) // 3)
     # 连三张数不超过12次，且除大小王外最大与最小牌相差不超过连三张数
@@ -135,96 +148,51 @@ def if_straight_triples(cards, card_num, joker_num):
         return CardType.illegal_type, 0
 
 
-# 尝试将最小牌作为飞机中的三张或对子，返回（能否，剩余王数）
-def try_min_card_type(card_num, rg, joker_num, try_num):
-    for i in rg:
-        if card_num.get(i, 0) < try_num:
-            joker_num -= try_num - card_num.get(i, 0)
-        if joker_num < 0:  # 大小王不够替换
-            return False, 0
-        if i in card_num:
-            card_num[i] = max(card_num[i] - try_num, 0)
-    return True, joker_num
-
-
-# 判断是否为飞机，返回（出牌类型，关键牌，转换后牌）
+# 判断是否为飞机，返回（出牌类型，关键牌）
+# 飞机由 n 组连续三张与 n 组连续对子组成（两段可以重叠，2 不能参与），大小王可替换任意牌
+# 在定长的点数数组上由大到小枚举连三张的起点，第一个可行解即为关键牌最大的组合：
+# - 连三张范围内的点数最多 3 张，超出部分（最多再 2 张）必须由对子承担；
+# - 范围外的点数最多 2 张，且全部由对子承担；
+# - 需要对子承担的点数跨度不超过 n 即可放下连对。
+# 总张数恰为 5n，所以各点数都放得下时，缺口恰好由大小王补齐
 def if_flight(cards, card_num, joker_num):
     # 至少10张牌，且为5的倍数
     if len(cards) < 10 or len(cards) % 5 != 0:
         return CardType.illegal_type, 0
 
-    triple_pair_num = int(len(cards) // 5)
-    if triple_pair_num > 12:
+    triple_pair_num = len(cards) // 5
+    if triple_pair_num > 12 or card_num.get(15, 0) > 0:
         return CardType.illegal_type, 0
 
-    rg = range(14, 14 - triple_pair_num, -1) \
-        if cards[-1] + triple_pair_num - 1 > 14 else range(cards[-1], cards[-1] + triple_pair_num)
-
-    _card_num = copy.deepcopy(card_num)
-    key_card = 0
-
-    # 尝试将最小牌作为对子
-    if_pairs, _joker_num = try_min_card_type(_card_num, rg, joker_num, 2)
-    if if_pairs:
-        min_pair_card = 0
-        # 找到剩余非王牌中最小牌
-        for i in range(cards[-1], cards[joker_num] + 1):
-            if _card_num.get(i, 0) > 0:
-                min_pair_card = i
+    counts = [0] * 15 # 下标即点数，只统计 3 ~ A
+    for k, v in card_num.items():
+        if k <= 14:
+            counts[k] = v
+    present = [k for k in range(3, 15) if counts[k] > 0]
+
+    # 超过 2 张的点数必须落在连三张范围内，据此收窄起点的枚举范围
+    triple_ranks = [k for k in present if counts[k] > 2]
+    highest_start = min(triple_ranks[0], 15 - triple_pair_num) if triple_ranks else 15 - triple_pair_num
+    lowest_start = max(triple_ranks[-1] - triple_pair_num + 1, 3) if triple_ranks else 3
+
+    for start in range(highest_start, lowest_start - 1, -1):
+        end = start + triple_pair_num - 1
+        pair_min, pair_max = 15, 0 # 需要由对子承担的点数范围
+        for k in present:
+            if start <= k <= end:
+                if counts[k] <= 3:
+                    continue
+                if counts[k] > 5:
+                    break
+            elif counts[k] > 2:
                 break
-
-        # 若没找到，则尝试用王作为所有三张
-        if min_pair_card == 0:
-            # 王必须数量刚好
-            if _joker_num == triple_pair_num * 3:
-                return CardType.flight, 14
-        # 其它情况正常凑连三张
+            pair_min = min(pair_min, k)
+            pair_max = max(pair_max, k)
         else:
-            _rg = range(14, 14 - triple_pair_num, -1) \
-                if min_pair_card + triple_pair_num - 1 > 14 else range(min_pair_card, min_pair_card + triple_pair_num)
-
-            # 凑成功则记录该连三张的最大张作为关键牌
-            if try_transform_cards(_card_num, _rg, _joker_num, 3):
-                key_card = max(list(_rg))
-
-    _card_num = copy.deepcopy(card_num)
-    _key_card = 0
-
-    # 尝试将最小牌作为三张
-    if_triples, _joker_num = try_min_card_type(_card_num, rg, joker_num, 3)
-    if if_triples:
-        # 将凑出的连三张中最大张作为关键牌
-        _key_card = max(list(rg))
-
-        min_pair_card = 0
-        # 找到剩余非王牌中最小牌
-        for i in range(cards[-1], cards[joker_num] + 1):
-            if _card_num.get(i, 0) > 0:
-                min_pair_card = i
-                break
+            if pair_max - pair_min + 1 <= triple_pair_num:
+                return CardType.flight, end
 
-        # 若没找到，则尝试用王作为所有对子
-        if min_pair_card == 0:
-            # 王必须数量刚好
-            # 凑失败则清除关键牌
-            if _joker_num != triple_pair_num * 2:
-                _key_card = 0
-        # 其它情况正常凑连对
-        else:
-            _rg = range(14, 14 - triple_pair_num, -1) \
-                if min_pair_card + triple_pair_num - 1 > 14 else range(min_pair_card, min_pair_card + triple_pair_num)
-
-            # 凑失败则清除关键牌
-            if try_transform_cards(_card_num, _rg, _joker_num, 2) is False:
-                _key_card = 0
-
-    # 取两次尝试中较大牌型
-    if key_card >= _key_card and key_card != 0:
-        return CardType.flight, key_card
-    elif key_card < _key_card:
-        return CardType.flight, _key_card
-    else:
-        return CardType.illegal_type, 0
+    return CardType.illegal_type, 0
 
 
 # 判断是否为单张，返回（出牌类型，关键牌，转换后牌）
@@ -300,9 +268,8 @@ def if_triple_pair(cards, card_num, type_num, joker_num):
     return CardType.illegal_type, 0
 
 
-# 判断出牌类型并转换大小王，确认关键牌, 返回（出牌类型，关键牌）
-def judge_and_transform_cards(cards: list[int]) -> tuple[CardType, int]:
-    assert sorted(cards, reverse=True) == cards, cards # 输入的cards必须是排好序的
+# 不带缓存的原始实现，cards 为降序排列的点数序列
+def _judge_and_transform_cards(cards) -> tuple[CardType, int]:
     card_num = dict(Counter(cards))  # 统计每种牌有多少张
     type_num = dict(Counter([v for k, v in card_num.items() if k <= 15]))  # 统计除去王牌 相同张数的牌有多少种
 
@@ -356,102 +323,223 @@ def judge_and_transform_cards(cards: list[int]) -> tuple[CardType, int]:
     return CardType.illegal_type, 0
 
 
+# 牌型判断缓存：以压缩后的各点数张数（规范签名）为键，LRU 淘汰
+CLASSIFY_CACHE_SIZE = 4096
+
+_classify_cache_enabled = True
+
+
+def _judge_by_signature(signature: int) -> tuple[CardType, int]:
+    return _judge_and_transform_cards(unpack_values(signature))
+
+
+_judge_cached = lru_cache(maxsize=CLASSIFY_CACHE_SIZE)(_judge_by_signature)
+
+
+def set_classify_cache_enabled(enabled: bool) -> None:
+    """开启/关闭牌型判断缓存，关闭时同时清空已有缓存。"""
+    global _classify_cache_enabled
+    _classify_cache_enabled = enabled
+    if not enabled:
+        _judge_cached.cache_clear()
+
+
+def is_classify_cache_enabled() -> bool:
+    return _classify_cache_enabled
+
+
+def set_classify_cache_size(maxsize: int) -> None:
+    """调整缓存容量（会清空已有缓存与统计）。"""
+    global _judge_cached
+    _judge_cached = lru_cache(maxsize=maxsize)(_judge_by_signature)
+
+
+def get_classify_cache_info():
+    """返回缓存命中统计：CacheInfo(hits, misses, maxsize, currsize)。"""
+    return _judge_cached.cache_info()
+
+
+def clear_classify_cache() -> None:
+    _judge_cached.cache_clear()
+
+
+# 判断出牌类型并转换大小王，确认关键牌, 返回（出牌类型，关键牌）
+# cards 为降序排列的点数序列，或 PackedHand
+def judge_and_transform_cards(cards: list[int] | PackedHand) -> tuple[CardType, int]:
+    if isinstance(cards, PackedHand):
+        if _classify_cache_enabled:
+            return _judge_cached(cards.bits)
+        return _judge_and_transform_cards(cards.to_values())
+
+    assert sorted(cards, reverse=True) == cards, cards # 输入的cards必须是排好序的
+    if not _classify_cache_enabled or len(cards) > SLOT_MASK: # 张数可能超出单个槽位时不走缓存
+        return _judge_and_transform_cards(cards)
+    try:
+        signature = pack_values(cards)
+    except KeyError: # 非法点数
+        return _judge_and_transform_cards(cards)
+    return _judge_cached(signature)
+
+
+# 牌力：将（出牌类型，张数，关键牌）映射为一个整数，比较大小只需一次整数比较
+# 非炸弹：张数 << 5 | 关键牌，只有张数相同（高位相同）时才可比较
+# 炸弹：BOMB_STRENGTH | 档位 << 11 | 张数 << 5 | 关键牌，档位由低到高依次为
+#       8 张及以下的普通炸弹、小王炸、大王炸、9 张及以上的普通炸弹
+# 非法牌型关键牌为 0，按非炸弹计算；调用方需先排除非法的出牌
+BOMB_STRENGTH = 1 << 16
+
+
+def play_strength(card_type: CardType, card_len: int, key_card: int) -> int:
+    if card_type is CardType.normal_bomb:
+        tier = 3 if card_len > 8 else 0
+    elif card_type is CardType.black_joker_bomb:
+        tier = 1
+    elif card_type is CardType.red_joker_bomb:
+        tier = 2
+    else:
+        return card_len << 5 | key_card
+    return BOMB_STRENGTH | tier << 11 | card_len << 5 | key_card
+
+
+# 判断牌力为 strength 的出牌能否压过牌力为 last_strength 的出牌
+def beats(strength: int, last_strength: int) -> bool:
+    if strength >= BOMB_STRENGTH or last_strength >= BOMB_STRENGTH:
+        return strength > last_strength
+    return strength >> 5 == last_strength >> 5 and strength > last_strength
+
+
+# 一手已判断过的出牌，可在一轮中缓存复用
+class PlayInfo(NamedTuple):
+    card_type: CardType # 出牌类型
+    length   : int      # 张数
+    key_card : int      # 关键牌
+    strength : int      # 牌力
+
+
+def classify_play(cards: list[Card] | PackedHand) -> PlayInfo:
+    packed = _as_packed(cards)
+    card_type, key_card = judge_and_transform_cards(packed)
+    return PlayInfo(card_type, len(packed), key_card, play_strength(card_type, len(packed), key_card))
+
+
 # 判断为首个出牌时，输入是否合法
-def first_input_legal(user_input: list[int]) -> bool:
+def first_input_legal(user_input: list[int] | PackedHand) -> bool:
     card_type, _ = judge_and_transform_cards(user_input)
     return card_type is not CardType.illegal_type
 
 # 判断存在上家出牌时，输入是否合法
-def if_not_first_input_legal(user_input: list[int], last_played_cards: list[int]):
+def if_not_first_input_legal(user_input: list[int] | PackedHand, last_played_cards: list[int] | PackedHand):
     card_len = len(user_input)
     last_card_len = len(last_played_cards)
     type_card, key_card = judge_and_transform_cards(user_input)
     if type_card is CardType.illegal_type:
         return False
     last_type_card, last_key_card = judge_and_transform_cards(last_played_cards)
+    return beats(
+        play_strength(type_card, card_len, key_card),
+        play_strength(last_type_card, last_card_len, last_key_card),
+    )
 
-    # 先判断炸弹
-    last_if_bomb = 0
-    if 1 <= last_type_card.value <= 3:
-        last_if_bomb = last_type_card.value
-    _if_bomb = 0
-    if 1 <= type_card.value <= 3:
-        _if_bomb = type_card.value
 
-    if last_if_bomb != 0 and _if_bomb == 0:
-        return False
-    elif last_if_bomb == 0 and _if_bomb != 0:
-        return True
-    elif last_if_bomb != 0 and _if_bomb != 0:
-        # 都是炸弹 先判断大小王炸与普通炸弹的大小
-        if (last_if_bomb > _if_bomb and card_len < 9) or (last_if_bomb < _if_bomb and last_card_len > 8):
-            return False
-        elif (last_if_bomb > _if_bomb and card_len > 8) or (last_if_bomb < _if_bomb and last_card_len < 9):
-            return True
-        # 比长度
-        elif last_card_len > card_len:
-            return False
-        elif last_card_len < card_len:
-            return True
-        # 比大小
-        else:
-            return key_card > last_key_card
-
-    # 都不是炸弹先判断长度是否一致，再直接比较关键牌
-    if last_card_len != card_len:
-        return False
-    return key_card > last_key_card
+# 将手牌统一转换为 PackedHand，已是 PackedHand 时直接返回，Hand 直接使用其维护的计数
+def _as_packed(cards: list[Card] | Hand | PackedHand) -> PackedHand:
+    if isinstance(cards, PackedHand):
+        return cards
+    if isinstance(cards, Hand):
+        return cards.packed
+    return PackedHand.from_cards(cards)
 
 
 # 判断手中牌是否足够出，并返回输入牌的分数
-def if_enough_card(user_input: list[int], user_card: list[Card]) -> tuple[bool, int]:
-    logger.info(f"if_enough_card: {user_input}")
-    input_num = dict(Counter(user_input))  # 统计每种牌有多少张
+def if_enough_card(
+    user_input: list[int] | PackedHand,
+    user_card : list[Card] | PackedHand
+) -> tuple[bool, int]:
+    trace.trace("if_enough_card", "%s", user_input)
+    if isinstance(user_input, PackedHand):
+        input_hand = user_input
+    else:
+        try:
+            input_hand = PackedHand.from_values(user_input)
+        except (KeyError, ValueError): # 非法点数或张数超出上限，手牌中不可能有
+            return False, 0
     if user_card is not None:
-        # 统计 user_card 中每种牌的数量
         # 11/04/2024: 支持Card类
-        card_num = dict(Counter([card.value for card in user_card]))
-        for k, v in input_num.items():
-            if card_num.get(k, 0) < v:
-                return False, 0
-    scores = input_num.get(5, 0) * 5 + (input_num.get(10, 0) + input_num.get(13, 0)) * 10 # 计算分数
-    return True, scores
+        if not _as_packed(user_card).contains_all(input_hand):
+            return False, 0
+    return True, input_hand.score()
 
 
 # 判断用户从控制台的输入是否合法，若合法，返回重新排列后的输入
 def validate_user_input(
-    user_input       : list[int],  # 用户输入
-    user_card        : list[Card], # 用户手牌
-    last_played_cards: list[Card]  # 上家出的牌
+    user_input       : list[int] | PackedHand,  # 用户输入
+    user_card        : list[Card] | PackedHand, # 用户手牌
+    last_played_cards: list[Card] | PackedHand | PlayInfo # 上家出的牌，可传入已缓存的 PlayInfo
 ) -> tuple[bool, int]:
     assert user_input is not None
-    # 判断输入字符是否合法，并判断是否skip
-    for x in user_input:
-        if x < 0 or (len(user_input) > 1 and x == 0): # 小于0或者夹杂了跳过，都是非法输入
+    if not isinstance(user_input, PackedHand):
+        # 判断输入字符是否合法，并判断是否skip
+        for x in user_input:
+            if x < 0 or (len(user_input) > 1 and x == 0): # 小于0或者夹杂了跳过，都是非法输入
+                return False, 0
+
+        # 用户跳过
+        if user_input == [0]:
+            return last_played_cards is not None, 0
+
+        try:
+            user_input = PackedHand.from_values(user_input)
+        except (KeyError, ValueError):
             return False, 0
-    
-    # 用户跳过
-    if user_input == [0]:
-        return last_played_cards is not None, 0
 
     _if_enough, score = if_enough_card(user_input, user_card)
     if _if_enough is False:
         return False, 0
 
-    _user_input = sorted(user_input, reverse=True)
     if last_played_cards is None:
-        return first_input_legal(_user_input), score
+        return first_input_legal(user_input), score
+    elif isinstance(last_played_cards, PlayInfo):
+        play = classify_play(user_input)
+        if play.card_type is CardType.illegal_type:
+            return False, score
+        return beats(play.strength, last_played_cards.strength), score
     else:
-        last_played_cards_values = [last_card.value for last_card in last_played_cards]
-        _last_played_cards = sorted(last_played_cards_values, reverse=True)
-        return if_not_first_input_legal(_user_input, _last_played_cards), score
+        return if_not_first_input_legal(user_input, _as_packed(last_played_cards)), score
     
 # 02/01/2025: 支持Card类
 def validate_user_selected_cards(
     selected_cards: list[Card], 
-    user_cards: list[Card],
-    last_played_cards: list[Card]
+    user_cards: list[Card] | PackedHand,
+    last_played_cards: list[Card] | PackedHand
 ) -> bool:
     selected_cards_values = [card.value for card in selected_cards]
     result, _ = validate_user_input(selected_cards_values, user_cards, last_played_cards)
-    return result
\ No newline at end of file
+    return result
+
+
+# 批量校验：同一手牌、同一上家出牌下的多个候选出牌
+# 上家出牌只判断一次，手牌只压缩一次，返回与 candidates 一一对应的（是否合法，分数）
+def validate_many(
+    candidates : list[list[Card] | PackedHand],
+    hand       : list[Card] | PackedHand,
+    last_played: list[Card] | PackedHand | PlayInfo
+) -> list[tuple[bool, int]]:
+    packed_hand = _as_packed(hand) if hand is not None else None
+    if last_played is not None and not isinstance(last_played, PlayInfo):
+        last_played = classify_play(last_played)
+
+    results = []
+    for cards in candidates:
+        packed = _as_packed(cards)
+        if packed_hand is not None and not packed_hand.contains_all(packed):
+            results.append((False, 0))
+            continue
+        play = classify_play(packed)
+        if play.card_type is CardType.illegal_type:
+            legal = False
+        elif last_played is None:
+            legal = True
+        else:
+            legal = beats(play.strength, last_played.strength)
+        results.append((legal, packed.score()))
+    return results
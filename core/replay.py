@@ -0,0 +1,276 @@
+"""
+对局回放归档：多局对局存放在一个二进制文件中，记录发牌与每一手出牌，牌以 1 字节编号（Card.id）保存。
+文件末尾有索引，读取时 mmap 整个文件，直接定位到第 N 局第 M 手，不需要解析之前的任何内容。
+
+文件布局（小端）：
+    文件头    magic "LJTR" | u16 版本 | u16 保留 | u32 局数 | u64 局索引偏移
+    各局      局头 | 发牌 | 出牌 | 出牌索引
+    局索引    每局一个 u64：该局在文件中的偏移
+每局：
+    局头      u64 发牌种子 | i8 结果（game_over，未知为 0）| u8 保留 | u16 保留 | u32 出牌数 | u32 出牌索引偏移
+    发牌      6 个座位各 u8 张数 + 牌编号
+    出牌      每手 u8 座位 + u8 张数（0xFF 表示过牌）+ 牌编号
+    出牌索引  每手一个 u32：该手相对局起点的偏移
+局内的偏移都相对局起点，一局的字节可以原样拷贝到别的归档中。
+
+转换来源：服务端牌局日志（server/journal.py，*.journal）与托管测试日志（scripts/auto_play_logs/*.log）。
+托管测试日志没有记录发牌，按其中的种子用 deal_cards 复现；服务端 logger 的文本日志没有出牌内容，无法转换。
+
+用法：
+    python -m core.replay convert OUT INPUT...   # 转换日志为归档
+    python -m core.replay show ARCHIVE [GAME [TURN]]
+"""
+import argparse
+import json
+import mmap
+import os
+import re
+import struct
+from typing import Iterator, NamedTuple
+
+from core.card import CARDS, Card, deal_cards
+
+MAGIC = b"LJTR"
+VERSION = 1
+SKIP_LEN = 0xFF # 与 core/network/binary_codec.py 相同：张数为该值表示过牌 ['F']
+
+_FILE_HEAD = struct.Struct("<4sHHIQ")
+_GAME_HEAD = struct.Struct("<QbBHII")
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+
+
+class GameRecord(NamedTuple):
+    seed  : int              # 发牌种子，未知时为 0
+    hands : list[list[Card]] # 各座位发到的牌
+    moves : list[tuple[int, list]] # (座位, 出牌)，过牌为 ['F']
+    result: int = 0          # game_over，未知为 0
+
+
+def _encode_cards(cards: list, out: bytearray) -> None:
+    if cards == ['F']:
+        out.append(SKIP_LEN)
+        return
+    if len(cards) >= SKIP_LEN:
+        raise ValueError(f"too many cards in one list: {len(cards)}")
+    out.append(len(cards))
+    out += bytes(c.id for c in cards)
+
+
+def _decode_cards(buf, pos: int) -> tuple[list, int]:
+    n = buf[pos]
+    if n == SKIP_LEN:
+        return ['F'], pos + 1
+    pos += 1
+    return [CARDS[i] for i in buf[pos:pos + n]], pos + n
+
+
+def encode_game(game: GameRecord) -> bytes:
+    out = bytearray(_GAME_HEAD.size)
+    for hand in game.hands:
+        _encode_cards(list(hand), out)
+    offsets = []
+    for seat, cards in game.moves:
+        offsets.append(len(out))
+        out.append(seat)
+        _encode_cards(cards, out)
+    index_offset = len(out)
+    for offset in offsets:
+        out += _U32.pack(offset)
+    _GAME_HEAD.pack_into(out, 0, game.seed, game.result, 0, 0, len(offsets), index_offset)
+    return bytes(out)
+
+
+class ArchiveWriter:
+    """顺序写入各局，close 时写入局索引并回填文件头。"""
+    def __init__(self, path: str):
+        self.f = open(path, "wb")
+        self.f.write(bytes(_FILE_HEAD.size))
+        self.offsets: list[int] = []
+
+    def add(self, game: GameRecord) -> None:
+        self.offsets.append(self.f.tell())
+        self.f.write(encode_game(game))
+
+    def close(self) -> None:
+        index_offset = self.f.tell()
+        self.f.write(b"".join(_U64.pack(offset) for offset in self.offsets))
+        self.f.seek(0)
+        self.f.write(_FILE_HEAD.pack(MAGIC, VERSION, 0, len(self.offsets), index_offset))
+        self.f.close()
+
+    def __enter__(self) -> "ArchiveWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class ReplayArchive:
+    """mmap 读取归档：按局索引与出牌索引直接定位，只解码用到的部分。"""
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self.count, self.index_offset = _FILE_HEAD.unpack_from(self.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self.buf.close()
+            raise ValueError(f"not a replay archive: {path}")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _game(self, n: int) -> tuple[int, tuple]:
+        if not 0 <= n < self.count:
+            raise IndexError(f"game {n} out of range")
+        base = _U64.unpack_from(self.buf, self.index_offset + n * _U64.size)[0]
+        return base, _GAME_HEAD.unpack_from(self.buf, base)
+
+    def num_moves(self, n: int) -> int:
+        return self._game(n)[1][4]
+
+    def seed(self, n: int) -> int:
+        return self._game(n)[1][0]
+
+    def result(self, n: int) -> int:
+        return self._game(n)[1][1]
+
+    def hands(self, n: int) -> list[list[Card]]:
+        """第 n 局发到各座位的牌。"""
+        base, _ = self._game(n)
+        pos, hands = base + _GAME_HEAD.size, []
+        for _ in range(6):
+            cards, pos = _decode_cards(self.buf, pos)
+            hands.append(cards)
+        return hands
+
+    def move(self, n: int, m: int) -> tuple[int, list]:
+        """第 n 局第 m 手 (座位, 出牌)。"""
+        base, head = self._game(n)
+        num_moves, index_offset = head[4], head[5]
+        if not 0 <= m < num_moves:
+            raise IndexError(f"move {m} out of range")
+        pos = base + _U32.unpack_from(self.buf, base + index_offset + m * _U32.size)[0]
+        return self.buf[pos], _decode_cards(self.buf, pos + 1)[0]
+
+    def moves(self, n: int, start: int = 0) -> Iterator[tuple[int, list]]:
+        """从第 start 手开始依次读出，出牌在文件中是连续的，只需定位一次。"""
+        base, head = self._game(n)
+        num_moves, index_offset = head[4], head[5]
+        if not 0 <= start <= num_moves:
+            raise IndexError(f"move {start} out of range")
+        if start == num_moves:
+            return
+        pos = base + _U32.unpack_from(self.buf, base + index_offset + start * _U32.size)[0]
+        for _ in range(start, num_moves):
+            seat = self.buf[pos]
+            cards, pos = _decode_cards(self.buf, pos + 1)
+            yield seat, cards
+
+    def game(self, n: int) -> GameRecord:
+        return GameRecord(self.seed(n), self.hands(n), list(self.moves(n)), self.result(n))
+
+    def close(self) -> None:
+        self.buf.close()
+
+    def __enter__(self) -> "ReplayArchive":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# 转换
+_BY_LOG_STR = {str(c): c for c in CARDS} # 托管测试日志中的牌形如 Suits.heart_B（str(Card)）
+_LOG_TURN = re.compile(r"\[TURN\] Player(\d) (PLAY (\[.*\])|PASS|already empty)")
+
+
+def parse_auto_play_log(path: str) -> GameRecord:
+    """托管测试日志（scripts/test_auto_play.py）：[SEED] 种子，[TURN] 每手出牌；已出完牌被跳过的记为过牌。"""
+    seed, moves = None, []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("[SEED]"):
+                seed = int(line.split()[1])
+                continue
+            match = _LOG_TURN.match(line)
+            if match is None:
+                continue
+            seat, played = int(match.group(1)), match.group(3)
+            if played is None:
+                moves.append((seat, ['F']))
+            else:
+                moves.append((seat, [_BY_LOG_STR[s] for s in json.loads(played.replace("'", '"'))]))
+    if seed is None:
+        raise ValueError(f"no seed in {path}")
+    return GameRecord(seed, [sorted(hand) for hand in deal_cards(seed)], moves)
+
+
+def parse_journal(path: str) -> GameRecord:
+    """服务端牌局日志（server/journal.py）：每行一条 JSON 记录，写了一半的最后一行忽略。"""
+    seed, moves, result = None, [], 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            record = json.loads(line)
+            if record["type"] == "start":
+                seed = record["seed"]
+            elif record["type"] in ("play", "reply"):
+                cards = record["cards"]
+                moves.append((record["seat"], ['F'] if cards == "F" else [CARDS[i] for i in cards]))
+            elif record["type"] == "end":
+                result = record["game_over"]
+    if seed is None:
+        raise ValueError(f"no start record in {path}")
+    return GameRecord(seed, [sorted(hand) for hand in deal_cards(seed)], moves, result)
+
+
+def parse_log(path: str) -> GameRecord:
+    if path.endswith(".journal"):
+        return parse_journal(path)
+    return parse_auto_play_log(path)
+
+
+def _cards_str(cards: list) -> str:
+    return "PASS" if cards == ['F'] else " ".join(f"{c.suit.value or 'Joker'}_{c.get_cli_str()}" for c in cards)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='对局回放归档')
+    commands = parser.add_subparsers(dest='command', required=True)
+    convert = commands.add_parser('convert', help='convert journals / auto play logs into an archive')
+    convert.add_argument('output', help='archive path')
+    convert.add_argument('inputs', nargs='+', help='*.journal or auto play *.log files, or directories of them')
+    show = commands.add_parser('show', help='print games or moves from an archive')
+    show.add_argument('archive', help='archive path')
+    show.add_argument('game', type=int, nargs='?', help='game index')
+    show.add_argument('turn', type=int, nargs='?', help='print only this move')
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        paths = []
+        for path in args.inputs:
+            if os.path.isdir(path):
+                paths += sorted(os.path.join(path, name) for name in os.listdir(path)
+                                if name.endswith((".journal", ".log")))
+            else:
+                paths.append(path)
+        text_size = 0
+        with ArchiveWriter(args.output) as writer:
+            for path in paths:
+                writer.add(parse_log(path))
+                text_size += os.path.getsize(path)
+        print(f"{len(paths)} games: {text_size} bytes -> {os.path.getsize(args.output)} bytes")
+    else:
+        with ReplayArchive(args.archive) as archive:
+            if args.game is None:
+                for n in range(len(archive)):
+                    print(f"#{n}: seed {archive.seed(n)}, {archive.num_moves(n)} moves, result {archive.result(n)}")
+            elif args.turn is not None:
+                seat, cards = archive.move(args.game, args.turn)
+                print(f"Player{seat}: {_cards_str(cards)}")
+            else:
+                for seat, hand in enumerate(archive.hands(args.game)):
+                    print(f"deal Player{seat}: {_cards_str(hand)}")
+                for m, (seat, cards) in enumerate(archive.moves(args.game)):
+                    print(f"{m:4d} Player{seat}: {_cards_str(cards)}")
@@ -0,0 +1,91 @@
+"""
+规则校验与自动托管热路径上的追踪：默认关闭，可在运行时切换。
+
+- 按级别开关：低于当前级别的调用直接返回，不做任何格式化；
+- 延迟格式化：消息使用 % 占位符，只有真正写日志时才由 logging 格式化；
+- 采样：可只记录一部分调用，避免模拟对局时日志量过大；
+- 计数：可在内存中统计各函数的调用次数，与是否写日志无关。
+
+级别：每次决策一条的追踪（如 auto_select_cards）为 INFO，逐次校验的追踪（如 if_enough_card）为 DEBUG。
+追踪写入独立的 "core.trace" 日志器，设置级别只影响它，不会让其他库的 DEBUG 日志一并输出。
+"""
+import logging
+import random
+from collections import Counter
+
+from core.card import Card
+
+DEBUG = logging.DEBUG
+INFO  = logging.INFO
+OFF   = logging.CRITICAL + 10 # 高于所有级别，即关闭
+
+LEVEL_NAMES = {"off": OFF, "info": INFO, "debug": DEBUG}
+
+_level = OFF
+_sample_rate = 1.0
+_counters_enabled = False
+_counters: Counter = Counter()
+_logger = logging.getLogger("core.trace")
+
+
+def set_trace_level(level: int | str) -> None:
+    """设置追踪级别，可传 logging 级别或 "off"/"info"/"debug"。"""
+    global _level
+    _level = LEVEL_NAMES[level.lower()] if isinstance(level, str) else level
+    # 根日志默认只记录 INFO 及以上，只放开追踪自己的日志器
+    _logger.setLevel(_level)
+
+
+def get_trace_level() -> int:
+    return _level
+
+
+def set_trace_sample_rate(rate: float) -> None:
+    """设置采样率（0~1），1 表示记录全部调用。"""
+    global _sample_rate
+    if not 0.0 <= rate <= 1.0:
+        raise ValueError(f"sample rate must be in [0, 1], got {rate}")
+    _sample_rate = rate
+
+
+def set_trace_counters_enabled(enabled: bool) -> None:
+    global _counters_enabled
+    _counters_enabled = enabled
+
+
+def get_trace_counters() -> dict[str, int]:
+    return dict(_counters)
+
+
+def reset_trace_counters() -> None:
+    _counters.clear()
+
+
+def is_trace_enabled(level: int = DEBUG) -> bool:
+    """调用方需要额外计算日志参数时，可先用此函数判断。"""
+    return level >= _level
+
+
+def trace(func: str, msg: str, *args, level: int = DEBUG) -> None:
+    """记录一条追踪，func 为调用方函数名，msg 与 args 按 logging 的 % 方式延迟格式化。"""
+    if _counters_enabled:
+        _counters[func] += 1
+    if level < _level:
+        return
+    if _sample_rate < 1.0 and random.random() >= _sample_rate:
+        return
+    _logger.log(level, "%s: " + msg, func, *args)
+
+
+class lazy_values:
+    """将 Card 列表延迟格式化为点数列表，只在写日志时才遍历；过牌 ['F'] 等非 Card 元素原样输出。"""
+    __slots__ = ("cards",)
+
+    def __init__(self, cards):
+        self.cards = cards
+
+    def __str__(self):
+        try:
+            return str([c.value if isinstance(c, Card) else c for c in self.cards])
+        except TypeError: # 客户端发来的不是列表
+            return repr(self.cards)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+#!coding:utf-8
+"""
+广播序列化耗时对比：每个连接各自编码完整轮次信息（旧做法） vs 公共部分每轮只编码一次、每个连接只追加手牌。
+
+每轮 6 名玩家加若干旁观者，各自持有一个 RoundStream（增量协议，关键帧间隔同服务端），只统计编码耗时，不发送。
+
+用法：python scripts/bench_broadcast.py [--rounds N] [--onlookers 0 5 20] [--codec json|binary]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.network.my_network import encode_body
+from core.network.protocol import PROTOCOL_DELTA, CODECS, CODEC_BINARY, diff_round_info
+from server.broadcast import RoundStream
+from server.game_vars import Game_Var
+from server.manager import init_cards
+
+
+def snapshots(rounds: int) -> list:
+    """每轮一个新快照：当前玩家出一张牌。"""
+    g = Game_Var()
+    result = []
+    with g.game_lock:
+        init_cards(g)
+        for i in range(rounds):
+            player = i % 6
+            if len(g.users_cards[player]) == 0:
+                init_cards(g)
+            g.users_played_cards[player] = g.users_cards[player].take([next(iter(g.users_cards[player])).value])
+            g.now_player = (player + 1) % 6
+            g.users_played_cards[g.now_player] = []
+            result.append(g.snapshot())
+    return result
+
+
+def per_connection(rounds: list, seats: list[int], codec: str) -> float:
+    """旧做法：每个连接各自生成轮次信息并完整编码（增量同样按连接计算）。"""
+    last = [None] * len(seats)
+    start = time.perf_counter()
+    for i, snapshot in enumerate(rounds):
+        for j, seat in enumerate(seats):
+            round_info = snapshot.round_info(seat)
+            frame = round_info if last[j] is None or i % 16 == 0 else {"delta": diff_round_info(last[j], round_info)}
+            last[j] = round_info
+            encode_body(frame, codec)
+    return time.perf_counter() - start
+
+
+def encode_once(rounds: list, seats: list[int], codec: str) -> float:
+    streams = [RoundStream(PROTOCOL_DELTA, codec) for _ in seats]
+    start = time.perf_counter()
+    for snapshot in rounds:
+        for stream, seat in zip(streams, seats):
+            stream.bodies(snapshot, seat)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='广播序列化耗时对比')
+    parser.add_argument('--rounds', type=int, default=300, help='rounds (default: %(default)s)')
+    parser.add_argument('--onlookers', type=int, nargs='+', default=[0, 5, 20], help='onlooker counts')
+    parser.add_argument('--codec', choices=CODECS, default=CODEC_BINARY, help='codec (default: %(default)s)')
+    args = parser.parse_args()
+
+    for onlookers in args.onlookers:
+        seats = list(range(6)) + [i % 6 for i in range(onlookers)]
+        old = per_connection(snapshots(args.rounds), seats, args.codec)
+        new = encode_once(snapshots(args.rounds), seats, args.codec) # 新快照，避免复用上一次的缓存
+        print(f"{len(seats):2d} connections: per connection {old / args.rounds * 1e6:8.1f}us/round, "
+              f"encode once {new / args.rounds * 1e6:8.1f}us/round ({old / new:.1f}x)")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+#!coding:utf-8
+"""
+编码性能对比：JSON vs 二进制编码，对象为游戏结束时的完整轮次信息（含六家全部手牌）。
+
+用法：python scripts/bench_codec.py [--rounds N]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.card import generate_cards
+from core.network.my_network import encode_body, decode_body
+from core.network.protocol import CODEC_JSON, CODEC_BINARY
+
+
+def full_round_info() -> dict:
+    deck = generate_cards()
+    random.Random(0).shuffle(deck)
+    hands = [sorted(deck[i::6], key=lambda c: c.value) for i in range(6)]
+    return {
+        "game_over": 1, "users_score": [0, 35, 120, 0, 45, 0], "users_cards_num": [len(h) for h in hands],
+        "users_played_cards": [hands[0][:5], ['F'], ['F'], hands[3][:5], [], []],
+        "users_cards": hands, "client_cards": hands[0],
+        "now_score": 20, "now_player": 4, "head_master": 2,
+    }
+
+
+def bench(func, rounds: int) -> float:
+    begin = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - begin) / rounds
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='编码性能对比')
+    parser.add_argument('--rounds', type=int, default=2000, help='iterations (default: %(default)s)')
+    args = parser.parse_args()
+
+    data = full_round_info()
+    results = {}
+    for codec in (CODEC_JSON, CODEC_BINARY):
+        body = encode_body(data, codec)
+        assert decode_body(body, codec) == data
+        encode_time = bench(lambda: encode_body(data, codec), args.rounds)
+        decode_time = bench(lambda: decode_body(body, codec), args.rounds)
+        results[codec] = (len(body), encode_time, decode_time)
+        print(f"{codec:6}: {len(body):5} bytes, encode {encode_time * 1e6:7.1f} us, decode {decode_time * 1e6:7.1f} us")
+    (json_len, json_enc, json_dec), (bin_len, bin_enc, bin_dec) = results[CODEC_JSON], results[CODEC_BINARY]
+    print(f"binary vs json: {json_len / bin_len:.1f}x smaller, encode {json_enc / bin_enc:.1f}x, decode {json_dec / bin_dec:.1f}x faster")
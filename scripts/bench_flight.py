@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+#!coding:utf-8
+"""
+飞机判断性能对比：新的定长数组求解器 vs 旧的两次深拷贝启发式实现。
+
+随机生成可构成飞机的牌（含大小王替换）与随机的 5n 张牌，分别计时，
+并校验新实现在旧实现判为飞机时结果不小于旧实现（旧实现只尝试两种拆法，可能漏判或取到较小关键牌）。
+
+用法：python scripts/bench_flight.py [--rounds N] [--seed S]
+"""
+import os
+import sys
+import copy
+import time
+import random
+import argparse
+from collections import Counter
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.playingrules import CardType, if_flight, try_transform_cards
+
+
+# ---------- 旧实现（仅用于对比） ----------
+# 尝试将最小牌作为飞机中的三张或对子，返回（能否，剩余王数）
+def try_min_card_type(card_num, rg, joker_num, try_num):
+    for i in rg:
+        if card_num.get(i, 0) < try_num:
+            joker_num -= try_num - card_num.get(i, 0)
+        if joker_num < 0:  # 大小王不够替换
+            return False, 0
+        if i in card_num:
+            card_num[i] = max(card_num[i] - try_num, 0)
+    return True, joker_num
+
+
+# 判断是否为飞机，返回（出牌类型，关键牌，转换后牌）
+def legacy_if_flight(cards, card_num, joker_num):
+    # 至少10张牌，且为5的倍数
+    if len(cards) < 10 or len(cards) % 5 != 0:
+        return CardType.illegal_type, 0
+
+    triple_pair_num = int(len(cards) // 5)
+    if triple_pair_num > 12:
+        return CardType.illegal_type, 0
+
+    rg = range(14, 14 - triple_pair_num, -1) \
+        if cards[-1] + triple_pair_num - 1 > 14 else range(cards[-1], cards[-1] + triple_pair_num)
+
+    _card_num = copy.deepcopy(card_num)
+    key_card = 0
+
+    # 尝试将最小牌作为对子
+    if_pairs, _joker_num = try_min_card_type(_card_num, rg, joker_num, 2)
+    if if_pairs:
+        min_pair_card = 0
+        # 找到剩余非王牌中最小牌
+        for i in range(cards[-1], cards[joker_num] + 1):
+            if _card_num.get(i, 0) > 0:
+                min_pair_card = i
+                break
+
+        # 若没找到，则尝试用王作为所有三张
+        if min_pair_card == 0:
+            # 王必须数量刚好
+            if _joker_num == triple_pair_num * 3:
+                return CardType.flight, 14
+        # 其它情况正常凑连三张
+        else:
+            _rg = range(14, 14 - triple_pair_num, -1) \
+                if min_pair_card + triple_pair_num - 1 > 14 else range(min_pair_card, min_pair_card + triple_pair_num)
+
+            # 凑成功则记录该连三张的最大张作为关键牌
+            if try_transform_cards(_card_num, _rg, _joker_num, 3):
+                key_card = max(list(_rg))
+
+    _card_num = copy.deepcopy(card_num)
+    _key_card = 0
+
+    # 尝试将最小牌作为三张
+    if_triples, _joker_num = try_min_card_type(_card_num, rg, joker_num, 3)
+    if if_triples:
+        # 将凑出的连三张中最大张作为关键牌
+        _key_card = max(list(rg))
+
+        min_pair_card = 0
+        # 找到剩余非王牌中最小牌
+        for i in range(cards[-1], cards[joker_num] + 1):
+            if _card_num.get(i, 0) > 0:
+                min_pair_card = i
+                break
+
+        # 若没找到，则尝试用王作为所有对子
+        if min_pair_card == 0:
+            # 王必须数量刚好
+            # 凑失败则清除关键牌
+            if _joker_num != triple_pair_num * 2:
+                _key_card = 0
+        # 其它情况正常凑连对
+        else:
+            _rg = range(14, 14 - triple_pair_num, -1) \
+                if min_pair_card + triple_pair_num - 1 > 14 else range(min_pair_card, min_pair_card + triple_pair_num)
+
+            # 凑失败则清除关键牌
+            if try_transform_cards(_card_num, _rg, _joker_num, 2) is False:
+                _key_card = 0
+
+    # 取两次尝试中较大牌型
+    if key_card >= _key_card and key_card != 0:
+        return CardType.flight, key_card
+    elif key_card < _key_card:
+        return CardType.flight, _key_card
+    else:
+        return CardType.illegal_type, 0
+
+
+# ---------- 测试数据 ----------
+
+def random_flight(rnd: random.Random) -> list[int]:
+    """随机生成一手飞机：n 组连三张 + n 组连对，再随机把若干张替换成大小王。"""
+    n = rnd.randint(2, 6)
+    start = rnd.randint(3, 15 - n)
+    pair_start = rnd.randint(3, 15 - n)
+    cards = [v for v in range(start, start + n) for _ in range(3)]
+    cards += [v for v in range(pair_start, pair_start + n) for _ in range(2)]
+    for i in rnd.sample(range(len(cards)), rnd.randint(0, min(4, len(cards)))):
+        cards[i] = rnd.choice([16, 17])
+    return sorted(cards, reverse=True)
+
+
+def random_hand(rnd: random.Random) -> list[int]:
+    n = rnd.randint(2, 6)
+    base = rnd.randint(3, 10)
+    return sorted((rnd.choice(range(base, min(base + n + 2, 15))) if rnd.random() > 0.1 else rnd.choice([16, 17])
+                   for _ in range(5 * n)), reverse=True)
+
+
+def prepare(cards: list[int]):
+    card_num = dict(Counter(cards))
+    joker_num = card_num.get(16, 0) + card_num.get(17, 0)
+    return cards, card_num, joker_num
+
+
+def bench(func, samples) -> float:
+    begin = time.perf_counter()
+    for args in samples:
+        func(*args)
+    return time.perf_counter() - begin
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='飞机判断性能对比')
+    parser.add_argument('--rounds', type=int, default=20000, help='samples (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=1, help='random seed (default: %(default)s)')
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    samples = [prepare(random_flight(rnd) if i % 2 == 0 else random_hand(rnd)) for i in range(args.rounds)]
+
+    found, improved = 0, 0
+    for cards, card_num, joker_num in samples:
+        old_type, old_key = legacy_if_flight(cards, card_num, joker_num)
+        new_type, new_key = if_flight(cards, card_num, joker_num)
+        if old_type is CardType.flight:
+            assert new_type is CardType.flight and new_key >= old_key, (cards, old_key, new_key)
+        if new_type is CardType.flight:
+            found += 1
+            improved += old_type is not CardType.flight or new_key > old_key
+
+    legacy_time = bench(legacy_if_flight, samples)
+    new_time = bench(if_flight, samples)
+    print(f"samples: {len(samples)}, flights: {found}, better than legacy: {improved}")
+    print(f"legacy: {legacy_time * 1e6 / len(samples):.2f} us/call")
+    print(f"new   : {new_time * 1e6 / len(samples):.2f} us/call ({legacy_time / new_time:.1f}x)")
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+#!coding:utf-8
+"""
+跟牌决策性能对比：auto_select_cards 的跟牌快速路径 vs 依次尝试全部生成器。
+
+随机发一手 36 张的手牌，再从另一手牌的合法出牌中随机取一手作为上家出牌，
+分别统计每次决策校验的候选数与耗时，并校验两条路径选出的牌一致。
+
+用法：python scripts/bench_follow.py [--rounds N] [--seed S]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core import playingrules
+from core.auto_play import strategy
+from core.card import generate_cards
+from core.FieldInfo import FieldInfo
+from core.legal_moves import iter_legal_moves
+
+_validated = 0
+_validate_many = playingrules.validate_many
+
+
+def counting_validate_many(candidates, hand, last_played):
+    global _validated
+    _validated += len(candidates)
+    return _validate_many(candidates, hand, last_played)
+
+
+def random_decision(rnd: random.Random) -> FieldInfo:
+    cards = generate_cards()
+    rnd.shuffle(cards)
+    hand = sorted(cards[:36], key=lambda c: c.value)
+    other = sorted(cards[36:72], key=lambda c: c.value)
+    moves = list(iter_legal_moves(other))
+    last = rnd.choice(moves)
+    played = [[] for _ in range(6)]
+    played[1] = last
+    return FieldInfo(
+        True, True, 0, hand, [str(i) for i in range(6)], [0] * 6, [36] * 6, [[]] * 6,
+        played, -1, 0, 0, 1, 0, 1,
+    )
+
+
+def run(infos: list[FieldInfo], fast: bool):
+    global _validated
+    strategy.set_fast_follow_enabled(fast)
+    _validated = 0
+    begin = time.perf_counter()
+    choices = [strategy.auto_select_cards(info) for info in infos]
+    return choices, _validated, time.perf_counter() - begin
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='跟牌决策性能对比')
+    parser.add_argument('--rounds', type=int, default=200, help='decisions (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=1, help='random seed (default: %(default)s)')
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    infos = [random_decision(rnd) for _ in range(args.rounds)]
+    playingrules.validate_many = counting_validate_many
+
+    full_choices, full_count, full_time = run(infos, False)
+    fast_choices, fast_count, fast_time = run(infos, True)
+    for full, fast in zip(full_choices, fast_choices):
+        assert full == fast, (full, fast)
+
+    n = len(infos)
+    print(f"decisions: {n}, passes: {sum(c is None for c in fast_choices)}")
+    print(f"all generators: {full_count / n:.1f} validations/decision, {full_time * 1e6 / n:.1f} us/decision")
+    print(f"fast follow   : {fast_count / n:.1f} validations/decision, {fast_time * 1e6 / n:.1f} us/decision "
+          f"({full_time / fast_time:.1f}x)")
@@ -0,0 +1,337 @@
+#!/usr/bin/env python
+#!coding:utf-8
+"""
+无界面压力测试：每个机器人客户端是一个协程，用 auto_select_cards 出牌，同时驱动多桌对局。
+
+默认在本机空闲端口启动一个服务端子进程（--tables 与机器人数一致，输出丢弃），也可以用 --port 连接已有的服务端。
+每个机器人打完 --games 局后退出；所有桌都满时新连接会成为旁观者，机器人断开后稍等重试，不计入对局。
+--reconnect-rate 为每次轮到出牌时断线并用 cookie 重连的概率；出错断线时同样用 cookie 重连（该局已结束时加入下一局）。
+--timeout 秒内所有桌都没有进展时放弃，防止服务端卡住时压测一直挂起。
+
+统计：
+- 每分钟完成局数；
+- 出牌延迟：发出出牌到收到下一帧轮次信息的时间，p50/p95/p99；
+- 每局收发字节数（含 4 字节长度头，所有机器人合计）；
+- 错误数（按异常类型）、重连次数、成为旁观者后重试的次数。
+
+用法：python scripts/bench_load.py [--tables N] [--games N] [--reconnect-rate P]
+                                    [--protocol 1-4] [--codec json|binary] [--asyncio] [--server-args="..."]
+      python scripts/bench_load.py --port 8080 --tables 4   # 连接已有的服务端
+"""
+import os
+import sys
+import time
+import shlex
+import random
+import socket
+import asyncio
+import argparse
+import subprocess
+from collections import Counter
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.card_io import calculate_score, last_played
+from core.auto_play.strategy import auto_select_cards
+from core.FieldInfo import FieldInfo
+from core.hand import Hand
+from core.network.my_network import HEADER, MAX_BODY_LEN, decode_body, encode_body, write_frame_to_stream
+from core.network.protocol import (
+    PROTOCOL_LEGACY, PROTOCOL_VERSION, PROTOCOL_PLAY_ONLY, CODECS, CODEC_JSON, CODEC_BINARY, make_hello,
+    apply_round_frame,
+)
+from core.playingrules import classify_play
+
+MAX_ERRORS = 5 # 机器人连续出错次数上限，超过后退出
+
+
+class Stats:
+    def __init__(self):
+        self.games = 0        # 收到的 game_over 数，每局 6 个
+        self.latencies = []   # 出牌延迟（秒）
+        self.bytes_sent = 0
+        self.bytes_recv = 0
+        self.reconnects = 0
+        self.onlooker_retries = 0
+        self.errors = Counter()
+        self.progress_at = time.monotonic() # 最近一次有机器人在对局中收到轮次信息的时间
+
+    def stalled(self, timeout: float) -> bool:
+        return time.monotonic() - self.progress_at > timeout
+
+
+class Rejoin(Exception):
+    """用 cookie 重连时服务端还未发现旧连接断开，稍后再试。"""
+
+
+class LoadBot:
+    def __init__(self, stats: Stats, host: str, port: int, name: str, protocol: int, codec: str,
+                 reconnect_rate: float, timeout: float, rng: random.Random):
+        self.stats = stats
+        self.host = host
+        self.port = port
+        self.name = name
+        self.protocol = protocol
+        self.hello_codec = codec
+        self.reconnect_rate = reconnect_rate
+        self.timeout = timeout
+        self.rng = rng
+        self.writer = None
+        self.cookie = None
+        self.games_played = 0
+
+    async def send(self, data) -> None:
+        body = encode_body(data, self.codec)
+        write_frame_to_stream(body, self.writer)
+        self.stats.bytes_sent += HEADER.size + len(body)
+
+    async def read(self, n: int) -> bytes:
+        """
+        在大厅或轮到别人时可能要等其他桌打完一局，所以只在 timeout 秒内所有桌都没有进展时才放弃。
+        超时取消的 readexactly 不消费缓冲区中的数据，可以直接重试。
+        """
+        while True:
+            try:
+                return await asyncio.wait_for(self.reader.readexactly(n), self.timeout)
+            except asyncio.TimeoutError:
+                if self.stats.stalled(self.timeout):
+                    raise
+
+    async def recv(self):
+        body_len = HEADER.unpack(await self.read(HEADER.size))[0]
+        if body_len < 0 or body_len > MAX_BODY_LEN:
+            raise ValueError(f"Invalid body length: {body_len}")
+        body = await self.read(body_len)
+        self.stats.bytes_recv += HEADER.size + body_len
+        return decode_body(body, self.codec)
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    async def connect(self) -> None:
+        """
+        与 scripts/test_async_server.py 的 Bot.connect 相同的握手、登录与开局流程。
+        cookie 已失效（该局已结束）时服务端按新玩家处理，机器人随之加入下一局。
+        """
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.get_extra_info("socket").setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.codec = CODEC_JSON
+        if self.protocol > PROTOCOL_LEGACY:
+            await self.send(make_hello(self.protocol, self.hello_codec))
+            self.codec = (await self.recv())["codec"]
+        await self.send(self.cookie is not None)
+        if self.cookie is not None:
+            await self.send(self.cookie)
+            if await self.recv() is True:
+                if await self.recv() is False: # 服务端还未发现旧连接断开
+                    self.close()
+                    raise Rejoin()
+            else:
+                self.cookie = None
+        else:
+            await self.recv()
+        if self.cookie is None:
+            await self.send(self.name)
+            self.cookie = await self.recv() # 旁观者为 None
+        while len(await self.recv()) < 6: # 等待大厅
+            await self.recv()
+        await self.recv()
+        self.is_player = await self.recv()
+        await self.recv()
+        self.seat = await self.recv()
+        self.round_info = None
+
+    async def recv_round_info(self) -> dict:
+        if self.protocol > PROTOCOL_LEGACY:
+            self.round_info = apply_round_frame(self.round_info, await self.recv())
+            return self.round_info
+        keys = ["game_over", "users_score", "users_cards_num", "users_played_cards"]
+        info = {key: await self.recv() for key in keys}
+        if info["game_over"] != 0:
+            info["users_cards"] = await self.recv()
+        for key in ["client_cards", "now_score", "now_player", "head_master"]:
+            info[key] = await self.recv()
+        return info
+
+    def select(self, info: dict, hand: Hand) -> list:
+        """与客户端 --simulate 相同：auto_select_cards 选出的牌，没有能出的牌时过牌。"""
+        played_cards = info["users_played_cards"]
+        last_player = last_played(played_cards, self.seat)
+        field = FieldInfo(
+            start_flag=True, is_player=True, client_id=self.seat, client_cards=hand,
+            user_names=[""] * 6, user_scores=[0] * 6, users_cards_num=[0] * 6, users_cards=[[]] * 6,
+            users_played_cards=played_cards, head_master=-1, now_score=0, now_player=self.seat,
+            last_player=last_player, his_now_score=0, his_last_player=None,
+            last_play=None if last_player == self.seat else classify_play(played_cards[last_player]),
+        )
+        selected = auto_select_cards(field)
+        return ['F'] if selected is None else selected
+
+    async def play(self, info: dict) -> None:
+        hand = Hand(info["client_cards"])
+        played = self.select(info, hand)
+        await self.send(False) # 心跳
+        await self.send(True)
+        if self.protocol >= PROTOCOL_PLAY_ONLY:
+            await self.send(played)
+        else:
+            if played != ['F']:
+                hand.remove_cards(played)
+            await self.send(hand.to_list())
+            await self.send(played)
+            await self.send(info["now_score"] + (0 if played == ['F'] else calculate_score(played)))
+        await self.writer.drain()
+
+    async def join(self) -> None:
+        """入座；重连失败（旧连接未断开）时稍后再试，所有桌都满成为旁观者时断开后重新加入。"""
+        while True:
+            try:
+                await self.connect()
+            except Rejoin:
+                await asyncio.sleep(0.05)
+                continue
+            if self.is_player:
+                return
+            self.close()
+            self.cookie = None
+            self.stats.onlooker_retries += 1
+            if self.stats.stalled(self.timeout): # 没有桌会空出来
+                raise asyncio.TimeoutError()
+            await asyncio.sleep(0.1)
+
+    async def play_game(self) -> None:
+        """打到本局结束；断线（主动或出错）后用 cookie 重连，重连后会重新收到当前轮次信息。"""
+        sent_at = None
+        while True:
+            info = await self.recv_round_info()
+            self.stats.progress_at = time.monotonic()
+            if sent_at is not None:
+                self.stats.latencies.append(time.perf_counter() - sent_at)
+                sent_at = None
+            if info["game_over"] != 0:
+                self.stats.games += 1
+                self.games_played += 1
+                self.cookie = None
+                break
+            if info["now_player"] != self.seat:
+                continue
+            if self.rng.random() < self.reconnect_rate:
+                self.close()
+                self.stats.reconnects += 1
+                await self.join()
+                continue
+            await self.play(info)
+            sent_at = time.perf_counter()
+        self.close()
+
+    async def run(self, games: int) -> None:
+        errors = 0 # 连续出错次数
+        while self.games_played < games:
+            try:
+                if self.cookie is not None:
+                    self.stats.reconnects += 1
+                await self.join()
+                await self.play_game()
+                errors = 0
+            except asyncio.TimeoutError:
+                self.close()
+                self.stats.errors["TimeoutError"] += 1
+                return # 服务端已无响应
+            except Exception as e:
+                self.close()
+                self.stats.errors[type(e).__name__] += 1
+                errors += 1
+                if errors >= MAX_ERRORS:
+                    return
+                await asyncio.sleep(0.1)
+
+
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, args) -> subprocess.Popen:
+    """服务端子进程：单独的进程与 GIL，不与机器人争用 CPU；stdin 仍是当前终端（服务端启动时需要）。"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    cmd = [sys.executable, "-m", "server", "--ip", "127.0.0.1", "--port", str(port), "--tables", str(args.tables)]
+    if args.asyncio:
+        cmd.append("--asyncio")
+    cmd += shlex.split(args.server_args)
+    server = subprocess.Popen(cmd, cwd=root, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                              start_new_session=True) # Ctrl-C 只中断压测，由压测结束服务端
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited with {server.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("server did not start listening")
+
+
+async def run_bots(args, port: int, stats: Stats) -> None:
+    rng = random.Random(args.seed)
+    bots = [LoadBot(stats, args.host, port, f"bot{i}", args.protocol, args.codec, args.reconnect_rate, args.timeout,
+                    random.Random(rng.random())) for i in range(args.tables * 6)]
+    await asyncio.gather(*(bot.run(args.games) for bot in bots))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多桌压力测试')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=None, help='connect to a running server instead of starting one')
+    parser.add_argument('--tables', type=int, default=10, help='tables played at once, 6 bots each (default: %(default)s)')
+    parser.add_argument('--games', type=int, default=3, help='games per bot (default: %(default)s)')
+    parser.add_argument('--protocol', type=int, choices=range(PROTOCOL_LEGACY, PROTOCOL_VERSION + 1),
+                        default=PROTOCOL_VERSION)
+    parser.add_argument('--codec', choices=CODECS, default=CODEC_BINARY)
+    parser.add_argument('--reconnect-rate', type=float, default=0.0,
+                        help='chance to disconnect and reconnect with the cookie on each turn')
+    parser.add_argument('--timeout', type=float, default=60.0,
+                        help='give up when no table has made progress for this many seconds (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--asyncio', action='store_true', help='start the asyncio server')
+    parser.add_argument('--server-args', default='', help='extra arguments for the started server; use the = form, e.g. --server-args="--auto-pass -s"')
+    args = parser.parse_args()
+
+    port = args.port if args.port is not None else free_port()
+    server = start_server(port, args) if args.port is None else None
+    stats = Stats()
+    start = time.perf_counter()
+    try:
+        asyncio.run(run_bots(args, port, stats))
+    except KeyboardInterrupt:
+        print("interrupted")
+    finally:
+        elapsed = time.perf_counter() - start
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    games = stats.games / 6
+    target = f"server {args.host}:{port}" if server is None else f"{'asyncio' if args.asyncio else 'threaded'} server"
+    print(f"bots {args.tables * 6}, tables {args.tables}, protocol {args.protocol}, codec {args.codec}, {target}")
+    print(f"games      : {games:g} in {elapsed:.1f}s, {games / elapsed * 60:.1f} games/min")
+    print(f"turn (ms)  : p50 {percentile(stats.latencies, 50) * 1e3:.2f}  p95 {percentile(stats.latencies, 95) * 1e3:.2f}"
+          f"  p99 {percentile(stats.latencies, 99) * 1e3:.2f}  ({len(stats.latencies)} plays)")
+    if games:
+        print(f"bytes/game : sent {stats.bytes_sent / games:.0f}  received {stats.bytes_recv / games:.0f}")
+    print(f"reconnects : {stats.reconnects}, onlooker retries: {stats.onlooker_retries}")
+    print(f"errors     : {sum(stats.errors.values())} {dict(stats.errors) if stats.errors else ''}")
+
+
+if __name__ == '__main__':
+    main()
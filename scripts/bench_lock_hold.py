@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+#!coding:utf-8
+"""
+game_lock 持有时间对比：持锁发送轮次信息（旧做法） vs 持锁只取快照、锁外序列化发送。
+
+每轮向 6 名玩家与 1 名旁观者发送轮次信息（旧版协议逐字段发送、JSON 编码），对端由后台线程读取。
+
+用法：python scripts/bench_lock_hold.py [--rounds N]
+"""
+import os
+import sys
+import socket
+import argparse
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.network.my_network import send_frame
+from server.broadcast import RoundStream
+from server.game_vars import Game_Var
+from server.instrument import set_lock_stats_enabled
+from server.manager import init_cards
+
+
+def drain(sock: socket.socket) -> None:
+    try:
+        while sock.recv(1 << 16):
+            pass
+    except OSError:
+        pass
+
+
+def send(snapshot, sockets) -> None:
+    for seat, sock in enumerate(sockets):
+        for body in RoundStream().bodies(snapshot, seat % 6):
+            send_frame(sock, body)
+
+
+def run(g: Game_Var, sockets, rounds: int, send_under_lock: bool):
+    g.game_lock.stats.reset()
+    for _ in range(rounds):
+        if send_under_lock:
+            with g.game_lock:
+                send(g.snapshot(), sockets)
+        else:
+            with g.game_lock:
+                snapshot = g.snapshot()
+            send(snapshot, sockets)
+    stats = g.game_lock.stats
+    return str(stats), stats.hold_total / stats.count, stats.hold_max
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='game_lock 持有时间对比')
+    parser.add_argument('--rounds', type=int, default=500, help='rounds (default: %(default)s)')
+    args = parser.parse_args()
+
+    g = Game_Var()
+    with g.game_lock:
+        init_cards(g)
+    pairs = [socket.socketpair() for _ in range(7)]
+    for _, peer in pairs:
+        threading.Thread(target=drain, args=(peer,), daemon=True).start()
+    sockets = [sock for sock, _ in pairs]
+
+    set_lock_stats_enabled(True)
+    old, old_avg, old_max = run(g, sockets, args.rounds, True)
+    print(f"send under lock : {old}")
+    new, new_avg, new_max = run(g, sockets, args.rounds, False)
+    print(f"snapshot only   : {new}")
+    print(f"average hold {old_avg / new_avg:.0f}x shorter, max hold {old_max / new_max:.0f}x shorter")
+    for sock, peer in pairs:
+        sock.close()
+        peer.close()
@@ -0,0 +1,193 @@
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.card_io import calculate_score
+from core.hand import Hand
+from core.network.my_network import send_data_to_socket, recv_data_from_socket, set_socket_codec
+from core.network.protocol import PROTOCOL_VERSION, PROTOCOL_LEGACY, PROTOCOL_PLAY_ONLY, CODEC_BINARY, make_hello, apply_round_frame
+from server.async_server import AsyncGameServer
+
+
+class Bot:
+    """
+    最简单的无界面客户端：轮到自己且场上没有别人的牌时打出最小点数的全部牌，否则过牌。
+    disconnect_after 次出牌后断开并用 cookie 重连；malformed_after 次出牌后发送格式错误的回复，被断开后同样重连。
+    """
+    def __init__(self, port: int, name: str, protocol: int = PROTOCOL_VERSION, disconnect_after: int = None,
+                 malformed_after: int = None):
+        self.port = port
+        self.name = name
+        self.protocol = protocol
+        self.disconnect_after = disconnect_after
+        self.malformed_after = malformed_after
+        self.cookie = None
+        self.is_player = None
+        self.game_over = 0
+        self.reconnected = False
+        self.error = None
+
+    def connect(self):
+        self.sock = socket.create_connection(("127.0.0.1", self.port), timeout=20)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self.protocol > PROTOCOL_LEGACY:
+            send_data_to_socket(make_hello(self.protocol, CODEC_BINARY), self.sock)
+            reply = recv_data_from_socket(self.sock)
+            set_socket_codec(self.sock, reply["codec"])
+        send_data_to_socket(self.cookie is not None, self.sock)
+        if self.cookie is not None:
+            send_data_to_socket(self.cookie, self.sock)
+            assert recv_data_from_socket(self.sock) is True
+            if recv_data_from_socket(self.sock) is False: # 服务端还未发现旧连接断开
+                self.sock.close()
+                return False
+        else:
+            assert recv_data_from_socket(self.sock) is False
+            send_data_to_socket(self.name, self.sock)
+            self.cookie = recv_data_from_socket(self.sock)
+        while len(recv_data_from_socket(self.sock)) < 6: # 等待大厅
+            recv_data_from_socket(self.sock)
+        recv_data_from_socket(self.sock)
+        self.is_player = recv_data_from_socket(self.sock)
+        recv_data_from_socket(self.sock)
+        self.seat = recv_data_from_socket(self.sock)
+        self.round_info = None
+        return True
+
+    def recv_round_info(self) -> dict:
+        if self.protocol > PROTOCOL_LEGACY:
+            self.round_info = apply_round_frame(self.round_info, recv_data_from_socket(self.sock))
+            return self.round_info
+        keys = ["game_over", "users_score", "users_cards_num", "users_played_cards"]
+        info = {key: recv_data_from_socket(self.sock) for key in keys}
+        if info["game_over"] != 0:
+            info["users_cards"] = recv_data_from_socket(self.sock)
+        for key in ["client_cards", "now_score", "now_player", "head_master"]:
+            info[key] = recv_data_from_socket(self.sock)
+        return info
+
+    def play(self, info: dict, malformed: bool = False):
+        hand = Hand(info["client_cards"])
+        others = [pile for i, pile in enumerate(info["users_played_cards"]) if i != self.seat]
+        if any(others):
+            played = ['F']
+        else:
+            value = next(iter(hand)).value
+            played = hand.take([value] * hand.count(value))
+        send_data_to_socket(False, self.sock) # 心跳
+        send_data_to_socket(True, self.sock)
+        if self.protocol >= PROTOCOL_PLAY_ONLY:
+            send_data_to_socket(played, self.sock)
+            return
+        send_data_to_socket(len(hand) if malformed else hand.to_list(), self.sock) # 手牌应为列表
+        send_data_to_socket(played, self.sock)
+        send_data_to_socket(info["now_score"] + (0 if played == ['F'] else calculate_score(played)), self.sock)
+
+    def run(self):
+        try:
+            self.connect()
+            plays = 0
+            while True:
+                info = self.recv_round_info()
+                if info["game_over"] != 0:
+                    self.game_over = info["game_over"]
+                    break
+                if self.is_player and info["now_player"] == self.seat:
+                    if plays in (self.disconnect_after, self.malformed_after) and not self.reconnected:
+                        if plays == self.malformed_after:
+                            self.play(info, malformed=True)
+                        self.sock.close()
+                        self.reconnected = True
+                        while not self.connect(): # 重连后会重新收到当前轮次信息
+                            time.sleep(0.05)
+                        continue
+                    self.play(info)
+                    plays += 1
+            self.sock.close()
+        except Exception as e:
+            self.error = e
+
+
+class TestAsyncServer(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.game_server = AsyncGameServer(static_user_order=True, max_tables=2)
+        self.server = self.loop.run_until_complete(self.game_server.start("127.0.0.1", 0))
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        async def shutdown():
+            self.server.close()
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+        self.loop.close()
+
+    def wait_seated(self, table: int):
+        while len(self.game_server.tables) <= table or self.game_server.tables[table].g.users_num < 6:
+            time.sleep(0.01)
+
+    def start_bots(self, bots: list[Bot]) -> list[threading.Thread]:
+        threads = [threading.Thread(target=bot.run) for bot in bots]
+        for t in threads:
+            t.start()
+        return threads
+
+    def join_bots(self, bots: list[Bot], threads: list[threading.Thread]):
+        for t in threads:
+            t.join(60)
+        for bot in bots:
+            self.assertIsNone(bot.error, bot.name)
+            self.assertNotEqual(bot.game_over, 0, bot.name)
+
+    def test_two_tables_with_reconnect(self):
+        # 两桌同时进行，其中一桌混用旧版协议，且有玩家中途断线重连
+        bots = [Bot(self.port, f"a{i}", disconnect_after=3 if i == 0 else None) for i in range(6)]
+        threads = self.start_bots(bots)
+        self.wait_seated(0)
+        bots += [Bot(self.port, f"b{i}", PROTOCOL_LEGACY if i % 2 else PROTOCOL_VERSION) for i in range(6)]
+        threads += self.start_bots(bots[6:])
+        self.join_bots(bots, threads)
+        self.assertTrue(bots[0].reconnected)
+        self.assertEqual(len(self.game_server.tables), 2)
+        self.assertEqual(len({bot.game_over for bot in bots[:6]}), 1)
+        deadline = time.time() + 5
+        while self.game_server.cookies and time.time() < deadline: # 服务端发完结算信息后才清理
+            time.sleep(0.01)
+        self.assertEqual(self.game_server.cookies, {}) # 结束后 cookie 失效
+
+    def test_onlooker(self):
+        self.game_server.max_tables = 1
+        players = [Bot(self.port, f"p{i}") for i in range(6)]
+        threads = self.start_bots(players)
+        self.wait_seated(0)
+        onlooker = Bot(self.port, "watcher")
+        onlooker.run()
+        self.join_bots(players, threads)
+        self.assertIsNone(onlooker.error)
+        self.assertFalse(onlooker.is_player)
+        self.assertIsNone(onlooker.cookie)
+        self.assertEqual(onlooker.game_over, players[0].game_over)
+
+    def test_malformed_reply(self):
+        # 旧版客户端回复的手牌不是列表：服务端断开该连接，牌局照常进行，重连后打完
+        self.game_server.max_tables = 1
+        bots = [Bot(self.port, f"m{i}", PROTOCOL_LEGACY, malformed_after=2 if i == 0 else None) for i in range(6)]
+        threads = self.start_bots(bots)
+        self.join_bots(bots, threads)
+        self.assertTrue(bots[0].reconnected)
+        self.assertEqual(len({bot.game_over for bot in bots}), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -282,3 +282,34 @@ def test_auto_play_full_game(seed, enable_log):
     assert len(scores) == 6
     assert all(s >= 0 for s in scores)
 
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_fast_follow_matches_full_search(seed):
+    """跟牌快速路径与依次尝试全部生成器选出的牌一致（含三带二生成器凑出的 AAA00 炸弹）。"""
+    from core.auto_play import strategy
+    from core.legal_moves import iter_legal_moves
+
+    rng = random.Random(seed)
+    cases = [(
+        [Card(Suits.spade, 3)] * 4 + [Card(Suits.empty, 16)] * 2,
+        [Card(Suits.spade, v) for v in (9, 9, 10, 10, 11, 12, 12)] + [Card(Suits.empty, 17)],
+    )]
+    for _ in range(20):
+        cards = generate_cards()
+        rng.shuffle(cards)
+        moves = list(iter_legal_moves(sorted(cards[36:54], key=lambda c: c.value)))
+        cases.append((sorted(cards[:36], key=lambda c: c.value), rng.choice(moves)))
+
+    try:
+        for hand, last in cases:
+            played = [[] for _ in range(6)]
+            played[1] = last
+            info = FieldInfo(True, True, 0, hand, [""] * 6, [0] * 6, [len(hand)] * 6, [[]] * 6,
+                             played, -1, 0, 0, 1, 0, 1)
+            strategy.set_fast_follow_enabled(False)
+            full = auto_select_cards(info)
+            strategy.set_fast_follow_enabled(True)
+            assert auto_select_cards(info) == full
+    finally:
+        strategy.set_fast_follow_enabled(True)
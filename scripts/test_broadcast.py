@@ -0,0 +1,107 @@
+import os
+import sys
+import threading
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.network.my_network import decode_body
+from core.network.protocol import (
+    PROTOCOLS, PROTOCOL_LEGACY, PROTOCOL_DELTA, CODECS, CODEC_JSON, ROUND_INFO_FIELDS, apply_round_frame,
+)
+from server.broadcast import RoundStream, SpectatorFeed
+from server.game_vars import Game_Var
+from server.manager import init_cards, apply_player_reply, get_next_turn
+
+
+def play_turn(g: Game_Var) -> None:
+    """当前玩家打出手里最小的一张牌（或过牌），然后轮到下一位。"""
+    player = g.now_player
+    if g.last_player == -1 or g.last_player == player:
+        value = next(iter(g.users_cards[player])).value
+        played = g.users_cards[player].take([value])
+    else:
+        played = ['F']
+    apply_player_reply(player, list(g.users_cards[player]), played, g.now_score, g)
+    get_next_turn(g)
+
+
+class TestBroadcast(unittest.TestCase):
+    def receive(self, stream: RoundStream, state, bodies):
+        """模拟客户端：解码帧并还原完整的轮次信息。"""
+        frames = [decode_body(body, stream.codec) for body in bodies]
+        if stream.protocol == PROTOCOL_LEGACY:
+            fields = [f for f in ROUND_INFO_FIELDS if f != "users_cards" or len(frames) == len(ROUND_INFO_FIELDS)]
+            return dict(zip(fields, frames))
+        self.assertEqual(len(frames), 1)
+        return apply_round_frame(state, frames[0])
+
+    def test_streams_match_round_info(self):
+        g = Game_Var()
+        with g.game_lock:
+            init_cards(g)
+        streams = [(RoundStream(p, c, keyframe_interval=4), seat) for p in PROTOCOLS for c in CODECS
+                   if p > PROTOCOL_LEGACY or c == CODEC_JSON for seat in range(6)]
+        states = [None] * len(streams)
+        for turn in range(12):
+            with g.game_lock:
+                snapshot = g.snapshot()
+                self.assertIs(g.snapshot(), snapshot) # 状态未变时共用同一个快照
+            for i, (stream, seat) in enumerate(streams):
+                states[i] = self.receive(stream, states[i], stream.bodies(snapshot, seat))
+                self.assertEqual(states[i], snapshot.round_info(seat), (stream.protocol, stream.codec, turn))
+            with g.game_lock:
+                play_turn(g)
+        # 公共部分每种编码只编码一次：关键帧、增量各一份，与连接数无关
+        kinds = [key[0] for key in snapshot.encoded if len(key) == 2]
+        self.assertEqual(sorted(kinds), sorted(["legacy"] + ["keyframe"] * len(CODECS)))
+
+        with g.game_lock:
+            g.game_over = 1
+            snapshot = g.snapshot()
+        for i, (stream, seat) in enumerate(streams):
+            state = self.receive(stream, states[i], stream.bodies(snapshot, seat))
+            self.assertEqual(len(state["users_cards"]), 6)
+            self.assertEqual(state, snapshot.round_info(seat))
+
+    def test_delta_omits_unchanged_hand(self):
+        g = Game_Var()
+        with g.game_lock:
+            init_cards(g)
+            first = g.snapshot()
+            g.now_player = 1
+            second = g.snapshot()
+        self.assertEqual(second.version, first.version + 1)
+        for codec in CODECS:
+            stream = RoundStream(PROTOCOL_DELTA, codec)
+            stream.bodies(first, 0)
+            (body,) = stream.bodies(second, 0)
+            self.assertEqual(decode_body(body, codec), {"delta": {"now_player": 1}})
+
+
+class TestSpectatorFeed(unittest.TestCase):
+    def test_coalesce_and_rounds(self):
+        g = Game_Var()
+        feed = SpectatorFeed()
+        with g.game_lock:
+            init_cards(g)
+            snapshots = []
+            for _ in range(3):
+                snapshots.append(g.snapshot())
+                play_turn(g)
+        # 旁观者还没取时连续发布，只保留最新的
+        for snapshot in snapshots:
+            feed.publish(1, snapshot)
+        self.assertIs(feed.wait(1), snapshots[-1])
+
+        got = []
+        waiter = threading.Thread(target=lambda: got.append(feed.wait(2))) # 下一局尚未开始
+        waiter.start()
+        waiter.join(0.05)
+        self.assertTrue(waiter.is_alive())
+        feed.publish(2, snapshots[0])
+        waiter.join(5)
+        self.assertEqual(got, [snapshots[0]])
+        self.assertIsNone(feed.wait(1, snapshots[-1])) # 第 1 局的结果已被覆盖
+
+if __name__ == '__main__':
+    unittest.main()
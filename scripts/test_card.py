@@ -1,10 +1,11 @@
 import unittest
 import os
 import sys
+import copy
 import pickle
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from core.card import Card, Suits
+from core.card import Card, Suits, CARDS, DECK_SIZE, card_from_id, generate_cards
 
 class TestCard(unittest.TestCase):
     def test_init(self):
@@ -38,6 +39,44 @@ class TestCard(unittest.TestCase):
         self.assertEqual(construct[0][0].suit, Suits.spade)
         self.assertEqual(construct[0][0].value, 11)
 
+    def test_interned(self):
+        """同一花色与牌面只有一个实例，拷贝、序列化、from_dict 均返回该实例"""
+        card = Card(Suits.heart, 14)
+        self.assertIs(Card(Suits.heart, 14), card)
+        self.assertIs(copy.deepcopy([card])[0], card)
+        self.assertIs(pickle.loads(pickle.dumps(card)), card)
+        self.assertIs(Card.from_dict(card.to_dict()), card)
+        self.assertIs(card_from_id(card.id), card)
+        with self.assertRaises(ValueError):
+            Card(Suits.heart, 18)
+        with self.assertRaises(ValueError):
+            Card.from_dict({'suit': 'Star', 'value': 3})
+
+    def test_immutable(self):
+        """共享实例不可修改，to_dict 返回副本"""
+        card = Card(Suits.heart, 14)
+        with self.assertRaises(AttributeError):
+            card.value = 3
+        with self.assertRaises(AttributeError):
+            card.suit = Suits.spade
+        with self.assertRaises(AttributeError):
+            del card.id
+        with self.assertRaises(AttributeError):
+            card._dict = {}
+        d = card.to_dict()
+        d['value'] = 3
+        self.assertEqual(card.to_dict(), {'suit': 'Heart', 'value': 14})
+        self.assertEqual(Card(Suits.heart, 14).value, 14)
+
+    def test_ids_and_hash(self):
+        self.assertEqual(DECK_SIZE, 54)
+        self.assertEqual([c.id for c in CARDS], list(range(len(CARDS))))
+        self.assertEqual(Card(Suits.spade, 3).id, 0)
+        self.assertEqual(Card(Suits.empty, 17).id, 53)
+        self.assertEqual(hash(Card(Suits.club, 9)), hash(9)) # 与 int 相等时哈希一致
+        self.assertEqual(len(set(generate_cards())), 54) # 哈希只取牌面，相等仍区分花色
+        self.assertEqual(len({c.id for c in generate_cards()}), 54)
+
 class TestSuits(unittest.TestCase):
     def test_suits(self):
         self.assertEqual(Suits.heart.value, 'Heart')
@@ -0,0 +1,226 @@
+import os
+import sys
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.card import Card, Suits
+from core.hand import Hand
+from core.playingrules import classify_play
+from server.game_vars import Game_Var
+from server.instrument import (
+    BUCKETS, InstrumentedBarrier, InstrumentedLock, histogram, render_metrics, set_lock_stats_enabled,
+    set_metrics_enabled, start_stats_server,
+)
+from server.manager import init_cards, apply_player_play, apply_player_reply, auto_pass, get_next_turn
+
+
+class TestSnapshot(unittest.TestCase):
+    def test_snapshot_is_independent(self):
+        g = Game_Var()
+        with g.game_lock:
+            init_cards(g)
+            g.users_played_cards[2] = [Card(Suits.heart, 9)]
+            snapshot = g.snapshot()
+            # 取快照之后牌局继续变化
+            g.users_cards[0].take([next(iter(g.users_cards[0])).value])
+            g.users_played_cards[2].append(Card(Suits.club, 9))
+            g.users_score[1] += 30
+            g.now_player = 3
+        info = snapshot.round_info(0)
+        self.assertEqual(info["users_cards_num"], [36] * 6)
+        self.assertEqual(len(info["client_cards"]), 36)
+        self.assertEqual(info["users_played_cards"][2], [Card(Suits.heart, 9)])
+        self.assertEqual(info["users_score"], [0] * 6)
+        self.assertEqual(info["now_player"], 0)
+        self.assertNotIn("users_cards", info)
+        # 生成的轮次信息可以被接收方修改而不影响快照
+        info["users_played_cards"][2].clear()
+        self.assertEqual(snapshot.round_info(1)["users_played_cards"][2], [Card(Suits.heart, 9)])
+
+    def test_game_over_includes_all_cards(self):
+        g = Game_Var()
+        with g.game_lock:
+            init_cards(g)
+            g.game_over = 1
+            snapshot = g.snapshot()
+        info = snapshot.round_info(4)
+        self.assertEqual([len(cards) for cards in info["users_cards"]], [36] * 6)
+        self.assertEqual(info["users_cards"][4], info["client_cards"])
+
+
+class TestApplyPlayerPlay(unittest.TestCase):
+    def test_lead(self):
+        g = Game_Var()
+        hand = [Card(Suits.heart, 5), Card(Suits.spade, 5), Card(Suits.heart, 9)]
+        with g.game_lock:
+            g.users_cards[0] = Hand(hand)
+            g.now_score = 10
+            with self.assertRaises(ValueError): # 首家不能过牌
+                apply_player_play(0, ['F'], g)
+            with self.assertRaises(ValueError): # 花色不符
+                apply_player_play(0, [Card(Suits.club, 5), Card(Suits.spade, 5)], g)
+            with self.assertRaises(ValueError): # 牌型非法
+                apply_player_play(0, [Card(Suits.heart, 5), Card(Suits.heart, 9)], g)
+            self.assertEqual(list(g.users_cards[0]), sorted(hand)) # 不合法时牌局不变
+            self.assertEqual((g.users_played_cards[0], g.now_score), ([], 10))
+
+            apply_player_play(0, hand[:2], g)
+            self.assertEqual(list(g.users_cards[0]), [Card(Suits.heart, 9)])
+            self.assertEqual(g.users_played_cards[0], hand[:2])
+            self.assertEqual(g.now_score, 20)
+
+    def test_follow(self):
+        g = Game_Var()
+        with g.game_lock:
+            g.users_cards[1] = Hand([Card(Suits.heart, 9), Card(Suits.heart, 13)])
+            g.last_play = classify_play([Card(Suits.club, 10)])
+            for played in ([Card(Suits.heart, 9)], [], "F", [None]): # 压不过或格式不对
+                with self.assertRaises(ValueError):
+                    apply_player_play(1, played, g)
+            apply_player_play(1, [Card(Suits.heart, 13)], g)
+            self.assertEqual(g.now_score, 10)
+            g.users_played_cards[1] = []
+            apply_player_play(1, ['F'], g) # 跟牌时可以过牌
+            self.assertEqual(g.users_played_cards[1], ['F'])
+            self.assertEqual(len(g.users_cards[1]), 1)
+
+    def test_pure_jokers(self):
+        # 3 张小王 + 3 张大王是可能拿到的手牌，不是合法牌型，也不能让牌型判定出错
+        jokers = [Card(Suits.empty, 16)] * 3 + [Card(Suits.empty, 17)] * 3
+        g = Game_Var()
+        with g.game_lock:
+            g.users_cards[0] = Hand(jokers + [Card(Suits.heart, 5)])
+            with self.assertRaisesRegex(ValueError, "illegal play"):
+                apply_player_play(0, jokers, g)
+            self.assertEqual(len(g.users_cards[0]), 7)
+            self.assertEqual(g.users_played_cards[0], [])
+
+
+class TestApplyPlayerReply(unittest.TestCase):
+    def test_invalid_reply(self):
+        # 旧版协议的回复格式不对时不修改牌局，该座位重连后仍可正常回复
+        g = Game_Var()
+        hand = [Card(Suits.heart, 5), Card(Suits.heart, 9)]
+        with g.game_lock:
+            g.users_cards[0] = Hand(hand)
+            g.now_score = 10
+            for cards, played, score in ((hand[1:], [None], 10), (hand[1:], [], 10), (hand[1:], "F", 10),
+                                         (5, hand[:1], 10), (hand[1:], hand[:1], "10")):
+                with self.assertRaises(ValueError):
+                    apply_player_reply(0, cards, played, score, g)
+                self.assertEqual(list(g.users_cards[0]), hand)
+                self.assertEqual((g.users_played_cards[0], g.now_score), ([], 10))
+
+            apply_player_reply(0, hand[1:], hand[:1], 15, g)
+            self.assertEqual(list(g.users_cards[0]), hand[1:])
+            self.assertEqual((g.users_played_cards[0], g.now_score), (hand[:1], 15))
+
+class TestAutoPass(unittest.TestCase):
+    def test_pass_until_round_ends(self):
+        g = Game_Var()
+        big_joker = Card(Suits.empty, 17)
+        with g.game_lock:
+            g.users_cards[0] = Hand([big_joker, Card(Suits.heart, 5)])
+            for i in range(1, 6):
+                g.users_cards[i] = Hand([Card(Suits.spade, 3 + i), Card(Suits.club, 3 + i)])
+            g.users_cards[3] = Hand([Card(s, 9) for s in (Suits.spade, Suits.heart, Suits.club, Suits.diamond)])
+            apply_player_play(0, [big_joker], g)
+            get_next_turn(g)
+            self.assertEqual(auto_pass(g), 2) # 1、2 号压不过，3 号有炸弹，轮到他时停下
+            self.assertEqual(g.now_player, 3)
+            self.assertEqual([len(g.users_cards[i]) for i in (1, 2)], [2, 2])
+            self.assertEqual(g.last_player, 0)
+
+            apply_player_play(3, list(g.users_cards[3]), g)
+            get_next_turn(g)
+            self.assertEqual(auto_pass(g), 5) # 其余人都压不过炸弹，一轮结束，3 号逃出后由下家首先出牌
+            self.assertIsNone(g.last_play)
+            self.assertEqual(g.now_player, 4)
+            self.assertEqual(auto_pass(g), 0) # 首家不自动过牌
+
+
+class TestInstrumentedLock(unittest.TestCase):
+    def tearDown(self):
+        set_lock_stats_enabled(False)
+
+    def test_stats(self):
+        lock = InstrumentedLock("test")
+        with lock:
+            self.assertTrue(lock.locked())
+        self.assertFalse(lock.locked())
+        self.assertEqual(lock.stats.count, 0) # 默认不统计
+
+        set_lock_stats_enabled(True)
+        with lock:
+            time.sleep(0.01)
+        self.assertEqual(lock.stats.count, 1)
+        self.assertGreaterEqual(lock.stats.hold_max, 0.01)
+
+        holder_ready = threading.Event()
+        def hold():
+            with lock:
+                holder_ready.set()
+                time.sleep(0.02)
+        t = threading.Thread(target=hold)
+        t.start()
+        holder_ready.wait()
+        with lock: # 等待另一线程释放
+            pass
+        t.join()
+        self.assertEqual(lock.stats.count, 3)
+        self.assertGreaterEqual(lock.stats.wait_max, 0.01)
+        self.assertFalse(lock.acquire(timeout=0) and lock.acquire(timeout=0.01))
+        lock.release()
+        self.assertEqual(lock.stats.count, 4)
+
+
+class TestMetrics(unittest.TestCase):
+    def tearDown(self):
+        set_metrics_enabled(False)
+
+    def test_histograms(self):
+        lock = InstrumentedLock("test_metrics")
+        barrier = InstrumentedBarrier(2, "test_barrier")
+        with lock:
+            pass
+        self.assertEqual(histogram("lock_hold_seconds", lock="test_metrics").snapshot()[0], [0] * (len(BUCKETS) + 1))
+
+        set_metrics_enabled(True)
+        with lock:
+            time.sleep(0.003)
+        t = threading.Thread(target=lambda: (time.sleep(0.02), barrier.wait()))
+        t.start()
+        barrier.wait()
+        t.join()
+        counts, total = histogram("lock_hold_seconds", lock="test_metrics").snapshot()
+        self.assertEqual(sum(counts), 1)
+        self.assertEqual(counts.index(1), BUCKETS.index(0.005)) # 3ms 落在 (2.5ms, 5ms] 桶
+        self.assertGreaterEqual(total, 0.003)
+        counts, total = histogram("barrier_wait_seconds", barrier="test_barrier").snapshot()
+        self.assertEqual(sum(counts), 2)
+        self.assertGreaterEqual(total, 0.015)
+
+        text = render_metrics()
+        self.assertIn('liujiatong_lock_hold_seconds_bucket{lock="test_metrics",le="0.005"} 1', text)
+        self.assertIn('liujiatong_lock_hold_seconds_bucket{lock="test_metrics",le="+Inf"} 1', text)
+        self.assertIn('liujiatong_barrier_wait_seconds_count{barrier="test_barrier"} 2', text)
+
+    def test_stats_server(self):
+        server = start_stats_server(0)
+        try:
+            port = server.server_address[1]
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as resp:
+                self.assertEqual(resp.status, 200)
+                self.assertIn("# TYPE liujiatong_state_seconds histogram", resp.read().decode())
+            with self.assertRaises(urllib.error.HTTPError):
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=5)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+if __name__ == '__main__':
+    unittest.main()
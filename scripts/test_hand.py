@@ -0,0 +1,49 @@
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.card import Card, Suits
+from core.hand import Hand
+from core.playingrules import validate_user_input
+from common.card_io import draw_cards, get_card_count
+
+
+def make_hand() -> Hand:
+    return Hand([Card(Suits.heart, 9), Card(Suits.spade, 3), Card(Suits.empty, 17),
+                 Card(Suits.club, 9), Card(Suits.diamond, 5), Card(Suits.spade, 9)])
+
+
+class TestHand(unittest.TestCase):
+    def test_sorted_iteration_and_count(self):
+        hand = make_hand()
+        self.assertEqual([c.value for c in hand], [3, 5, 9, 9, 9, 17])
+        self.assertEqual([c.suit for c in hand if c.value == 9], [Suits.heart, Suits.club, Suits.spade])
+        self.assertEqual(hand.count(9), 3)
+        self.assertEqual(hand.count(4), 0)
+        self.assertEqual(len(hand), 6)
+        self.assertIn(Card(Suits.club, 9), hand)
+        self.assertNotIn(Card(Suits.diamond, 9), hand)
+
+    def test_remove_and_take(self):
+        hand = make_hand()
+        hand.remove_cards([Card(Suits.club, 9), Card(Suits.empty, 17)])
+        self.assertEqual([str(c) for c in hand], ["Suits.spade_3", "Suits.diamond_5", "Suits.heart_9", "Suits.spade_9"])
+        self.assertEqual(hand.packed.to_values(), [9, 9, 5, 3])
+        with self.assertRaises(ValueError): # 不够时手牌不变
+            hand.remove_cards([Card(Suits.spade, 3), Card(Suits.club, 9)])
+        self.assertEqual(len(hand), 4)
+        self.assertEqual(hand.take([9, 3]), [Card(Suits.spade, 3), Card(Suits.heart, 9)])
+        self.assertEqual(hand, [Card(Suits.diamond, 5), Card(Suits.spade, 9)])
+        with self.assertRaises(ValueError):
+            hand.take([5, 5])
+
+    def test_helpers_accept_hand(self):
+        hand = make_hand()
+        self.assertEqual(get_card_count(hand, "9"), 3)
+        self.assertEqual(draw_cards(hand, ["9", "3", "9"]), [Card(Suits.spade, 3), Card(Suits.heart, 9), Card(Suits.club, 9)])
+        self.assertEqual(validate_user_input([9, 9, 5], hand, None), (False, 5))
+        self.assertEqual(validate_user_input([9, 9, 9], hand, None), (True, 0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,206 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from common.card_io import calculate_score
+from core.network.my_network import ReusableTCPServer
+from core.network.protocol import PROTOCOL_LEGACY, PROTOCOL_VERSION
+from server.async_server import AsyncGameServer
+from server.game_handler import Game_Handler
+from server.game_vars import Game_Var
+from server.journal import BAD_JOURNAL_SUFFIX, JournalWriter, journal_header, read_journal, unfinished_journals
+from server.manager import (
+    init_cards, apply_player_play, apply_player_reply, auto_pass, get_next_turn, check_game_over, restore_game,
+)
+from server.rooms import RoomRegistry
+from test_async_server import Bot
+
+COOKIES = {f"cookie{i}": i for i in range(6)}
+
+
+def bot_turn(g: Game_Var, legacy_seats=()) -> None:
+    """与 Bot 相同的策略：场上没有别人的牌时打出最小点数的全部牌，否则过牌。"""
+    seat = g.now_player
+    hand = g.users_cards[seat]
+    if any(pile for i, pile in enumerate(g.users_played_cards) if i != seat):
+        played = ['F']
+    else:
+        value = next(iter(hand)).value
+        played = [c for c in hand if c.value == value]
+    if seat in legacy_seats:
+        rest = [c for c in hand if played == ['F'] or c.value != played[0].value]
+        score = g.now_score + (0 if played == ['F'] else calculate_score(played))
+        apply_player_reply(seat, rest, played, score, g)
+    else:
+        apply_player_play(seat, played, g)
+    get_next_turn(g)
+    check_game_over(g)
+
+
+def play_journaled(directory: str, moves: int, legacy_seats=()) -> tuple[Game_Var, JournalWriter]:
+    """开一局写日志的牌局并走 moves 手，返回牌局状态（日志已写入磁盘）。"""
+    writer = JournalWriter(directory)
+    g = Game_Var()
+    with g.users_info_lock:
+        g.users_info = [(f"p{i}", 0) for i in range(6)]
+        g.users_cookie = dict(COOKIES)
+        g.users_num = 6
+        header = journal_header(g)
+    with g.game_lock:
+        init_cards(g, 42)
+        g.journal = writer.start(42, header)
+        for _ in range(moves):
+            bot_turn(g, legacy_seats)
+            auto_pass(g)
+    writer.flush()
+    return g, writer
+
+
+def write_corrupt_journals(directory: str, start: dict) -> list[str]:
+    """在目录中写入两份无法重放的日志（排在正常日志之前）：一份含非法出牌，一份 start 记录缺少种子。"""
+    g = Game_Var()
+    restore_game(g, [start])
+    seat = g.now_player
+    single = {}
+    for card in g.users_cards[seat]:
+        if card.value < 16:
+            single.setdefault(card.value, card)
+    a, b = list(single.values())[:2] # 两张点数不同的单牌不成牌型
+    journals = {
+        "0-illegal": [start, {"type": "play", "seat": seat, "cards": [a.id, b.id]}],
+        "0-no-seed": [{k: v for k, v in start.items() if k != "seed"}],
+    }
+    paths = []
+    for name, records in journals.items():
+        path = os.path.join(directory, name + ".journal")
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(r) + "\n" for r in records)
+        paths.append(path)
+    return paths
+
+
+def game_state(g: Game_Var) -> tuple:
+    with g.game_lock:
+        return tuple(g.snapshot()[:7]) + (g.last_player, g.last_play, g.team_score, g.team_out)
+
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_replay_matches(self):
+        g, _ = play_journaled(self.dir, 40, legacy_seats=(1, 4))
+        [(path, records)] = list(unfinished_journals(self.dir))
+        self.assertEqual(records[0]["type"], "start")
+        self.assertEqual({r["type"] for r in records[1:]}, {"play", "reply"})
+        restored = Game_Var()
+        start = time.perf_counter()
+        restore_game(restored, records)
+        elapsed = time.perf_counter() - start
+        self.assertEqual(game_state(restored), game_state(g))
+        self.assertEqual(restored.users_cookie, COOKIES)
+        self.assertEqual(restored.users_error, [True] * 6) # 等待所有玩家重连
+        self.assertLess(elapsed, 0.5)
+
+    def test_partial_line_and_end(self):
+        g, writer = play_journaled(self.dir, 10)
+        [(path, records)] = list(unfinished_journals(self.dir))
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"type":"play","se') # 进程在写入中途退出
+        self.assertEqual(read_journal(path), records)
+        journal = writer.resume(path)
+        journal.close(0)
+        writer.flush()
+        self.assertEqual(read_journal(path), records + [{"type": "end", "game_over": 0}])
+        self.assertEqual(list(unfinished_journals(self.dir)), [])
+
+
+class TestRecovery(unittest.TestCase):
+    """服务端从日志恢复牌局后，玩家用原来的 cookie 重连并打完这一局。"""
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        self.before, _ = play_journaled(self.dir, 25)
+        [(_, records)] = list(unfinished_journals(self.dir))
+        self.corrupt = write_corrupt_journals(self.dir, records[0]) # 跳过无法恢复的日志，不影响正常的那一局
+        self.bots = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_bots(self, port: int):
+        self.bots = [Bot(port, f"p{i}", PROTOCOL_LEGACY if i == 2 else PROTOCOL_VERSION) for i in range(6)]
+        for bot, cookie in zip(self.bots, COOKIES):
+            bot.cookie = cookie
+        threads = [threading.Thread(target=bot.run) for bot in self.bots]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(60)
+        for bot in self.bots:
+            self.assertIsNone(bot.error, bot.name)
+            self.assertNotEqual(bot.game_over, 0, bot.name)
+        self.assertEqual([bot.seat for bot in self.bots], list(range(6)))
+
+    def assert_discarded(self):
+        for path in self.corrupt:
+            self.assertFalse(os.path.exists(path))
+            self.assertTrue(os.path.exists(path + BAD_JOURNAL_SUFFIX))
+
+    def wait_finished(self):
+        deadline = time.time() + 5
+        while list(unfinished_journals(self.dir)) and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(list(unfinished_journals(self.dir)), [])
+
+    def test_threaded(self):
+        server = ReusableTCPServer(("127.0.0.1", 0), Game_Handler)
+        server.daemon_threads = True
+        server.rooms = RoomRegistry(static_user_order=True, journal_dir=self.dir)
+        self.assertEqual(len(server.rooms.rooms), 1)
+        self.assertEqual(game_state(server.rooms.rooms[0].g), game_state(self.before))
+        self.assert_discarded()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            self.run_bots(server.server_address[1])
+            self.wait_finished()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_async(self):
+        loop = asyncio.new_event_loop()
+        game_server = AsyncGameServer(static_user_order=True, journal_dir=self.dir)
+        server = loop.run_until_complete(game_server.start("127.0.0.1", 0))
+        self.assertEqual(game_state(game_server.tables[0].g), game_state(self.before))
+        self.assert_discarded()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            self.run_bots(server.sockets[0].getsockname()[1])
+            self.wait_finished()
+        finally:
+            async def shutdown():
+                server.close()
+                tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+            asyncio.run_coroutine_threadsafe(shutdown(), loop).result(5)
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(5)
+            loop.close()
+
+if __name__ == '__main__':
+    unittest.main()
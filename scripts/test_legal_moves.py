@@ -0,0 +1,90 @@
+import itertools
+import os
+import random
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.card import Card, Suits, generate_cards
+from core.legal_moves import can_beat, iter_legal_moves
+from core.packed_hand import PackedHand, pack_values
+from core.playingrules import CardType, beats, classify_play
+
+
+def make_cards(values: list[int]) -> list[Card]:
+    return [Card(Suits.empty if v >= 16 else Suits.spade, v) for v in values]
+
+
+def signatures(moves) -> list[int]:
+    return [pack_values(c.value for c in m) for m in moves]
+
+
+# 暴力枚举手牌的所有子多重集，作为对照
+def brute_force(values: list[int], last_played: list[Card] = None) -> set[int]:
+    counts = {}
+    for v in values:
+        counts[v] = counts.get(v, 0) + 1
+    last = classify_play(last_played) if last_played else None
+    result = set()
+    for used in itertools.product(*[range(n + 1) for n in counts.values()]):
+        sub = [v for v, n in zip(counts, used) for _ in range(n)]
+        if not sub:
+            continue
+        play = classify_play(PackedHand.from_values(sub))
+        if play.card_type is CardType.illegal_type:
+            continue
+        if last is not None and not beats(play.strength, last.strength):
+            continue
+        result.add(pack_values(sub))
+    return result
+
+
+class TestLegalMoves(unittest.TestCase):
+    def test_joker_substitution(self):
+        moves = signatures(iter_legal_moves(make_cards([3, 4, 5, 7, 16])))
+        self.assertIn(pack_values([3, 4, 5, 7, 16]), moves) # 大小王补 6 成顺子
+        self.assertIn(pack_values([7, 16]), moves)            # 大小王配对
+        self.assertEqual(len(moves), len(set(moves)))
+
+    def test_matches_brute_force(self):
+        rng = random.Random(2024)
+        lasts = [None, [5], [9, 9], [7, 7, 7], [3, 4, 5, 6, 7], [8, 8, 8, 4, 4],
+                 [14, 14, 15, 15], [3, 3, 3, 4, 4, 4], [6, 6, 6, 6], [16, 16, 16, 16]]
+        for _ in range(60):
+            values = [rng.choice([3, 4, 5, 6, 7, 8, 14, 15, 16, 17]) for _ in range(rng.randint(3, 10))]
+            hand = make_cards(values)
+            for last in lasts:
+                last_cards = make_cards(last) if last else None
+                moves = signatures(iter_legal_moves(hand, last_cards))
+                self.assertEqual(len(moves), len(set(moves)))
+                self.assertEqual(set(moves), brute_force(values, last_cards), (values, last))
+
+    def test_can_beat(self):
+        rng = random.Random(2025)
+        lasts = [[5], [9, 9], [7, 7, 7], [3, 4, 5, 6, 7], [14, 14, 15, 15], [6, 6, 6, 6], [16, 16, 16, 16]]
+        for _ in range(60):
+            values = [rng.choice([3, 4, 5, 6, 7, 8, 14, 15, 16, 17]) for _ in range(rng.randint(1, 8))]
+            for last in lasts:
+                last_cards = make_cards(last)
+                self.assertEqual(can_beat(make_cards(values), last_cards),
+                                 bool(brute_force(values, last_cards)), (values, last))
+        self.assertFalse(can_beat(make_cards([17, 17, 17]), make_cards([3, 3, 3, 3]))) # 不足 4 张压不了炸弹
+        self.assertTrue(can_beat(make_cards([3, 3, 3, 3]), make_cards([17, 17])))
+
+    def test_bomb_follow_only_bombs(self):
+        hand = make_cards([3, 3, 3, 3, 9, 9, 9, 9, 9, 16, 17])
+        for move in iter_legal_moves(hand, make_cards([8, 8, 8, 8, 8])):
+            self.assertIn(classify_play(move).card_type,
+                          (CardType.normal_bomb, CardType.black_joker_bomb, CardType.red_joker_bomb))
+        self.assertEqual(next(iter_legal_moves(make_cards([3, 3, 3, 3]), make_cards([8, 8, 8, 8])), None), None)
+
+    def test_lazy_on_full_hand(self):
+        cards = generate_cards()
+        random.Random(7).shuffle(cards)
+        hand = sorted(cards[:36], key=lambda c: c.value)
+        first = next(iter_legal_moves(hand))
+        self.assertEqual(classify_play(first).card_type, CardType.single)
+        self.assertEqual(first[0].value, hand[0].value)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,7 +8,12 @@ import queue
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from core.network.my_network import send_data_to_socket, recv_data_from_socket
-from core.card import HEART_JACK
+from core.network.my_network import encode_body, decode_body, send_frame, HEADER, EncodedDict, EncodedRoundInfo
+from core.network.protocol import (
+    PROTOCOL_LEGACY, PROTOCOL_VERSION, CODEC_JSON, CODEC_BINARY, is_hello, make_hello, negotiate,
+    diff_round_info, apply_round_frame,
+)
+from core.card import HEART_JACK, generate_cards
 
 def start_server(host, port, server_socket, conn_queue):
     server_socket.bind((host, port))
@@ -100,5 +105,138 @@ class TestNetwork(unittest.TestCase):
         # 关闭套接字
         self.tear_down(server_socket, socket_a, conn)
 
+class TestFraming(unittest.TestCase):
+    def setUp(self):
+        self.a, self.b = socket.socketpair()
+
+    def tearDown(self):
+        self.a.close()
+        self.b.close()
+
+    def test_partial_header_and_multiple_frames(self):
+        data = b"".join(HEADER.pack(len(b)) + b for b in (encode_body(1), encode_body("两帧")))
+        # 第一次只到达半个长度头，第二次到达其余部分
+        def writer():
+            self.a.sendall(data[:2])
+            time.sleep(0.05)
+            self.a.sendall(data[2:])
+        thread = threading.Thread(target=writer)
+        thread.start()
+        self.assertEqual(recv_data_from_socket(self.b), 1)
+        self.assertEqual(recv_data_from_socket(self.b), "两帧")
+        thread.join()
+
+    def test_large_frame(self):
+        cards = generate_cards() * 200
+        thread = threading.Thread(target=send_data_to_socket, args=([cards, 7], self.a))
+        thread.start()
+        received = recv_data_from_socket(self.b)
+        thread.join()
+        self.assertEqual(received, [cards, 7])
+
+    def test_send_frame_is_one_call(self):
+        calls = []
+        class FakeSocket:
+            def sendmsg(self, buffers):
+                calls.append(b"".join(buffers))
+                return len(calls[-1])
+        send_frame(FakeSocket(), b"abc")
+        self.assertEqual(calls, [HEADER.pack(3) + b"abc"])
+
+    def test_closed_connection(self):
+        self.a.sendall(HEADER.pack(10) + b"abc")
+        self.a.close()
+        with self.assertRaises(ConnectionError):
+            recv_data_from_socket(self.b)
+
+class TestProtocol(unittest.TestCase):
+    def test_hello(self):
+        self.assertTrue(is_hello(make_hello()))
+        self.assertFalse(is_hello(True)) # 旧版客户端第一条为 if_has_cookie
+        self.assertFalse(is_hello({"suit": "Spade", "value": 3}))
+
+    def test_negotiate(self):
+        self.assertEqual(negotiate(make_hello(PROTOCOL_VERSION + 5)), {"protocol": PROTOCOL_VERSION, "codec": CODEC_JSON})
+        self.assertEqual(negotiate(make_hello(PROTOCOL_LEGACY)), {"protocol": PROTOCOL_LEGACY, "codec": CODEC_JSON})
+        self.assertEqual(negotiate({"protocol": 0}), {"protocol": PROTOCOL_LEGACY, "codec": CODEC_JSON})
+        self.assertEqual(negotiate(make_hello(codec=CODEC_BINARY)), {"protocol": PROTOCOL_VERSION, "codec": CODEC_BINARY})
+        self.assertEqual(negotiate(make_hello(codec="msgpack"))["codec"], CODEC_JSON)
+        # 旧版协议不支持二进制编码
+        self.assertEqual(negotiate(make_hello(PROTOCOL_LEGACY, CODEC_BINARY))["codec"], CODEC_JSON)
+
+    def test_round_delta(self):
+        deck = generate_cards()
+        last = {
+            "game_over": 0, "users_score": [0] * 6, "users_cards_num": [36] * 6, "users_played_cards": [[]] * 6,
+            "client_cards": deck[:36], "now_score": 0, "now_player": 0, "head_master": -1,
+        }
+        # 0 号出牌
+        state = dict(last, users_cards_num=[34] + [36] * 5, users_played_cards=[deck[36:38]] + [[]] * 5,
+                     now_score=10, now_player=1)
+        delta = diff_round_info(last, state)
+        self.assertEqual(delta, {
+            "users_cards_num": [[0, 34]], "users_played_cards": [[0, deck[36:38]]], "now_score": 10, "now_player": 1,
+        })
+        self.assertEqual(diff_round_info(state, state), {})
+        # 只比较 current 中出现的字段
+        public = {k: v for k, v in state.items() if k != "client_cards"}
+        self.assertEqual(diff_round_info(dict(last, client_cards=deck[1:36]), public), delta)
+
+        with self.assertRaises(ValueError):
+            apply_round_frame(None, {"delta": delta})
+        for codec in (CODEC_JSON, CODEC_BINARY):
+            client_state = apply_round_frame(None, decode_body(encode_body(last, codec), codec))
+            client_state = apply_round_frame(client_state, decode_body(encode_body({"delta": delta}, codec), codec))
+            self.assertEqual(client_state, state)
+            self.assertEqual(last["users_cards_num"], [36] * 6) # 不修改上一状态
+
+class TestCodec(unittest.TestCase):
+    def round_trip(self, data):
+        for codec in (CODEC_JSON, CODEC_BINARY):
+            self.assertEqual(decode_body(encode_body(data, codec), codec), data, codec)
+
+    def test_values(self):
+        for data in [None, True, False, 0, -7, 2 ** 40, "", "玩家", ['F'], [], HEART_JACK,
+                     [HEART_JACK, HEART_JACK], [1, [2, None], "x"], {"protocol": 2, "codec": "binary"}]:
+            self.round_trip(data)
+
+    def test_round_info(self):
+        deck = generate_cards()
+        round_info = {
+            "game_over": 0, "users_score": [0, 5, 10, 0, 200, 35], "users_cards_num": [36, 30, 0, 1, 36, 20],
+            "users_played_cards": [deck[:3], ['F'], [], deck[3:8], ['F'], []],
+            "client_cards": deck[100:136], "now_score": 15, "now_player": 3, "head_master": -1,
+        }
+        self.round_trip(round_info)
+        binary = encode_body(round_info, CODEC_BINARY)
+        self.assertTrue(binary.endswith(bytes([36] + [c.id for c in deck[100:136]]))) # 自己的手牌在最后
+        round_info["game_over"] = -2
+        round_info["users_cards"] = [deck[i * 36:(i + 1) * 36] for i in range(6)]
+        self.round_trip(round_info)
+        self.assertLess(len(encode_body(round_info, CODEC_BINARY)) * 10, len(encode_body(round_info, CODEC_JSON)))
+
+    def test_splice(self):
+        deck = generate_cards()
+        public = {"users_score": [[1, 5]], "users_played_cards": [[0, deck[:2]], [3, ['F']]], "now_player": 4}
+        for codec in (CODEC_JSON, CODEC_BINARY):
+            for wrap in (None, "delta"):
+                encoded = EncodedDict(public, codec, wrap)
+                for private in ({}, {"client_cards": deck[2:5]}, {"client_cards": []}):
+                    expected = {**public, **private}
+                    if wrap:
+                        expected = {wrap: expected}
+                    self.assertEqual(decode_body(encoded.splice(private), codec), expected, (codec, wrap, private))
+            self.assertEqual(decode_body(EncodedDict({}, codec).splice({"x": 1}), codec), {"x": 1})
+            self.assertEqual(decode_body(EncodedDict({}, codec).splice({}), codec), {})
+
+            round_info = {
+                "game_over": 0, "users_score": [0] * 6, "users_cards_num": [36, 34, 36, 36, 36, 36],
+                "users_played_cards": [[], deck[:2], [], [], [], []], "now_score": 5, "now_player": 2, "head_master": -1,
+            }
+            encoded = EncodedRoundInfo(round_info, codec)
+            for cards in ([], deck[36:72]):
+                body = encoded.splice(cards)
+                self.assertEqual(body, encode_body({**round_info, "client_cards": cards}, codec))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,59 @@
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.card import Card, Suits
+from core.packed_hand import PackedHand, pack_values, unpack_values
+from core.playingrules import (
+    CardType, judge_and_transform_cards, if_enough_card, validate_user_input,
+)
+
+class TestPackedHand(unittest.TestCase):
+    def test_add_remove_count(self):
+        hand = PackedHand()
+        hand.add(3)
+        hand.add(17, 8)
+        hand.add(15, 16)
+        self.assertEqual(hand.count(3), 1)
+        self.assertEqual(hand.count(17), 8)
+        self.assertEqual(hand.count(15), 16)
+        self.assertEqual(len(hand), 25)
+        self.assertIn(17, hand)
+        self.assertNotIn(4, hand)
+        hand.remove(15, 16)
+        self.assertEqual(hand.count(15), 0)
+        self.assertEqual(len(hand), 9)
+        with self.assertRaises(ValueError):
+            hand.remove(4)
+
+    def test_pack_unpack(self):
+        values = [17, 16, 15, 15, 9, 3, 3, 3]
+        self.assertEqual(unpack_values(pack_values(values)), values)
+        self.assertEqual(PackedHand.from_values(values).to_values(), values)
+
+    def test_cards_round_trip(self):
+        cards = [Card(Suits.heart, 5), Card(Suits.spade, 5), Card(Suits.empty, 16)]
+        hand = PackedHand.from_cards(cards)
+        self.assertEqual([c.value for c in hand.to_cards()], [5, 5, 16])
+        self.assertEqual(hand.to_cards()[-1].suit, Suits.empty)
+
+    def test_contains_all(self):
+        hand = PackedHand.from_values([3, 3, 4, 10, 17])
+        self.assertTrue(hand.contains_all(PackedHand.from_values([3, 3, 17])))
+        self.assertFalse(hand.contains_all(PackedHand.from_values([3, 3, 3])))
+        self.assertFalse(hand.contains_all(PackedHand.from_values([5])))
+
+    def test_rules_accept_packed(self):
+        self.assertEqual(
+            judge_and_transform_cards(PackedHand.from_values([4, 4, 5, 5, 5])),
+            (CardType.triple_pair, 5),
+        )
+        hand = PackedHand.from_values([4, 5, 5, 6, 7, 8, 13])
+        self.assertEqual(if_enough_card(PackedHand.from_values([5, 5, 13]), hand), (True, 20))
+        self.assertEqual(
+            validate_user_input([5, 5], hand, PackedHand.from_values([4, 4])), (True, 10)
+        )
+
+if __name__ == '__main__':
+    unittest.main()
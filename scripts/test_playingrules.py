@@ -7,6 +7,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from core.playingrules import *
 import unittest
 from core.card import Card, Suits
+from core.packed_hand import PackedHand
 
 @pytest.mark.parametrize('user_input, expect', [
     [[15,15,15,15], (CardType.normal_bomb, 15)],
@@ -31,6 +32,16 @@ from core.card import Card, Suits
     [[4,4,4,4,17], (CardType.normal_bomb, 4)],
     [[9,9,10,10,11,11,11,12,12,12], (CardType.flight,12)],
     [[8,8,8,17,17], (CardType.normal_bomb, 8)],
+    # 飞机：三张与对子范围重叠、长飞机、大小王补位、2 不能参与
+    [[3,3,3,3,3,4,4,4,4,4], (CardType.flight, 4)],
+    [[5,5,5,6,6,6,7,7,7,8,8,8,9,9,10,10,11,11,12,12], (CardType.flight, 8)],
+    [[5,5,6,6,7,7,8,8,9,9,10,10,10,11,11,11,12,12,13,13,16,16,17,17,17], (CardType.flight, 14)],
+    [[12,12,12,13,13,13,14,14,15,15], (CardType.illegal_type, 0)],
+    [[3,3,3,7,7,7,9,9,16,17], (CardType.illegal_type, 0)],
+    # 纯大小王：不是顺子、连对或连三张（原判定越界）
+    [[16,16,16,17,17], (CardType.triple_pair, 16)],
+    [[16,16,17,17,17,17], (CardType.red_joker_bomb, 17)],
+    [[16,16,16,17,17,17], (CardType.illegal_type, 0)],
 ])
 def test_judge_and_transform_cards(user_input, expect):
     assert judge_and_transform_cards(sorted(user_input, reverse=True)) == expect
@@ -52,6 +63,25 @@ def test_judge_and_transform_cards(user_input, expect):
 def test_validate_user_input(user_input, user_card, last_played_cards, expect):
     assert validate_user_input(user_input, user_card, last_played_cards) == expect
 
+@pytest.mark.parametrize('cards, last_played_cards', [
+    [[9,9], [8,8]],
+    [[9,9], [8,8,8]],
+    [[4,4,4,4], [15,15,15]],
+    [[16,16,16,16], [15,15,15,15,15,15,15,15]],
+    [[5,5,5,5,5,5,5,5,5], [17,17,17,17]],
+    [[17,17,17,17], [16,16,16,16]],
+    [[16,16,16,16], [17,17,17,17]],
+    [[6,6,6,6,6], [15,15,15,15]],
+    [[7,7,7,7], [6,6,6,6]],
+    [[5,6,7,8,9], [4,4,5,5,5]],
+    [[15,15,15], [16,16,16,16]],
+])
+def test_play_strength_matches_cascade(cards, last_played_cards):
+    play = classify_play(PackedHand.from_values(cards))
+    last_play = classify_play(PackedHand.from_values(last_played_cards))
+    expect = if_not_first_input_legal(sorted(cards, reverse=True), sorted(last_played_cards, reverse=True))
+    assert beats(play.strength, last_play.strength) == expect
+
 class TestPlayingRules(unittest.TestCase):
     def test_if_enough_card_valid(self):
         user_card = [Card(Suits.heart, 4), Card(Suits.spade, 5), Card(Suits.diamond, 5),
@@ -90,5 +120,56 @@ class TestUserInput(unittest.TestCase):
         self.assertEqual(first_input_legal([4, 3]), False)
         self.assertEqual(first_input_legal([4, 3, 3]), False)
 
+class TestClassifyCache(unittest.TestCase):
+    def setUp(self):
+        set_classify_cache_enabled(True)
+        clear_classify_cache()
+
+    def tearDown(self):
+        set_classify_cache_enabled(True)
+        clear_classify_cache()
+
+    def test_cache_hit(self):
+        cards = [9,9,9,8,8]
+        expect = judge_and_transform_cards(cards)
+        self.assertEqual(get_classify_cache_info().misses, 1)
+        self.assertEqual(judge_and_transform_cards(cards), expect)
+        self.assertEqual(get_classify_cache_info().hits, 1)
+
+    def test_cache_disabled(self):
+        set_classify_cache_enabled(False)
+        self.assertEqual(judge_and_transform_cards([5,5]), (CardType.pair, 5))
+        self.assertEqual(get_classify_cache_info().currsize, 0)
+
+    def test_cache_lru_eviction(self):
+        set_classify_cache_size(2)
+        try:
+            judge_and_transform_cards([3])
+            judge_and_transform_cards([4])
+            judge_and_transform_cards([5])
+            self.assertEqual(get_classify_cache_info().currsize, 2)
+            judge_and_transform_cards([3])
+            self.assertEqual(get_classify_cache_info().misses, 4)
+        finally:
+            set_classify_cache_size(CLASSIFY_CACHE_SIZE)
+
+class TestValidateMany(unittest.TestCase):
+    def test_matches_single_validation(self):
+        hand = [Card(Suits.heart, v) for v in [3,3,4,5,5,5,9,9,9,9,10,13,16]]
+        last_played = [Card(Suits.spade, v) for v in [4,4]]
+        candidates = [
+            [Card(Suits.heart, v) for v in values]
+            for values in [[3,3], [5,5], [9,9,9,9], [13,16], [4,4], [3,4], [10]]
+        ]
+        expect = [
+            validate_user_input([c.value for c in combo], hand, last_played)
+            for combo in candidates
+        ]
+        self.assertEqual(validate_many(candidates, hand, last_played), expect)
+        self.assertEqual(
+            [legal for legal, _ in validate_many(candidates, hand, None)],
+            [True, True, True, True, False, False, True],
+        )
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
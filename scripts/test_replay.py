@@ -0,0 +1,68 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from core.hand import Hand
+from core.replay import ArchiveWriter, ReplayArchive, parse_auto_play_log, parse_journal
+from server.journal import unfinished_journals
+from test_journal import play_journaled
+
+LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "auto_play_logs")
+
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "games.ljtr")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_auto_play_logs(self):
+        games = [parse_auto_play_log(os.path.join(LOG_DIR, name)) for name in sorted(os.listdir(LOG_DIR))
+                 if name.endswith(".log")]
+        self.assertTrue(games)
+        for game in games:
+            # 按种子复现的发牌与日志中的出牌一致：每手牌都在该座位的手牌中
+            hands = [Hand(hand) for hand in game.hands]
+            for seat, cards in game.moves:
+                if cards != ['F']:
+                    hands[seat].remove_cards(cards)
+            self.assertTrue(any(len(hand) == 0 for hand in hands))
+
+        with ArchiveWriter(self.path) as writer:
+            for game in games:
+                writer.add(game)
+        self.assertLess(os.path.getsize(self.path), sum(len(g.moves) for g in games) * 8)
+        with ReplayArchive(self.path) as archive:
+            self.assertEqual(len(archive), len(games))
+            for n in reversed(range(len(games))): # 任意顺序访问
+                self.assertEqual(archive.game(n), games[n])
+                m = len(games[n].moves) // 2
+                self.assertEqual(archive.move(n, m), games[n].moves[m])
+                self.assertEqual(list(archive.moves(n, m)), games[n].moves[m:])
+            with self.assertRaises(IndexError):
+                archive.move(0, len(games[0].moves))
+            with self.assertRaises(IndexError):
+                archive.hands(len(games))
+
+    def test_journal(self):
+        before, _ = play_journaled(self.tmp.name, 30, legacy_seats=(3,))
+        [(path, records)] = list(unfinished_journals(self.tmp.name))
+        game = parse_journal(path)
+        self.assertEqual(len(game.moves), len(records) - 1)
+        with ArchiveWriter(self.path) as writer:
+            writer.add(game)
+        with ReplayArchive(self.path) as archive:
+            self.assertEqual(archive.seed(0), 42)
+            hands = [Hand(hand) for hand in archive.hands(0)]
+            for seat, cards in archive.moves(0):
+                if cards != ['F']:
+                    hands[seat].remove_cards(cards)
+        self.assertEqual([list(hand) for hand in hands], [list(hand) for hand in before.users_cards])
+
+if __name__ == '__main__':
+    unittest.main()
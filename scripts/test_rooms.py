@@ -0,0 +1,96 @@
+import os
+import sys
+import socket
+import threading
+import time
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from core.network.my_network import ReusableTCPServer, recv_data_from_socket, send_data_to_socket
+from core.network.protocol import PROTOCOL_LEGACY, PROTOCOL_VERSION
+from server.game_handler import Game_Handler
+from server.instrument import histogram, render_metrics, set_metrics_enabled
+from server.rooms import RoomRegistry
+from test_async_server import Bot
+
+
+class TestRooms(unittest.TestCase):
+    def setUp(self):
+        self.server = ReusableTCPServer(("127.0.0.1", 0), Game_Handler)
+        self.server.daemon_threads = True
+        self.server.rooms = RoomRegistry(static_user_order=True, max_rooms=2)
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        set_metrics_enabled(False)
+
+    def wait_seated(self, room: int):
+        rooms = self.server.rooms.rooms
+        while len(rooms) <= room or rooms[room].has_free_seat():
+            time.sleep(0.01)
+
+    def test_two_rooms_with_reconnect_and_onlooker(self):
+        set_metrics_enabled(True)
+        bots = [Bot(self.port, f"a{i}", disconnect_after=2 if i == 0 else None) for i in range(6)]
+        threads = [threading.Thread(target=bot.run) for bot in bots]
+        for t in threads:
+            t.start()
+        self.wait_seated(0)
+        bots += [Bot(self.port, f"b{i}", PROTOCOL_LEGACY if i % 2 else PROTOCOL_VERSION) for i in range(6)]
+        for bot in bots[6:]:
+            threads.append(threading.Thread(target=bot.run))
+            threads[-1].start()
+        self.wait_seated(1)
+        onlooker = Bot(self.port, "watcher") # 两个房间都满了
+        threads.append(threading.Thread(target=onlooker.run))
+        threads[-1].start()
+        for t in threads:
+            t.join(60)
+        for bot in bots + [onlooker]:
+            self.assertIsNone(bot.error, bot.name)
+            self.assertNotEqual(bot.game_over, 0, bot.name)
+        self.assertTrue(bots[0].reconnected)
+        self.assertFalse(onlooker.is_player)
+        self.assertEqual(len(self.server.rooms.rooms), 2)
+        self.assertEqual(len({bot.cookie for bot in bots}), 12)
+        self.assertEqual(len({bot.game_over for bot in bots[:6]}), 1)
+        self.assertEqual(len({bot.game_over for bot in bots[6:]}), 1)
+        # 两个房间的计时汇总到同一组直方图
+        for machine, state in [("Manager", "next_turn"), ("Player", "recv_player_info"), ("Onlooker", "send_round_info")]:
+            self.assertGreater(sum(histogram("state_seconds", machine=machine, state=state).snapshot()[0]), 0, machine)
+        self.assertGreater(sum(histogram("barrier_wait_seconds", barrier="next_turn_barrier").snapshot()[0]), 0)
+        self.assertGreater(sum(histogram("lock_hold_seconds", lock="game_lock").snapshot()[0]), 0)
+        self.assertIn('state="send_round_info_sync"', render_metrics())
+
+    def join(self, name: str) -> socket.socket:
+        sock = socket.create_connection(("127.0.0.1", self.port))
+        send_data_to_socket(False, sock) # 旧版协议，没有 cookie
+        self.assertFalse(recv_data_from_socket(sock))
+        send_data_to_socket(name, sock)
+        self.assertIsInstance(recv_data_from_socket(sock), str) # cookie
+        return sock
+
+    def recv_hall(self, sock: socket.socket) -> tuple[list, list]:
+        return recv_data_from_socket(sock), recv_data_from_socket(sock)
+
+    def test_waiting_hall_is_event_driven(self):
+        a = self.join("a")
+        self.assertEqual(self.recv_hall(a), (["a"], [False]))
+        b = self.join("b")
+        self.assertEqual(self.recv_hall(a), (["a", "b"], [False, False])) # 加入立即通知
+        self.assertEqual(self.recv_hall(b), (["a", "b"], [False, False]))
+        a.settimeout(1.5)
+        with self.assertRaises(socket.timeout): # 没有变化时不重发
+            recv_data_from_socket(a)
+        b.close()
+        a.settimeout(5)
+        self.assertEqual(self.recv_hall(a), (["a", "b"], [False, True])) # 大厅中掉线也会被发现
+        a.close()
+
+if __name__ == '__main__':
+    unittest.main()
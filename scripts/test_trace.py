@@ -0,0 +1,66 @@
+import logging
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core import trace
+from core.auto_play.strategy import auto_select_cards
+from core.card import Card, Suits
+from core.FieldInfo import FieldInfo
+from core.playingrules import if_enough_card
+
+
+class Exploding:
+    def __str__(self):
+        raise AssertionError("formatted while tracing is off")
+
+
+class TestTrace(unittest.TestCase):
+    def tearDown(self):
+        trace.set_trace_level("off")
+        trace.set_trace_sample_rate(1.0)
+        trace.set_trace_counters_enabled(False)
+        trace.reset_trace_counters()
+
+    def test_off_by_default_and_lazy(self):
+        self.assertFalse(trace.is_trace_enabled(trace.INFO))
+        trace.trace("f", "%s", Exploding()) # 关闭时不会格式化参数
+        self.assertEqual(str(trace.lazy_values([Card(Suits.heart, 3)])), "[3]")
+        self.assertEqual(str(trace.lazy_values(['F'])), "['F']") # 过牌
+        self.assertEqual(str(trace.lazy_values(5)), "5") # 客户端发来的不是列表
+
+    def test_level_and_sampling(self):
+        root_level = logging.getLogger().level
+        trace.set_trace_level("debug")
+        self.assertEqual(logging.getLogger().level, root_level) # 只放开追踪自己的日志器
+        with self.assertLogs(level=logging.DEBUG) as logs:
+            if_enough_card([5, 5], None)
+        self.assertEqual(logs.output, ["DEBUG:core.trace:if_enough_card: [5, 5]"])
+
+        trace.set_trace_sample_rate(0.0)
+        trace.trace("f", "%s", Exploding()) # 采样率为 0 时同样不格式化
+        with self.assertRaises(ValueError):
+            trace.set_trace_sample_rate(1.5)
+
+    def test_info_level(self):
+        # info 只记录每次决策一条的追踪，逐次校验的 DEBUG 追踪不输出
+        trace.set_trace_level("info")
+        hand = [Card(Suits.heart, 3), Card(Suits.spade, 5)]
+        info = FieldInfo(True, True, 0, hand, [""] * 6, [0] * 6, [len(hand)] * 6, [[]] * 6,
+                         [[] for _ in range(6)], -1, 0, 0, 0, 0, 0)
+        with self.assertLogs(level=logging.DEBUG) as logs:
+            if_enough_card([5, 5], None)
+            auto_select_cards(info)
+        self.assertEqual(logs.output, ["INFO:core.trace:auto_select_cards: last=None choice=[3]"])
+
+    def test_counters(self):
+        trace.set_trace_counters_enabled(True)
+        for _ in range(3):
+            if_enough_card([3], None)
+        self.assertEqual(trace.get_trace_counters(), {"if_enough_card": 3})
+        trace.reset_trace_counters()
+        self.assertEqual(trace.get_trace_counters(), {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,8 +5,11 @@ _project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, _project_root)
 
 from server.game_handler import Game_Handler
-from server.manager import Manager
+from server.rooms import RoomRegistry
+from server.instrument import set_lock_stats_enabled, start_stats_server
+from server.async_server import run_async_server
 import core.logger as logger
+from core import trace
 import threading
 import argparse
 from core.network.my_network import ReusableTCPServer
@@ -18,12 +21,6 @@ check_packages({
     ],
 })
 
-manager_barrier = threading.Barrier(2)
-def manager_thread(static_user_order):
-    manager = Manager(static_user_order)
-    manager_barrier.wait()
-    manager.run()
-
 ctrl_c_handler_lock = threading.Lock()
 def ctrl_c_handler():
     if ctrl_c_handler_lock.locked():
@@ -37,14 +34,41 @@ if __name__ == '__main__':
     parser.add_argument('--ip', type=str, default='0.0.0.0', help='listening ip (default: %(default)s)')
     parser.add_argument('--port', type=int, default=8080, help='port (default: %(default)s)')
     parser.add_argument('-s', '--static', action='store_true', default=False, help='disable reorder users')
+    parser.add_argument('--trace', choices=sorted(trace.LEVEL_NAMES), default='off',
+                        help='trace rule validation / auto play (default: %(default)s)')
+    parser.add_argument('--trace-sample', type=float, default=1.0,
+                        help='fraction of traced calls to log (default: %(default)s)')
+    parser.add_argument('--asyncio', action='store_true', default=False,
+                        help='serve all connections from one asyncio event loop instead of one thread per client')
+    parser.add_argument('--tables', type=int, default=1,
+                        help='maximum number of concurrent tables (rooms) in this process (default: %(default)s)')
+    parser.add_argument('--auto-pass', action='store_true', default=False,
+                        help='table rule: pass automatically for players who cannot beat the current play')
+    parser.add_argument('--journal', type=str, default=None, metavar='DIR',
+                        help='write an append-only journal per game to DIR and restore unfinished games from it on start')
+    parser.add_argument('--lock-stats', action='store_true', default=False,
+                        help='measure game lock wait/hold time and log it at the end of each game')
+    parser.add_argument('--stats-port', type=int, default=None,
+                        help='serve state/lock/barrier latency histograms at http://127.0.0.1:PORT/metrics (Prometheus format)')
     args = parser.parse_args()
 
     logger.init_logger()
+    trace.set_trace_level(args.trace)
+    trace.set_trace_sample_rate(args.trace_sample)
+    set_lock_stats_enabled(args.lock_stats)
+    if args.stats_port is not None:
+        start_stats_server(args.stats_port)
     register_signal_handler(ctrl_c_handler)
-    threading.Thread(target=manager_thread,args=(args.static,)).start()
+    if args.asyncio:
+        try:
+            run_async_server(args.ip, args.port, args.static, args.tables, args.auto_pass, args.journal)
+        except Exception as e:
+            fatal(f"server error: {e}")
+        sys.exit(0)
     try:
         server = ReusableTCPServer((args.ip, args.port), Game_Handler)
-        manager_barrier.wait()
+        # 每个房间在第一次有人加入时创建；开启日志时先恢复未结束的牌局
+        server.rooms = RoomRegistry(args.static, args.tables, args.auto_pass, args.journal)
         print("Listening")
         server.serve_forever()
     except Exception as e:
@@ -0,0 +1,436 @@
+"""
+asyncio 服务端：一个线程、一个事件循环承载多桌对局，与线程版服务端（game_handler.py）二选一。
+
+- 每个连接一个协程：完成登录（握手、cookie）后持续读取该连接的消息放入队列，连接断开时立即标记掉线；
+- 每桌一个协程：等待大厅 -> 发牌 -> 广播轮次信息 -> 等待当前玩家出牌 -> 下一轮，
+  不需要线程版每轮的 Barrier(7) 同步，也不会因为某个不在出牌的连接而阻塞；
+- 旁观者随时可以加入，广播时不等待旁观者的发送缓冲区，积压过多的旁观者跳过中间的轮次；
+- 消息格式与线程版完全相同（docs/protocol.md），断线重连同样用 cookie 恢复座位，
+  重连后补发大厅、场信息与当前轮次信息；
+- 开启牌局日志时，启动时从日志恢复未结束的牌局，每局一桌，从等待当前玩家出牌继续。
+
+牌局规则复用 server/manager.py 中以 Game_Var 为参数的函数，每桌一个 Game_Var。
+Game_Var 中的 threading.Lock 在这里只在同步代码段内获取，不会阻塞事件循环，仅用于满足规则函数的断言。
+"""
+import asyncio
+import random
+import secrets
+import string
+
+import core.logger as logger
+from common.console import success, warn, error
+from core.network.my_network import recv_data_from_stream, write_data_to_stream, write_frame_to_stream
+from core.network.protocol import PROTOCOL_LEGACY, PROTOCOL_PLAY_ONLY, CODEC_JSON, is_hello, negotiate
+from server.broadcast import RoundStream
+from server.game_vars import Game_Var, RoundSnapshot
+from server.journal import JournalWriter, journal_header, unfinished_journals
+from server.manager import (
+    init_cards, apply_player_reply, apply_player_play, auto_pass, get_next_turn, check_game_over, take_turn_log,
+    restore_game,
+)
+
+SPECTATOR_BUFFER_LIMIT = 64 * 1024 # 旁观者发送缓冲区超过该字节数时跳过新的轮次信息
+
+_CLOSED = object() # 连接关闭后放入消息队列的标记
+
+
+class Connection:
+    """一个客户端连接：发送只写入缓冲区，由 flush 统一等待；登录之后的接收由 read_loop 放入队列。"""
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.pid = writer.get_extra_info("peername")[1]
+        self.protocol = PROTOCOL_LEGACY # 握手协商出的协议版本
+        self.codec = CODEC_JSON         # 握手协商出的编码
+        self.round_stream = RoundStream()
+        self.inbox: asyncio.Queue = asyncio.Queue()
+        self.closed = False
+        self.table: "Table" = None
+        self.seat: int = None # 玩家的座位，或旁观者视角对应的座位
+
+    async def recv_direct(self):
+        """登录阶段直接从连接读取。"""
+        return await recv_data_from_stream(self.reader, self.codec)
+
+    async def read_loop(self) -> None:
+        try:
+            while True:
+                self.inbox.put_nowait(await recv_data_from_stream(self.reader, self.codec))
+        except Exception as e:
+            logger.info(f"{self.pid} read loop exit: {e}")
+        finally:
+            self.closed = True
+            self.inbox.put_nowait(_CLOSED)
+
+    async def recv(self):
+        item = await self.inbox.get()
+        if item is _CLOSED:
+            self.inbox.put_nowait(_CLOSED) # 之后的读取同样失败
+            raise ConnectionError(f"{self.pid} connection closed")
+        return item
+
+    def send(self, data) -> None:
+        if not self.closed:
+            write_data_to_stream(data, self.writer, self.codec)
+
+    def buffered(self) -> int:
+        """发送缓冲区中尚未写出的字节数。"""
+        return self.writer.transport.get_write_buffer_size()
+
+    def send_frame(self, body: bytes) -> None:
+        if not self.closed:
+            write_frame_to_stream(body, self.writer)
+
+    async def flush(self) -> None:
+        try:
+            await self.writer.drain()
+        except (ConnectionError, OSError) as e:
+            logger.info(f"{self.pid} flush error: {e}")
+            self.close()
+
+    def close(self) -> None:
+        self.closed = True
+        self.writer.close()
+
+
+class Table:
+    def __init__(self, server: "AsyncGameServer", tid: int):
+        self.server = server
+        self.tid = tid
+        self.g = Game_Var()
+        with self.g.users_info_lock:
+            self.g.init_global_env(server.static_user_order)
+        self.conns: list[Connection] = [None for _ in range(6)] # 各座位当前的连接，掉线时为 None
+        self.onlookers: set[Connection] = set()
+        self.playing = False
+        self.changed = asyncio.Event() # 有玩家加入、掉线或重连
+
+    def is_waiting(self) -> bool:
+        return not self.playing and self.g.users_num < 6
+
+    # 发送（只写缓冲区）
+    def send_waiting_hall_info(self, conn: Connection) -> None:
+        users_name, users_error = [], []
+        for i, info in enumerate(self.g.users_info):
+            if info is None:
+                continue
+            users_name.append(info[0])
+            users_error.append(self.g.users_error[i])
+        conn.send(users_name)
+        conn.send(users_error)
+
+    def send_field_info(self, conn: Connection, is_player: bool) -> None:
+        conn.send(is_player)
+        conn.send([name for name, _ in self.g.users_info])
+        conn.send(conn.seat)
+
+    def send_round_info(self, conn: Connection, snapshot: RoundSnapshot) -> None:
+        for body in conn.round_stream.bodies(snapshot, conn.seat):
+            conn.send_frame(body)
+
+    def send_game_state(self, conn: Connection, is_player: bool) -> None:
+        """开局或中途加入（旁观、重连）时补发大厅、场信息与当前轮次信息。"""
+        self.send_waiting_hall_info(conn)
+        self.send_field_info(conn, is_player)
+        with self.g.game_lock:
+            snapshot = self.g.snapshot()
+        self.send_round_info(conn, snapshot)
+
+    def all_conns(self) -> list[Connection]:
+        return [conn for conn in self.conns if conn is not None] + list(self.onlookers)
+
+    async def flush_all(self) -> None:
+        """等待玩家的发送缓冲区写出；旁观者不等待，积压由 broadcast_round_info 限制。"""
+        await asyncio.gather(*(conn.flush() for conn in self.conns if conn is not None))
+
+    # 连接加入与离开
+    def seat_player(self, conn: Connection, user_name: str, cookie: str) -> int:
+        assert self.is_waiting()
+        seat = self.g.users_player_id[self.g.users_num]
+        self.g.users_num += 1
+        self.g.users_info[seat] = (user_name, conn.pid)
+        self.g.users_cookie[cookie] = seat
+        conn.table, conn.seat = self, seat
+        self.conns[seat] = conn
+        self.changed.set()
+        success(f"Table {self.tid}: player {user_name}({seat}, {conn.pid}) joined game -> cookie: {cookie}")
+        return seat
+
+    def recover_player(self, conn: Connection, seat: int) -> None:
+        assert self.g.users_error[seat] and self.conns[seat] is None
+        self.g.users_error[seat] = False
+        user_name, old_pid = self.g.users_info[seat]
+        self.g.users_info[seat] = (user_name, conn.pid)
+        conn.table, conn.seat = self, seat
+        self.conns[seat] = conn
+        if self.playing:
+            self.send_game_state(conn, True)
+        self.changed.set()
+        success(f"Table {self.tid}: {conn.pid} recover: {(user_name, old_pid)} -> {(user_name, conn.pid)}")
+
+    def add_onlooker(self, conn: Connection, user_name: str) -> None:
+        conn.table, conn.seat = self, secrets.randbelow(6)
+        self.onlookers.add(conn)
+        if self.playing: # 尚未开局时由 start_game 统一发送
+            self.send_game_state(conn, False)
+        success(f"Table {self.tid}: onlooker {user_name}({conn.pid}) joined game -> player: {conn.seat}")
+
+    def disconnect(self, conn: Connection) -> None:
+        if conn in self.onlookers:
+            self.onlookers.discard(conn)
+            print(f"Onlooker {conn.pid} exit")
+        elif self.conns[conn.seat] is conn:
+            self.conns[conn.seat] = None
+            if self.playing and self.g.game_over != 0: # 收到结算信息后正常退出
+                success(f"Table {self.tid}: player {conn.pid}({conn.seat}) exit successfully")
+                return
+            self.g.users_error[conn.seat] = True
+            self.changed.set()
+            warn(f"Table {self.tid}: player {conn.pid}({conn.seat}) error exit")
+
+    async def wait_changed(self) -> None:
+        self.changed.clear()
+        await self.changed.wait()
+
+    # 牌局
+    async def wait_players(self) -> None:
+        """有玩家加入、掉线或重连时才重发大厅信息；掉线由 read_loop 立即发现，无需定时重发。"""
+        while self.g.users_num < 6:
+            self.changed.clear() # 在发送之前清除，发送期间的变化会在下一次循环中发出
+            for conn in self.all_conns():
+                self.send_waiting_hall_info(conn)
+            await self.flush_all()
+            await self.changed.wait()
+
+    def start_game(self) -> None:
+        logger.info(f"Table {self.tid}: New game --- Round {self.g.serving_game_round}")
+        journals = self.server.journals
+        with self.g.users_info_lock:
+            header = journal_header(self.g) if journals is not None else None
+        seed = random.getrandbits(64)
+        with self.g.game_lock:
+            self.g.init_game_env()
+            init_cards(self.g, seed)
+            if journals is not None:
+                self.g.journal = journals.start(seed, header)
+        self.playing = True
+        for conn in self.conns:
+            if conn is not None:
+                self.send_game_state(conn, True)
+        for conn in self.onlookers:
+            self.send_game_state(conn, False)
+
+    async def play_turn(self, seat: int) -> None:
+        """等待当前玩家的心跳与出牌并更新牌局；掉线（或协议版本 4 下出牌不合法）时等待其重连后重新接收。"""
+        while True:
+            conn = self.conns[seat]
+            if conn is None:
+                await self.wait_changed()
+                continue
+            try:
+                while True:
+                    finished = await conn.recv()
+                    if not isinstance(finished, bool):
+                        raise ValueError(f"invalid heartbeat: {finished}")
+                    if finished:
+                        break
+                if conn.protocol >= PROTOCOL_PLAY_ONLY:
+                    user_played_cards = await conn.recv()
+                    with self.g.game_lock:
+                        apply_player_play(seat, user_played_cards, self.g)
+                    return
+                user_cards = await conn.recv()
+                user_played_cards = await conn.recv()
+                now_score = await conn.recv()
+                with self.g.game_lock:
+                    apply_player_reply(seat, user_cards, user_played_cards, now_score, self.g)
+                return
+            except Exception as e: # 与线程版一致，客户端发来任何异常数据都按掉线处理，不影响整桌
+                error(f"Table {self.tid}: player {conn.pid}({seat}) error: {e}")
+                conn.close()
+                if self.conns[seat] is conn: # read_loop 尚未退出时也按掉线处理
+                    self.disconnect(conn)
+
+    def broadcast_round_info(self) -> None:
+        with self.g.game_lock:
+            snapshot = self.g.snapshot()
+        for conn in self.conns:
+            if conn is not None:
+                self.send_round_info(conn, snapshot)
+        for conn in self.onlookers:
+            # 积压过多的旁观者跳过这一轮，之后的增量以它上一次实际发送的快照为基准；最终结果总是发送
+            if conn.buffered() <= SPECTATOR_BUFFER_LIMIT or snapshot.game_over != 0:
+                self.send_round_info(conn, snapshot)
+
+    def resume(self, records: list[dict]) -> None:
+        """从牌局日志恢复：所有玩家按掉线处理，run 直接从等待当前玩家出牌开始。"""
+        restore_game(self.g, records)
+        self.playing = True
+
+    def finish_game(self) -> None:
+        with self.g.game_lock:
+            if self.g.journal is not None:
+                self.g.journal.close(self.g.game_over)
+                self.g.journal = None
+        for conn in self.all_conns():
+            conn.close()
+        self.server.forget_cookies(self.g.users_cookie)
+        self.conns = [None for _ in range(6)]
+        self.onlookers = set()
+        self.playing = False
+        with self.g.users_info_lock:
+            self.g.init_global_env(self.server.static_user_order)
+
+    async def run(self) -> None:
+        while True:
+            if not self.playing: # 从日志恢复的牌局已经开局
+                await self.wait_players()
+                self.start_game()
+                await self.flush_all()
+            while self.g.game_over == 0:
+                await self.play_turn(self.g.now_player)
+                with self.g.game_lock:
+                    get_next_turn(self.g)
+                    check_game_over(self.g)
+                    if self.server.auto_pass:
+                        auto_pass(self.g)
+                    take_turn_log(self.g)
+                self.broadcast_round_info()
+                await self.flush_all()
+            success(f"Table {self.tid}: game over {self.g.game_over}")
+            self.finish_game()
+
+
+class AsyncGameServer:
+    def __init__(self, static_user_order: bool = False, max_tables: int = 1, auto_pass: bool = False,
+                 journal_dir: str = None):
+        self.static_user_order = static_user_order
+        self.auto_pass = auto_pass # 桌规：自动为压不过上家的玩家过牌，见 manager.auto_pass
+        self.max_tables = max_tables
+        self.tables: list[Table] = []
+        self.cookies: dict[str, tuple[Table, int]] = {} # 所有桌的 cookie -> (桌, 座位)
+        self._tasks: set[asyncio.Task] = set()
+        self.journals = JournalWriter(journal_dir) if journal_dir is not None else None
+
+    def new_cookie(self, length=8) -> str:
+        characters = string.ascii_letters + string.digits
+        while True:
+            cookie = ''.join(secrets.choice(characters) for _ in range(length))
+            if cookie not in self.cookies:
+                return cookie
+
+    def forget_cookies(self, cookies) -> None:
+        for cookie in cookies:
+            self.cookies.pop(cookie, None)
+
+    def _on_table_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            error(f"table error: {task.exception()!r}")
+
+    def add_table(self, table: Table) -> Table:
+        self.tables.append(table)
+        task = asyncio.get_running_loop().create_task(table.run())
+        self._tasks.add(task)
+        task.add_done_callback(self._on_table_done)
+        return table
+
+    def find_table(self) -> Table:
+        """新玩家加入的桌：优先凑满正在等待的桌，否则开新桌；桌数已满时返回 None。"""
+        for table in self.tables:
+            if table.is_waiting():
+                return table
+        if len(self.tables) >= self.max_tables:
+            return None
+        return self.add_table(Table(self, len(self.tables)))
+
+    def restore_tables(self) -> None:
+        """恢复日志中未结束的牌局。恢复的桌不受 max_tables 限制，但会占用名额。"""
+        for path, records in unfinished_journals(self.journals.directory):
+            table = Table(self, len(self.tables))
+            try:
+                table.resume(records)
+                journal = self.journals.resume(path)
+            except Exception as e: # 同 RoomRegistry.restore_rooms
+                error(f"journal {path} restore error: {e}")
+                self.journals.discard(path)
+                continue
+            if table.g.game_over != 0: # 最后一手已经记录，只差 end 记录
+                journal.close(table.g.game_over)
+                continue
+            table.g.journal = journal
+            for cookie, seat in table.g.users_cookie.items():
+                self.cookies[cookie] = (table, seat)
+            self.add_table(table)
+            logger.info(f"Table {table.tid} restored from {path}: {len(records) - 1} moves")
+
+    async def login(self, conn: Connection) -> bool:
+        """与线程版 Game_Handler.recv_user_info 相同的登录流程。"""
+        if_has_cookie = await conn.recv_direct()
+        # 新版客户端先发送握手，旧版客户端第一条即为 if_has_cookie
+        if is_hello(if_has_cookie):
+            reply = negotiate(if_has_cookie)
+            conn.send(reply)
+            await conn.flush()
+            conn.protocol, conn.codec = reply["protocol"], reply["codec"] # 握手之后按协商的编码收发
+            conn.round_stream = RoundStream(conn.protocol, conn.codec)
+            logger.info(f"{conn.pid} protocol: {reply}")
+            if_has_cookie = await conn.recv_direct()
+        seat_of = None
+        if if_has_cookie:
+            seat_of = self.cookies.get(await conn.recv_direct())
+        if seat_of is None:
+            conn.send(False)
+            await conn.flush()
+            user_name = await conn.recv_direct()
+            table = self.find_table()
+            if table is None: # 所有桌都已满员，随机旁观一桌
+                conn.send(None)
+                random.choice(self.tables).add_onlooker(conn, user_name)
+            else:
+                cookie = self.new_cookie()
+                conn.send(cookie)
+                self.cookies[cookie] = (table, table.seat_player(conn, user_name, cookie))
+            await conn.flush()
+            return True
+        conn.send(True)
+        table, seat = seat_of
+        if table.g.users_error[seat]:
+            conn.send(True)
+            table.recover_player(conn, seat)
+            await conn.flush()
+            return True
+        conn.send(False)
+        await conn.flush()
+        error(f"{conn.pid} recover failed because user is playing")
+        return False
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        conn = Connection(reader, writer)
+        print(f'{writer.get_extra_info("peername")[0]}({conn.pid}) connected')
+        try:
+            logged_in = await self.login(conn)
+        except Exception as e:
+            error(f"{conn.pid} error receiving user info: {e}")
+            logged_in = False
+        if not logged_in:
+            conn.close()
+            return
+        await conn.read_loop()
+        conn.table.disconnect(conn)
+
+    async def start(self, ip: str, port: int) -> asyncio.AbstractServer:
+        if self.journals is not None:
+            self.restore_tables()
+        return await asyncio.start_server(self.handle_client, ip, port, reuse_address=True)
+
+    async def serve(self, ip: str, port: int) -> None:
+        server = await self.start(ip, port)
+        print("Listening")
+        async with server:
+            await server.serve_forever()
+
+
+def run_async_server(ip: str, port: int, static_user_order: bool = False, max_tables: int = 1,
+                     auto_pass: bool = False, journal_dir: str = None) -> None:
+    asyncio.run(AsyncGameServer(static_user_order, max_tables, auto_pass, journal_dir).serve(ip, port))
@@ -0,0 +1,118 @@
+"""
+广播轮次信息：同一轮发给所有玩家与旁观者的帧，公共部分只序列化一次。
+
+Game_Var.snapshot() 在牌局状态不变时返回同一个快照，快照的 encoded 按 (种类, 编码[, 增量基准]) 缓存
+编码好的公共部分，每个座位只追加自己的 client_cards（旧版协议中 client_cards 是单独一帧）；
+拼接好的帧也按座位缓存。因此旁观者再多，每轮每种编码的公共部分只编码一次、手牌最多编码 6 次。
+
+多个线程可能同时发现缓存缺失并各自编码，结果相同，后写入的覆盖先写入的，不需要加锁。
+"""
+import threading
+
+from core.network.my_network import EncodedDict, EncodedRoundInfo, encode_body
+from core.network.protocol import (
+    PROTOCOL_LEGACY, PROTOCOL_DELTA, CODEC_JSON, KEYFRAME_INTERVAL, ROUND_INFO_FIELDS, diff_round_info,
+)
+# RoundSnapshot 见 server/game_vars.py；Game_Var 持有 SpectatorFeed，这里不导入以免循环引用
+
+
+def _cached(snapshot: "RoundSnapshot", key: tuple, make):
+    value = snapshot.encoded.get(key)
+    if value is None:
+        value = snapshot.encoded[key] = make()
+    return value
+
+
+def _public_info(snapshot: "RoundSnapshot") -> dict:
+    return _cached(snapshot, ("public",), snapshot.public_info)
+
+
+def _legacy_bodies(snapshot: "RoundSnapshot", codec: str) -> list:
+    """旧版协议逐字段发送的各帧，client_cards 的位置为 None。"""
+    def make():
+        public_info = _public_info(snapshot)
+        return [
+            None if field == "client_cards" else encode_body(public_info[field], codec)
+            for field in ROUND_INFO_FIELDS if field in public_info or field == "client_cards"
+        ]
+    return _cached(snapshot, ("legacy", codec), make)
+
+
+def _keyframe(snapshot: "RoundSnapshot", codec: str) -> EncodedRoundInfo:
+    return _cached(snapshot, ("keyframe", codec), lambda: EncodedRoundInfo(_public_info(snapshot), codec))
+
+
+def _delta(last: "RoundSnapshot", snapshot: "RoundSnapshot", codec: str) -> EncodedDict:
+    # 同一局中各连接的基准通常是同一个上一快照，按基准版本缓存
+    def make():
+        return EncodedDict(diff_round_info(_public_info(last), _public_info(snapshot)), codec, wrap="delta")
+    return _cached(snapshot, ("delta", codec, last.version), make)
+
+
+class RoundStream:
+    """
+    服务端每个连接一个：按协商的协议与编码把快照转成要发送的帧 body。
+    增量模式下记录上一次发给该连接的快照，之后只发送变化的字段 {"delta": {...}}。
+    TCP 保证按序送达，发出即视为对方已收到；连接断开重连后是新的 RoundStream，第一帧自然是完整关键帧。
+    游戏结束（需要附带所有人手牌）以及每隔 keyframe_interval 帧也发送完整关键帧。
+    """
+    def __init__(self, protocol: int = PROTOCOL_LEGACY, codec: str = CODEC_JSON,
+                 keyframe_interval: int = KEYFRAME_INTERVAL):
+        self.protocol = protocol
+        self.codec = codec
+        self.keyframe_interval = keyframe_interval
+        self.last: "RoundSnapshot" = None # 上一次发送的快照
+        self.last_cards: tuple = None   # 上一次发送的 client_cards
+        self.since_keyframe = 0         # 距上一关键帧的帧数
+
+    def bodies(self, snapshot: "RoundSnapshot", seat: int) -> list[bytes]:
+        # 旁观者与所看座位的玩家收到的帧相同，拼接好的帧同样按座位缓存
+        cards = snapshot.users_cards[seat]
+        codec = self.codec
+        if self.protocol == PROTOCOL_LEGACY:
+            client_cards = _cached(snapshot, ("legacy", codec, seat), lambda: encode_body(list(cards), codec))
+            return [client_cards if body is None else body for body in _legacy_bodies(snapshot, codec)]
+        last, last_cards = self.last, self.last_cards
+        self.last, self.last_cards = snapshot, cards
+        if (self.protocol < PROTOCOL_DELTA or last is None or snapshot.game_over != 0
+                or self.since_keyframe + 1 >= self.keyframe_interval):
+            self.since_keyframe = 0
+            return [_cached(snapshot, ("keyframe", codec, seat), lambda: _keyframe(snapshot, codec).splice(list(cards)))]
+        self.since_keyframe += 1
+        if cards == last_cards:
+            return [_cached(snapshot, ("delta", codec, last.version, None), lambda: _delta(last, snapshot, codec).splice({}))]
+        return [_cached(
+            snapshot, ("delta", codec, last.version, seat),
+            lambda: _delta(last, snapshot, codec).splice({"client_cards": list(cards)}),
+        )]
+
+
+class SpectatorFeed:
+    """
+    房间的旁观者广播（线程版服务端）：Manager 每轮发布快照后立即返回，不等待任何旁观者。
+    每个旁观者线程只取最新的快照发送，相当于每人一个长度为 1、新帧覆盖旧帧的发送队列：
+    发送慢的旁观者跳过中间的轮次（增量以它上一次实际发送的快照为基准），不会拖慢牌局。
+    旁观者可以在任何时候加入，加入后第一帧即为当前状态。
+    """
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.game_round = 0                 # 最新快照所属的局
+        self.latest: "RoundSnapshot" = None   # 最新快照，局间保留上一局的最终结果
+
+    def publish(self, game_round: int, snapshot: "RoundSnapshot") -> None:
+        with self.cond:
+            self.game_round = game_round
+            self.latest = snapshot
+            self.cond.notify_all()
+
+    def wait(self, game_round: int, sent: "RoundSnapshot" = None) -> "RoundSnapshot":
+        """
+        等到第 game_round 局有比 sent 更新的快照并返回；该局尚未开始时一直等待。
+        该局已经结束且最终结果已被下一局覆盖（旁观者落后太多）时返回 None。
+        """
+        with self.cond:
+            self.cond.wait_for(lambda: self.game_round > game_round
+                               or (self.game_round == game_round and self.latest is not sent))
+            if self.game_round != game_round:
+                return None
+            return self.latest
@@ -1,13 +1,14 @@
 import secrets
-import string
 import core.logger as logger
 from common.console import success, error
 from server.player import Player
 from server.onlooker import Onlooker
-from server.game_vars import gvar
 from socketserver import BaseRequestHandler
-from core.network.my_network import recv_data_from_socket, send_data_to_socket
+from core.network.my_network import recv_data_from_socket, send_data_to_socket, send_frame, set_socket_codec
+from core.network.protocol import PROTOCOL_LEGACY, is_hello, negotiate
 from core.card import Card
+from server.broadcast import RoundStream
+from server.game_vars import RoundSnapshot
 
 class Game_Handler(BaseRequestHandler):
     def __init__(self, request, client_address, server):
@@ -19,24 +20,31 @@ class Game_Handler(BaseRequestHandler):
         self.pid = 0
         self.users_name = []
         self.users_error = []
+        self.protocol = PROTOCOL_LEGACY # 握手协商出的协议版本
+        self.round_stream = RoundStream() # 按协商的协议编码轮次信息，增量模式下记录上一次发送的快照
+        self.room = None # 登录时分配的房间，见 server/rooms.py
         
         super().__init__(request, client_address, server)
 
     # 11/03/2024: 把send_data和recv_data方法提取到Network文件中去了
 
+    @property
+    def g(self):
+        return self.room.g # 所在房间的牌局状态
+
     def close(self):
         self.request.close()
 
     def update_users_info(self):
-        assert gvar.users_info_lock.locked()
+        assert self.g.users_info_lock.locked()
         self.users_name = []
         self.users_error = []
         for i in range(6):
-            if gvar.users_info[i] is None:
+            if self.g.users_info[i] is None:
                 continue
-            user_name, _ = gvar.users_info[i]
+            user_name, _ = self.g.users_info[i]
             self.users_name.append(user_name)
-            self.users_error.append(gvar.users_error[i])
+            self.users_error.append(self.g.users_error[i])
         return len(self.users_name)
 
     def send_field_info(self):
@@ -46,22 +54,10 @@ class Game_Handler(BaseRequestHandler):
         send_data_to_socket(self.users_name, self.request)
         send_data_to_socket(self.client_player, self.request)
     
-    def send_round_info(self):
-        assert gvar.game_lock.locked()
-        send_data_to_socket(gvar.game_over, self.request)
-        send_data_to_socket(gvar.users_score, self.request)
-
-        # 用户手牌数
-        send_data_to_socket([len(cards) for cards in gvar.users_cards], self.request) # 更新用户手牌数
-        send_data_to_socket(gvar.users_played_cards, self.request) # 更新场上出的牌
-        if gvar.game_over != 0:
-            send_data_to_socket(gvar.users_cards, self.request)
-
-        # 当前用户手牌
-        send_data_to_socket(gvar.users_cards[self.client_player], self.request)
-        send_data_to_socket(gvar.now_score, self.request)
-        send_data_to_socket(gvar.now_player, self.request)
-        send_data_to_socket(gvar.head_master, self.request)
+    def send_round_info(self, snapshot: RoundSnapshot):
+        # 快照由调用方持锁获取，这里的序列化与发送都不持有 game_lock；公共部分由各连接共用编码结果
+        for body in self.round_stream.bodies(snapshot, self.client_player):
+            send_frame(self.request, body)
 
     def recv_player_reply(self) -> tuple[list[Card], list[Card], int]:
         user_cards = recv_data_from_socket(self.request)
@@ -69,6 +65,10 @@ class Game_Handler(BaseRequestHandler):
         now_score = recv_data_from_socket(self.request)
         return user_cards, user_played_cards, now_score
 
+    def recv_player_play(self) -> list[Card]:
+        # 协议版本 4：只有所出的牌（过牌为 ['F']）
+        return recv_data_from_socket(self.request)
+
     def recv_playing_heartbeat(self):
         finished = recv_data_from_socket(self.request)
         assert isinstance(finished, bool), finished
@@ -78,80 +78,93 @@ class Game_Handler(BaseRequestHandler):
         send_data_to_socket(self.users_name, self.request)
         send_data_to_socket(self.users_error, self.request)
     
-    def generate_cookie(self, length=8):
-        # 可以使用的字符集合
-        characters = string.ascii_letters + string.digits
-        # 使用 secrets 模块生成安全的随机字符串
-        cookie = ''.join(secrets.choice(characters) for _ in range(length))
-        return cookie
-
     def recv_user_info(self):
-        assert gvar.users_info_lock.locked()
         logger.info(f"{self.pid} waiting for user info")
+        rooms = self.server.rooms
         try:
             if_has_cookie = recv_data_from_socket(self.request)
+            # 新版客户端先发送握手，旧版客户端第一条即为 if_has_cookie
+            if is_hello(if_has_cookie):
+                reply = negotiate(if_has_cookie)
+                send_data_to_socket(reply, self.request)
+                self.protocol = reply["protocol"]
+                set_socket_codec(self.request, reply["codec"]) # 握手之后按协商的编码收发
+                self.round_stream = RoundStream(reply["protocol"], reply["codec"])
+                logger.info(f"{self.pid} protocol: {reply}")
+                if_has_cookie = recv_data_from_socket(self.request)
             logger.info(f"if_has_cookie: {if_has_cookie}")
             if if_has_cookie:
                 self.user_cookie = recv_data_from_socket(self.request)
-                self.client_player = gvar.users_cookie.get(self.user_cookie)
-            else:
-                self.client_player = None
-            # cookie是否合法
-            if self.client_player is None:
-                send_data_to_socket(False, self.request)
-                # 不合法当做正常的玩家加入
-                user_idx = gvar.users_num
-                user_name = recv_data_from_socket(self.request)
-                if user_idx == 6:
-                    self.is_player = False
-                    self.client_player = secrets.randbelow(6)
-                    send_data_to_socket(None, self.request)
-                    success(f"Onlooker {user_name}({self.pid}) joined game -> player: {self.client_player}")
-                else:
-                    self.is_player = True
-                    self.client_player = gvar.users_player_id[user_idx]
-                    # 生成cookie
-                    self.user_cookie = self.generate_cookie()
-                    while gvar.users_cookie.get(self.user_cookie) is not None:
-                        self.user_cookie = self.generate_cookie()
-                    send_data_to_socket(self.user_cookie, self.request)
-                    success(f"Player {user_name}({self.client_player}, {self.pid}) joined game -> cookie: {self.user_cookie}")
-                    logger.info(f"{user_name}({self.client_player}, {self.pid}) -> user_cookie: {self.user_cookie}")
-                # 修改是放在最后的，防止中间出现任何的网络通信失败
-                if self.is_player:
-                    gvar.users_num += 1
-                    gvar.users_info[self.client_player] = (user_name, self.pid)
-                    assert 0 <= self.client_player and self.client_player < 6, self.client_player
-                    gvar.users_cookie[self.user_cookie] = self.client_player
-            else:
-                # 发送合法标识，并尝试恢复
-                send_data_to_socket(True, self.request)
-                self.is_player = True
-                assert 0 <= self.client_player and self.client_player < 6, self.client_player
-                if gvar.users_error[self.client_player]:
-                    send_data_to_socket(True, self.request)
-                    # 修改是放在最后的，防止中间出现任何的网络通信失败
-                    self.his_state = gvar.users_his_state[self.client_player]
-                    gvar.users_error[self.client_player] = False
-                    user_name, old_pid = gvar.users_info[self.client_player]
-                    gvar.users_info[self.client_player] = (user_name, self.pid)
-                    success(f"{self.pid} recover: {(user_name, old_pid)} -> {(user_name, self.pid)}")
-                else:
-                    send_data_to_socket(False, self.request)
-                    raise RuntimeError("Recover failed because user is playing")
+                self.room = rooms.room_of_cookie(self.user_cookie)
+            # cookie是否合法（找到房间后还要在房间锁内确认，期间该局可能已经结束）
+            if self.room is not None:
+                with self.g.users_info_lock:
+                    self.client_player = self.g.users_cookie.get(self.user_cookie)
+                    if self.client_player is not None:
+                        self.serving_game_round = self.g.serving_game_round
+                        self.recover_user()
+                        return True
+            send_data_to_socket(False, self.request)
+            # 不合法当做正常的玩家加入
+            user_name = recv_data_from_socket(self.request)
+            self.room = rooms.find_room()
+            with self.g.users_info_lock:
+                self.serving_game_round = self.g.serving_game_round
+                self.join_room(user_name)
         except Exception as e:
             error(f"{self.pid} error receiving user info: {e}") # 11/03/2024: Fix typo
             return False
         else:
             return True
 
-    def handle(self):        
-        with gvar.users_info_lock:
-            address, self.pid = self.client_address
-            print(f'{address}({self.pid}) connected')
-            self.serving_game_round = gvar.serving_game_round
-            if self.recv_user_info() is False:
-                return
+    def join_room(self, user_name):
+        assert self.g.users_info_lock.locked()
+        user_idx = self.g.users_num
+        if user_idx == 6:
+            self.is_player = False
+            self.client_player = secrets.randbelow(6)
+            send_data_to_socket(None, self.request)
+            success(f"Onlooker {user_name}({self.pid}) joined room {self.room.rid} -> player: {self.client_player}")
+        else:
+            self.is_player = True
+            self.client_player = self.g.users_player_id[user_idx]
+            # 生成cookie，在所有房间中唯一
+            self.user_cookie = self.server.rooms.new_cookie()
+            send_data_to_socket(self.user_cookie, self.request)
+            success(f"Player {user_name}({self.client_player}, {self.pid}) joined room {self.room.rid} -> cookie: {self.user_cookie}")
+            logger.info(f"{user_name}({self.client_player}, {self.pid}) -> user_cookie: {self.user_cookie}")
+        # 修改是放在最后的，防止中间出现任何的网络通信失败
+        if self.is_player:
+            self.g.users_num += 1
+            self.g.users_info[self.client_player] = (user_name, self.pid)
+            assert 0 <= self.client_player and self.client_player < 6, self.client_player
+            self.g.users_cookie[self.user_cookie] = self.client_player
+            self.g.notify_users_info_changed()
+
+    def recover_user(self):
+        assert self.g.users_info_lock.locked()
+        # 发送合法标识，并尝试恢复
+        send_data_to_socket(True, self.request)
+        self.is_player = True
+        assert 0 <= self.client_player and self.client_player < 6, self.client_player
+        if self.g.users_error[self.client_player]:
+            send_data_to_socket(True, self.request)
+            # 修改是放在最后的，防止中间出现任何的网络通信失败
+            self.his_state = self.g.users_his_state[self.client_player]
+            self.g.users_error[self.client_player] = False
+            user_name, old_pid = self.g.users_info[self.client_player]
+            self.g.users_info[self.client_player] = (user_name, self.pid)
+            self.g.notify_users_info_changed()
+            success(f"{self.pid} recover: {(user_name, old_pid)} -> {(user_name, self.pid)}")
+        else:
+            send_data_to_socket(False, self.request)
+            raise RuntimeError("Recover failed because user is playing")
+
+    def handle(self):
+        address, self.pid = self.client_address
+        print(f'{address}({self.pid}) connected')
+        if self.recv_user_info() is False:
+            return
         if self.is_player:
             Player(
                 self.client_player,
@@ -164,6 +177,3 @@ class Game_Handler(BaseRequestHandler):
                 self.serving_game_round,
                 self,
             ).run()
-
-
-        
\ No newline at end of file
@@ -1,12 +1,55 @@
 import random
 import threading
+from typing import NamedTuple
+from server.broadcast import SpectatorFeed
+from server.instrument import InstrumentedBarrier, InstrumentedLock
 from server.state_machine import GameState
 from core.card import Card
+from core.hand import Hand
+from core.playingrules import PlayInfo
+
+class RoundSnapshot(NamedTuple):
+    """
+    某一时刻牌局状态的不可变副本：复制代价与手牌总数成正比，Card 为不可变享元无需拷贝。
+    发给不同座位的轮次信息都由同一个快照生成，不再需要持有 game_lock。
+    牌局状态不变时 Game_Var.snapshot() 返回同一个快照，encoded 缓存编码好的公共部分（见 server/broadcast.py）。
+    """
+    game_over         : int
+    users_score       : tuple[int, ...]
+    users_played_cards: tuple[tuple, ...]
+    users_cards       : tuple[tuple[Card, ...], ...]
+    now_score         : int
+    now_player        : int
+    head_master       : int
+    version           : int  # 同一 Game_Var 中每个新快照加一
+    encoded           : dict # 广播编码缓存
+
+    def public_info(self) -> dict:
+        """所有座位都相同的部分，即不含 client_cards 的轮次信息。"""
+        public_info = {
+            "game_over"         : self.game_over,
+            "users_score"       : list(self.users_score),
+            "users_cards_num"   : [len(cards) for cards in self.users_cards],
+            "users_played_cards": [list(cards) for cards in self.users_played_cards],
+            "now_score"         : self.now_score,
+            "now_player"        : self.now_player,
+            "head_master"       : self.head_master,
+        }
+        if self.game_over != 0:
+            public_info["users_cards"] = [list(cards) for cards in self.users_cards]
+        return public_info
+
+    def round_info(self, client_player: int) -> dict:
+        """某个座位视角的轮次信息，键见 core/network/protocol.py 的 ROUND_INFO_FIELDS。"""
+        round_info = self.public_info()
+        round_info["client_cards"] = list(self.users_cards[client_player])
+        return round_info
+
 
 class Game_Var:
     def init_game_env(self):
         assert self.game_lock.locked()
-        self.users_cards       : list[list[Card]] = [[] for _ in range(6)]
+        self.users_cards       : list[Hand]       = [Hand() for _ in range(6)]
         self.users_score       : list[int]        = [0 for _ in range(6)]
         self.users_finished    : list[bool]       = [False for _ in range(6)] # 玩家打完所有的牌
         self.users_played_cards: list[list[Card]] = [[] for _ in range(6)]  # 场上所出手牌
@@ -15,13 +58,13 @@ class Game_Var:
         self.now_player  = 0  # 当前出牌玩家
         self.head_master = -1  # 头科玩家下标
         self.last_player = -1  # 上一位出牌玩家
+        self.last_play   : PlayInfo = None # 上一位出牌玩家所出牌的牌型与牌力，每手牌只判断一次
         self.team_score  = [0, 0]  # 各队分数
         self.team_out    = [0, 0]  # 各队逃出人数
         self.game_over   = 0 # 游戏结束状态
     
     def init_global_env(self, static_user_order: bool = False):
         assert self.users_info_lock.locked()
-        assert self.onlooker_lock.locked()
         self.serving_game_round += 1
         self.users_info = [None for _ in range(6)]
         self.users_cookie = {}
@@ -31,10 +74,38 @@ class Game_Var:
             random.shuffle(self.users_player_id)
         self.users_his_state = [GameState.init for _ in range(6)]
         self.users_error = [False for _ in range(6)]
-    
+        self.notify_users_info_changed()
+
+    def notify_users_info_changed(self):
+        """users_num 或 users_error 变化后调用，唤醒等待大厅中的玩家线程重发大厅信息。"""
+        assert self.users_info_lock.locked()
+        self.users_info_version += 1
+        self.users_info_changed.notify_all()
+
+    def snapshot(self) -> "RoundSnapshot":
+        """
+        持锁复制发送轮次信息所需的状态，之后的序列化与网络发送都在锁外进行。
+        与上一个快照内容相同时直接返回上一个快照，各线程共用它的编码缓存。
+        """
+        assert self.game_lock.locked()
+        state = (
+            self.game_over,
+            tuple(self.users_score),
+            tuple(tuple(cards) for cards in self.users_played_cards),
+            tuple(tuple(cards) for cards in self.users_cards),
+            self.now_score,
+            self.now_player,
+            self.head_master,
+        )
+        last = self.last_snapshot
+        if last is not None and last[:len(state)] == state:
+            return last
+        self.last_snapshot = RoundSnapshot(*state, version=last.version + 1 if last else 0, encoded={})
+        return self.last_snapshot
+
     def __init__(self) -> None:
         # 用户登录
-        self.users_info_lock = threading.Lock()
+        self.users_info_lock = InstrumentedLock("users_info_lock")
         self.serving_game_round = 0
         self.users_info = [None for _ in range(6)]
         self.users_cookie = {}
@@ -42,22 +113,19 @@ class Game_Var:
         self.users_player_id = [0 for _ in range(6)]
         self.users_his_state = [GameState.init for _ in range(6)] # 用户记录的历史状态
         self.users_error = [False for _ in range(6)] # 用户是否发生异常
+        self.users_info_changed = threading.Condition(self.users_info_lock) # 见 notify_users_info_changed
+        self.users_info_version = 0 # 每次通知加一，等待方据此判断是否有新变化
         # 牌局变量
-        self.game_lock = threading.Lock()
+        self.game_lock = InstrumentedLock("game_lock")
+        self.last_snapshot: RoundSnapshot = None
+        self.journal: "GameJournal" = None # 本局的牌局日志（server/journal.py），未开启时为 None
         with self.game_lock:
             self.init_game_env()
         # 玩家
-        self.game_init_barrier = threading.Barrier(7)
-        self.game_start_barrier = threading.Barrier(7)
-        self.send_round_info_barrier = threading.Barrier(7)
-        self.recv_player_info_barrier = threading.Barrier(7)
-        self.next_turn_barrier = threading.Barrier(7)
+        self.game_init_barrier = InstrumentedBarrier(7, "game_init_barrier")
+        self.game_start_barrier = InstrumentedBarrier(7, "game_start_barrier")
+        self.send_round_info_barrier = InstrumentedBarrier(7, "send_round_info_barrier")
+        self.recv_player_info_barrier = InstrumentedBarrier(7, "recv_player_info_barrier")
+        self.next_turn_barrier = InstrumentedBarrier(7, "next_turn_barrier")
         # 旁观者
-        self.onlooker_lock = threading.Lock()
-        self.onlooker_local_lock = threading.Lock()
-        self.onlooker_number = 0
-        self.onlooker_onlooker_sync_barrier = threading.Barrier(1)
-        self.onlooker_send_round_info_barrier = threading.Barrier(1)
-        self.onlooker_event = threading.Event()
-
-gvar = Game_Var()
\ No newline at end of file
+        self.spectators = SpectatorFeed()
@@ -0,0 +1,230 @@
+"""
+服务端计时：锁的等待与持有时间、Barrier 的等待时间、状态机每个状态函数的耗时，用于区分慢在网络、锁还是同步。
+
+- InstrumentedLock / InstrumentedBarrier 与 threading.Lock / threading.Barrier 接口一致；
+- GameStateMachine.run 为 Manager、Player、Onlooker 的每个状态函数计时；
+- 耗时记入按名称汇总（所有房间共用）的直方图，桶为 1us ~ 10s 的对数刻度，每次记录只是一次二分查找加计数；
+- 计时默认关闭，关闭时只多一次布尔判断。--lock-stats 打开计时并在每局结束时由 Manager 把锁统计写入日志，
+  --stats-port 打开计时并在 127.0.0.1 上以 Prometheus 文本格式提供 /metrics。
+"""
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_lock_stats_enabled = False
+_metrics_enabled = False
+_timing_enabled = False # 以上任一打开时计时
+
+
+def set_lock_stats_enabled(enabled: bool) -> None:
+    global _lock_stats_enabled, _timing_enabled
+    _lock_stats_enabled = enabled
+    _timing_enabled = _lock_stats_enabled or _metrics_enabled
+
+
+def is_lock_stats_enabled() -> bool:
+    return _lock_stats_enabled
+
+
+def set_metrics_enabled(enabled: bool) -> None:
+    global _metrics_enabled, _timing_enabled
+    _metrics_enabled = enabled
+    _timing_enabled = _lock_stats_enabled or _metrics_enabled
+
+
+def is_timing_enabled() -> bool:
+    return _timing_enabled
+
+
+# 直方图桶上界（秒）：1us ~ 10s，每个数量级 1、2.5、5 三档，另有 +Inf
+BUCKETS = tuple(m * 10.0 ** e for e in range(-6, 1) for m in (1, 2.5, 5)) + (10.0,)
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "_lock")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1) # 最后一个为 +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock() # 多个房间的线程共用同一个直方图
+
+    def observe(self, seconds: float) -> None:
+        i = bisect_left(BUCKETS, seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += seconds
+
+    def snapshot(self) -> tuple[list[int], float]:
+        with self._lock:
+            return list(self.counts), self.sum
+
+
+# 指标名 -> 说明；直方图按 (指标名, 标签) 注册
+METRICS = {
+    "state_seconds"       : "Time spent in each game state function",
+    "lock_wait_seconds"   : "Time spent waiting to acquire a lock",
+    "lock_hold_seconds"   : "Time a lock was held",
+    "barrier_wait_seconds": "Time spent waiting at a barrier for the other parties",
+}
+_histograms: dict[tuple[str, tuple], Histogram] = {}
+_histograms_lock = threading.Lock()
+
+
+def histogram(metric: str, **labels: str) -> Histogram:
+    assert metric in METRICS, metric
+    key = (metric, tuple(sorted(labels.items())))
+    h = _histograms.get(key)
+    if h is None:
+        with _histograms_lock:
+            h = _histograms.setdefault(key, Histogram())
+    return h
+
+
+def reset_histograms() -> None:
+    with _histograms_lock:
+        for h in _histograms.values():
+            with h._lock:
+                h.counts = [0] * (len(BUCKETS) + 1)
+                h.sum = 0.0
+
+
+def render_metrics(prefix: str = "liujiatong_") -> str:
+    """所有直方图的 Prometheus 文本格式（桶为累计计数）。"""
+    with _histograms_lock:
+        items = sorted(_histograms.items())
+    lines = []
+    for metric, help_text in METRICS.items():
+        name = prefix + metric
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for (m, labels), h in items:
+            if m != metric:
+                continue
+            counts, total = h.snapshot()
+            label_str = ",".join(f'{k}="{v}"' for k, v in labels)
+            cumulative = 0
+            for bound, count in zip(BUCKETS + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{name}_bucket{{{label_str},le="{le}"}} {cumulative}')
+            lines.append(f"{name}_sum{{{label_str}}} {total}")
+            lines.append(f"{name}_count{{{label_str}}} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+class LockStats:
+    __slots__ = ("count", "wait_total", "wait_max", "hold_total", "hold_max")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.count = 0
+        self.wait_total = 0.0 # 秒
+        self.wait_max = 0.0
+        self.hold_total = 0.0
+        self.hold_max = 0.0
+
+    def record(self, wait: float, hold: float) -> None:
+        self.count += 1
+        self.wait_total += wait
+        self.hold_total += hold
+        if wait > self.wait_max:
+            self.wait_max = wait
+        if hold > self.hold_max:
+            self.hold_max = hold
+
+    def __str__(self):
+        if self.count == 0:
+            return "count=0"
+        return (f"count={self.count} "
+                f"hold avg={self.hold_total / self.count * 1e6:.1f}us max={self.hold_max * 1e6:.1f}us "
+                f"wait avg={self.wait_total / self.count * 1e6:.1f}us max={self.wait_max * 1e6:.1f}us")
+
+
+class InstrumentedLock:
+    __slots__ = ("name", "stats", "_lock", "_acquired_at", "_wait", "_wait_hist", "_hold_hist")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.stats = LockStats() # 只在持锁时更新，无需额外同步
+        self._lock = threading.Lock()
+        self._acquired_at = 0.0
+        self._wait = 0.0
+        self._wait_hist = histogram("lock_wait_seconds", lock=name)
+        self._hold_hist = histogram("lock_hold_seconds", lock=name)
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        if not _timing_enabled:
+            self._acquired_at = 0.0
+            return self._lock.acquire(blocking, timeout)
+        start = time.perf_counter()
+        acquired = self._lock.acquire(blocking, timeout)
+        if acquired:
+            self._acquired_at = time.perf_counter()
+            self._wait = self._acquired_at - start
+        return acquired
+
+    def release(self) -> None:
+        if self._acquired_at:
+            hold = time.perf_counter() - self._acquired_at
+            if _lock_stats_enabled:
+                self.stats.record(self._wait, hold)
+            self._wait_hist.observe(self._wait)
+            self._hold_hist.observe(hold)
+            self._acquired_at = 0.0
+        self._lock.release()
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    __enter__ = acquire
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+    def __repr__(self):
+        return f"InstrumentedLock({self.name}: {self.stats})"
+
+
+class InstrumentedBarrier(threading.Barrier):
+    """记录每次 wait 等待其余各方到达的时间。"""
+    def __init__(self, parties: int, name: str):
+        super().__init__(parties)
+        self.name = name
+        self._wait_hist = histogram("barrier_wait_seconds", barrier=name)
+
+    def wait(self, timeout: float = None) -> int:
+        if not _timing_enabled:
+            return super().wait(timeout)
+        start = time.perf_counter()
+        try:
+            return super().wait(timeout)
+        finally:
+            self._wait_hist.observe(time.perf_counter() - start)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = render_metrics().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stats_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """在后台线程提供 http://host:port/metrics，只监听本机。"""
+    set_metrics_enabled(True)
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="stats-server", daemon=True).start()
+    return server
@@ -0,0 +1,175 @@
+"""
+牌局日志：每局一个只追加的文件，服务端进程退出后据此恢复进行中的牌局，玩家用原来的 cookie 重连。
+
+每行一条 JSON 记录，牌以固定编号（Card.id）保存，过牌为 "F"：
+- start：发牌种子、座位顺序、各座位的用户名与 cookie；
+- play：一手被接受的出牌（协议版本 4，以及 --auto-pass 的自动过牌），手牌与分数由规则算出；
+- reply：旧版协议的出牌，连同客户端上报的剩余手牌与场上分数；
+- end：游戏结束。
+
+记录在持有 game_lock 时放入队列，由 JournalWriter 的后台线程成批写入并 fsync，牌局线程不做序列化与文件 I/O。
+恢复时（server/manager.py 的 restore_game）用种子重新发牌并依次重放出牌，耗时与出牌数成正比，
+与牌局进行了多久无关；没有 end 记录的日志即为要恢复的牌局，无法重放的日志改名为 .bad 并跳过。
+进程在写一行的中途退出时最后不完整的一行被丢弃，相当于这手牌尚未被接受，玩家重连后重新出牌。
+"""
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+from typing import Iterator
+
+from common.console import error
+from core.card import Card, card_from_id
+from server.game_vars import Game_Var
+
+JOURNAL_SUFFIX = ".journal"
+BAD_JOURNAL_SUFFIX = ".bad"
+
+
+def _card_ids(cards: list) -> list[int] | str:
+    return "F" if cards == ['F'] else [c.id for c in cards]
+
+
+def journal_cards(ids: list[int] | str) -> list:
+    """记录中的牌（编号列表或 "F"）转换回 Card 列表。"""
+    return ['F'] if ids == "F" else [card_from_id(i) for i in ids]
+
+
+class GameJournal:
+    """一局的日志。各方法只把记录放入写入队列，不阻塞调用方。"""
+    def __init__(self, writer: "JournalWriter", path: str):
+        self.writer = writer
+        self.path = path
+
+    def append(self, record: dict) -> None:
+        self.writer.queue.put((self.path, record))
+
+    def record_play(self, seat: int, played: list) -> None:
+        self.append({"type": "play", "seat": seat, "cards": _card_ids(played)})
+
+    def record_reply(self, seat: int, user_cards: list[Card], played: list, now_score: int) -> None:
+        self.append({"type": "reply", "seat": seat, "hand": _card_ids(user_cards),
+                     "cards": _card_ids(played), "score": now_score})
+
+    def close(self, game_over: int) -> None:
+        self.append({"type": "end", "game_over": game_over})
+        self.writer.queue.put((self.path, None)) # 写完后关闭文件
+
+
+def journal_header(g: Game_Var) -> dict:
+    """start 记录中的座位信息，开局时（六人都已入座）读取。"""
+    assert g.users_info_lock.locked()
+    return {
+        "player_id": list(g.users_player_id),
+        "users"    : [name for name, _ in g.users_info],
+        "cookies"  : dict(g.users_cookie),
+    }
+
+
+class JournalWriter:
+    """
+    日志目录与写入线程，一个服务端进程一个，所有房间共用。
+    写入线程每次取出队列中已有的全部记录，按文件写入后各 fsync 一次：牌局越忙，每批越大。
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.queue = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self.__run, name="journal-writer", daemon=True)
+        self.thread.start()
+
+    def start(self, seed: int, header: dict) -> GameJournal:
+        """新的一局：创建日志并写入 start 记录。"""
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(4)}{JOURNAL_SUFFIX}"
+        journal = GameJournal(self, os.path.join(self.directory, name))
+        journal.append({"type": "start", "time": time.time(), "seed": seed, **header})
+        return journal
+
+    def resume(self, path: str) -> GameJournal:
+        """继续写恢复出来的牌局的日志，先截掉进程退出时写了一半的最后一行。"""
+        with open(path, "rb+") as f:
+            data = f.read()
+            f.truncate(data.rfind(b"\n") + 1)
+        return GameJournal(self, path)
+
+    def discard(self, path: str) -> None:
+        """无法恢复的日志改名为 .bad 留待排查，之后启动时不再尝试恢复。"""
+        try:
+            os.replace(path, path + BAD_JOURNAL_SUFFIX)
+        except OSError as e:
+            error(f"journal {path} rename error: {e}")
+
+    def flush(self) -> None:
+        """等待此前放入队列的记录全部写入磁盘。"""
+        done = threading.Event()
+        self.queue.put((None, done))
+        done.wait()
+
+    def __run(self) -> None:
+        files = {}
+        while True:
+            batch = [self.queue.get()]
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            written, closing, done = set(), [], []
+            for path, record in batch:
+                if path is None:
+                    done.append(record)
+                    continue
+                if record is None:
+                    closing.append(path)
+                    continue
+                try:
+                    f = files.get(path)
+                    if f is None:
+                        f = files[path] = open(path, "a", encoding="utf-8")
+                    f.write(json.dumps(record, separators=(",", ":")) + "\n")
+                    written.add(path)
+                except OSError as e:
+                    error(f"journal {path} write error: {e}")
+            for path in written:
+                try:
+                    files[path].flush()
+                    os.fsync(files[path].fileno())
+                except OSError as e:
+                    error(f"journal {path} write error: {e}")
+            for path in closing:
+                f = files.pop(path, None)
+                if f is not None:
+                    f.close()
+            for event in done:
+                event.set()
+
+
+def read_journal(path: str) -> list[dict]:
+    """读出日志中完整的记录，忽略写了一半的最后一行。"""
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            records.append(json.loads(line))
+    return records
+
+
+def unfinished_journals(directory: str) -> Iterator[tuple[str, list[dict]]]:
+    """目录中没有 end 记录的日志及其记录，按开局先后排列。"""
+    if not os.path.isdir(directory):
+        return
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(JOURNAL_SUFFIX):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            records = read_journal(path)
+        except (OSError, ValueError) as e:
+            error(f"journal {path} read error: {e}")
+            continue
+        if records and records[0]["type"] == "start" and records[-1]["type"] != "end":
+            yield path, records
+
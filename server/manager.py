@@ -1,22 +1,23 @@
 import random
-import copy
-import threading
 import core.logger as logger
 
 from core import card
-from server.game_vars import gvar
+from core.card import Card
+from core.hand import Hand
+from core.legal_moves import can_beat
+from core.packed_hand import PackedHand
+from core.playingrules import classify_play, validate_user_input
+from server.game_vars import Game_Var
+from server.journal import JournalWriter, journal_cards, journal_header
 from server.state_machine import GameState, GameStateMachine
+from server.instrument import is_lock_stats_enabled
 
 
-# 初始化牌
-def init_cards():
-    assert gvar.game_lock.locked()
-    all_cards = card.generate_cards()
-    random.shuffle(all_cards)
-
-    for i in range(0, 6):
-        user_cards = sorted([all_cards[j] for j in range(i, len(all_cards), 6)]) # 模拟发牌
-        gvar.users_cards[i] = copy.deepcopy(user_cards) # 11/03/2024: 支持花色，现在以list[Card]类型保存
+# 初始化牌：同一个 seed 发出的牌相同，牌局日志据此重新发牌（见 server/journal.py）
+def init_cards(g: Game_Var, seed: int = None):
+    assert g.game_lock.locked()
+    for i, user_cards in enumerate(card.deal_cards(seed)): # 模拟发牌
+        g.users_cards[i] = Hand(sorted(user_cards)) # 11/03/2024: 支持花色，现在以 Hand 保存（Card 为不可变享元，无需拷贝）
 
 '''
 判断游戏是否结束
@@ -25,156 +26,239 @@ def init_cards():
 1, -1 分别表示偶数队获胜,双统
 2, -2 分别表示奇数队获胜,双统
 '''
-def if_game_over() -> bool:
-    assert gvar.game_lock.locked()
+def if_game_over(g: Game_Var) -> int:
+    assert g.game_lock.locked()
     # 没有头科肯定没有结束
-    if gvar.head_master == -1:
+    if g.head_master == -1:
         return 0
     # 根据各队分数以及逃出人数判断
     for i in range(2):
-        if gvar.team_score[i] >= 200 and gvar.team_out[i] == 3 and gvar.team_out[1 - i] == 0:
+        if g.team_score[i] >= 200 and g.team_out[i] == 3 and g.team_out[1 - i] == 0:
             return -(i + 1)
-        elif (gvar.team_score[i] >= 200 and gvar.team_out[1 - i] != 0) or gvar.team_out[i] == 3:
+        elif (g.team_score[i] >= 200 and g.team_out[1 - i] != 0) or g.team_out[i] == 3:
             return i + 1
     return 0
 
-def if_run_out(player: int) -> bool:
-    assert gvar.game_lock.locked()
-    return len(gvar.users_cards[player]) == 0
+def if_run_out(player: int, g: Game_Var) -> bool:
+    assert g.game_lock.locked()
+    return len(g.users_cards[player]) == 0
 
 # 下一位玩家出牌
-def set_next_player():
-    assert gvar.game_lock.locked()
-    gvar.now_player = (gvar.now_player + 1) % 6
-    while gvar.users_finished[gvar.now_player]:
-        gvar.now_player = (gvar.now_player + 1) % 6
-
-def get_next_turn():
-    assert gvar.game_lock.locked()
+def set_next_player(g: Game_Var):
+    assert g.game_lock.locked()
+    g.now_player = (g.now_player + 1) % 6
+    while g.users_finished[g.now_player]:
+        g.now_player = (g.now_player + 1) % 6
+
+def get_next_turn(g: Game_Var):
+    assert g.game_lock.locked()
     # skip
-    if gvar.users_played_cards[gvar.now_player][0] == 'F':
-        gvar.users_played_cards[gvar.now_player].clear()
+    if g.users_played_cards[g.now_player][0] == 'F':
+        g.users_played_cards[g.now_player].clear()
     else:
-        gvar.last_player = gvar.now_player
+        g.last_player = g.now_player
+        g.last_play = classify_play(g.users_played_cards[g.now_player])
     
-    assert gvar.last_player != -1
+    assert g.last_player != -1
     # 此轮逃出，更新队伍信息、头科
-    if if_run_out(gvar.now_player):
-        gvar.team_out[gvar.now_player % 2] += 1
-        if gvar.head_master == -1:
-            gvar.head_master = gvar.now_player
+    if if_run_out(g.now_player, g):
+        g.team_out[g.now_player % 2] += 1
+        if g.head_master == -1:
+            g.head_master = g.now_player
 
     # 更新一下打牌的user
-    set_next_player()
+    set_next_player(g)
     # 玩家是否打完所有的牌
     # 不在打完之后马上结算是因为玩家的分没拿
     # 考虑到有多个人同时打完牌的情况，得用循环
-    while if_run_out(gvar.now_player) and gvar.last_player != gvar.now_player:
-        gvar.users_finished[gvar.now_player] = True
-        gvar.users_played_cards[gvar.now_player].clear()
-        set_next_player()
+    while if_run_out(g.now_player, g) and g.last_player != g.now_player:
+        g.users_finished[g.now_player] = True
+        g.users_played_cards[g.now_player].clear()
+        set_next_player(g)
 
     # 一轮结束，统计此轮信息
-    if gvar.last_player == gvar.now_player:
+    if g.last_player == g.now_player:
         # 统计用户分数
-        gvar.users_score[gvar.now_player] += gvar.now_score
+        g.users_score[g.now_player] += g.now_score
         # 初始化场上分数
-        gvar.now_score = 0
+        g.now_score = 0
+        g.last_play = None
         # 如果刚好在此轮逃出，第一个出牌的人就要改变
-        if if_run_out(gvar.now_player):
-            gvar.users_finished[gvar.now_player] = True
-            gvar.users_played_cards[gvar.now_player].clear()
-            set_next_player()
-            gvar.last_player = -1
+        if if_run_out(g.now_player, g):
+            g.users_finished[g.now_player] = True
+            g.users_played_cards[g.now_player].clear()
+            set_next_player(g)
+            g.last_player = -1
     # 清除当前玩家的场上牌
-    gvar.users_played_cards[gvar.now_player].clear()
+    g.users_played_cards[g.now_player].clear()
+
+def _is_card_list(cards) -> bool:
+    return isinstance(cards, list) and all(isinstance(c, Card) for c in cards)
+
+# 用玩家回复更新牌局：剩余手牌、本轮出牌与场上分数
+# 回复格式不对时抛出 ValueError，先校验再修改，牌局不变（也不会留下未写入日志的半个回复）
+def apply_player_reply(player: int, user_cards: list, user_played_cards: list, now_score: int, g: Game_Var):
+    assert g.game_lock.locked()
+    assert g.users_played_cards[player] == [], g.users_played_cards[player]
+    if not _is_card_list(user_cards):
+        raise ValueError(f"invalid cards: {user_cards}")
+    if user_played_cards != ['F'] and (not user_played_cards or not _is_card_list(user_played_cards)):
+        raise ValueError(f"invalid played cards: {user_played_cards}")
+    if not isinstance(now_score, int):
+        raise ValueError(f"invalid score: {now_score}")
+    g.users_cards[player]        = Hand(user_cards)  # 更新玩家手牌
+    g.users_played_cards[player] = user_played_cards # 更新玩家已出牌
+    g.now_score                  = now_score         # 更新当前得分
+    if g.journal is not None:
+        g.journal.record_reply(player, user_cards, user_played_cards, now_score)
+
+# 服务端权威（协议版本 4）：只根据玩家所出的牌更新手牌与场上分数
+# 出牌不合法（不在手牌中、首家过牌、牌型非法或压不过上家）时抛出 ValueError，牌局不变
+def apply_player_play(player: int, user_played_cards: list, g: Game_Var):
+    assert g.game_lock.locked()
+    assert g.users_played_cards[player] == [], g.users_played_cards[player]
+    if user_played_cards == ['F']:
+        if g.last_play is None:
+            raise ValueError("cannot skip when leading")
+        g.users_played_cards[player] = ['F']
+        if g.journal is not None:
+            g.journal.record_play(player, ['F'])
+        return
+    if not user_played_cards or not _is_card_list(user_played_cards):
+        raise ValueError(f"invalid played cards: {user_played_cards}")
+    try:
+        packed = PackedHand.from_cards(user_played_cards)
+    except (KeyError, ValueError):
+        raise ValueError(f"invalid played cards: {user_played_cards}")
+    legal, score = validate_user_input(packed, g.users_cards[player], g.last_play)
+    if not legal:
+        raise ValueError(f"illegal play: {user_played_cards}")
+    g.users_cards[player].remove_cards(user_played_cards) # 花色不符时抛出 ValueError，手牌不变
+    g.users_played_cards[player] = user_played_cards
+    g.now_score += score
+    if g.journal is not None:
+        g.journal.record_play(player, user_played_cards)
+
+# 桌规 --auto-pass：当前玩家确定压不过上家时由服务端直接过牌，不再等待客户端，返回跳过的人数
+def auto_pass(g: Game_Var) -> int:
+    assert g.game_lock.locked()
+    passed = 0
+    while g.game_over == 0 and g.last_play is not None and not can_beat(g.users_cards[g.now_player], g.last_play):
+        apply_player_play(g.now_player, ['F'], g)
+        get_next_turn(g)
+        check_game_over(g)
+        passed += 1
+    return passed
 
-def check_game_over():
-    assert gvar.game_lock.locked()
+def check_game_over(g: Game_Var):
+    assert g.game_lock.locked()
     # 重新统计队伍得分
-    gvar.team_score = [0, 0]
+    g.team_score = [0, 0]
     for i in range(6):
         # 有头科的队伍统计所有成员分数
-        if gvar.head_master != -1 and gvar.head_master % 2 == i % 2:
-            gvar.team_score[i % 2] += gvar.users_score[i]
+        if g.head_master != -1 and g.head_master % 2 == i % 2:
+            g.team_score[i % 2] += g.users_score[i]
         # 如果用户逃出，记录成员分数
-        elif if_run_out(i):
-            gvar.team_score[i % 2] += gvar.users_score[i]
+        elif if_run_out(i, g):
+            g.team_score[i % 2] += g.users_score[i]
     # 检查游戏是否结束
-    gvar.game_over = if_game_over()
+    g.game_over = if_game_over(g)
 
-def take_turn_log():
-    assert gvar.game_lock.locked()
-    logger.info(f"Manager: now_player {gvar.now_player}, team_score {gvar.team_score}, team_out {gvar.team_out}, game_over {gvar.game_over}")
+def restore_game(g: Game_Var, records: list[dict]):
+    """
+    在新的 Game_Var 上重放牌局日志（server/journal.py）：恢复座位与 cookie，并用种子重新发牌、依次应用每一手出牌。
+    所有玩家都按掉线处理，用原来的 cookie 重连后从发送当前轮次信息开始继续。
+    """
+    start = records[0]
+    with g.users_info_lock:
+        g.users_player_id = list(start["player_id"])
+        g.users_info = [(name, 0) for name in start["users"]]
+        g.users_cookie = dict(start["cookies"])
+        g.users_num = 6
+        g.users_error = [True for _ in range(6)]
+        g.users_his_state = [GameState.send_round_info for _ in range(6)]
+        g.notify_users_info_changed()
+    with g.game_lock:
+        assert g.journal is None # 重放时不再记录
+        g.init_game_env()
+        init_cards(g, start["seed"])
+        for record in records[1:]:
+            if record["type"] == "play":
+                apply_player_play(record["seat"], journal_cards(record["cards"]), g)
+            elif record["type"] == "reply":
+                apply_player_reply(record["seat"], journal_cards(record["hand"]),
+                                   journal_cards(record["cards"]), record["score"], g)
+            else:
+                continue
+            get_next_turn(g)
+            check_game_over(g)
+
+def take_turn_log(g: Game_Var):
+    assert g.game_lock.locked()
+    logger.info(f"Manager: now_player {g.now_player}, team_score {g.team_score}, team_out {g.team_out}, game_over {g.game_over}")
 
 class Manager(GameStateMachine):
     # 私有方法
     def __update_local_cache(self):
-        with gvar.game_lock:
-            self.__game_over = gvar.game_over
+        with self.g.game_lock:
+            self.__game_over = self.g.game_over
     # 抽象类方法
     def game_start(self): 
-        with gvar.users_info_lock:
-            logger.info(f"Manager: New game --- Round {gvar.serving_game_round}")
-        with gvar.game_lock:
-            gvar.init_game_env()
-            init_cards()  # 初始化牌并发牌
+        with self.g.users_info_lock:
+            self.__serving_game_round = self.g.serving_game_round
+            logger.info(f"Manager: New game --- Round {self.g.serving_game_round}")
+            header = journal_header(self.g) if self.journals is not None else None
+        seed = random.getrandbits(64)
+        with self.g.game_lock:
+            self.g.init_game_env()
+            init_cards(self.g, seed)  # 初始化牌并发牌
+            if self.journals is not None:
+                self.g.journal = self.journals.start(seed, header)
 
     def game_over(self): 
-        with gvar.users_info_lock:
-            gvar.init_global_env(self.static_user_order)
-    def onlooker_register(self): 
-        raise RuntimeError("Unsupport state")
+        if is_lock_stats_enabled():
+            logger.info(f"Manager: {self.g.game_lock!r}, {self.g.users_info_lock!r}")
+        with self.g.game_lock:
+            if self.g.journal is not None:
+                self.g.journal.close(self.g.game_over)
+                self.g.journal = None
+        with self.g.users_info_lock:
+            self.g.init_global_env(self.static_user_order)
     def next_turn(self): 
-        with gvar.game_lock:
-            get_next_turn()
-            check_game_over()
-            take_turn_log()
+        with self.g.game_lock:
+            get_next_turn(self.g)
+            check_game_over(self.g)
+            if self.auto_pass:
+                auto_pass(self.g)
+            take_turn_log(self.g)
     def send_waiting_hall_info(self):
         raise RuntimeError("Unsupport state")
     def send_field_info(self): 
         raise RuntimeError("Unsupport state")
     def send_round_info(self): 
-        # 会在send_round_info_sync处放掉
-        gvar.onlooker_lock.acquire()
-        # barrier要考虑自己
-        gvar.onlooker_onlooker_sync_barrier = threading.Barrier(gvar.onlooker_number + 1)
-        gvar.onlooker_send_round_info_barrier = threading.Barrier(gvar.onlooker_number + 1)
-        gvar.onlooker_event.set()
-        # 这里先wait等待所有的旁观者线程和manager线程都确认可以发送了
-        gvar.onlooker_onlooker_sync_barrier.wait()
-        # 然后再将其清理掉，否则万一先clear了，还没闯进来的旁观者线程就阻塞了，manager线程也寄了
-        gvar.onlooker_event.clear()
-        # 最后等待所有的旁观者线程发送完信息
-        gvar.onlooker_send_round_info_barrier.wait()
+        # 发布给旁观者后立即返回，旁观者线程各自发送，见 server/broadcast.py 的 SpectatorFeed
+        with self.g.game_lock:
+            snapshot = self.g.snapshot()
+        self.g.spectators.publish(self.__serving_game_round, snapshot)
     def recv_player_info(self): 
         raise RuntimeError("Unsupport state")
     def init_sync(self): 
-        gvar.game_init_barrier.wait()
-        gvar.game_init_barrier.reset()
-    def onlooker_sync(self): 
-        raise RuntimeError("Unsupport state")
+        self.g.game_init_barrier.wait()
+        self.g.game_init_barrier.reset()
     def game_start_sync(self): 
-        gvar.game_start_barrier.wait()
-        gvar.game_start_barrier.reset()
+        self.g.game_start_barrier.wait()
+        self.g.game_start_barrier.reset()
         # 这里放松了条件，因为在下一个同步点之前数据是只读的
         self.__update_local_cache()
-        assert gvar.onlooker_lock.locked()
-        # 在游戏还没开始前由manager将其锁住
-        gvar.onlooker_lock.release()
     def send_round_info_sync(self): 
-        gvar.send_round_info_barrier.wait()
-        gvar.send_round_info_barrier.reset()
-        # 如果游戏还没结束，放掉send_round_info设置的锁
-        # 否则一直保持锁直到下一局游戏开始(game_start_sync)
-        if self.__game_over == 0:
-            gvar.onlooker_lock.release()
+        self.g.send_round_info_barrier.wait()
+        self.g.send_round_info_barrier.reset()
     def recv_player_info_sync(self): 
-        gvar.recv_player_info_barrier.wait()
-        gvar.recv_player_info_barrier.reset()
+        self.g.recv_player_info_barrier.wait()
+        self.g.recv_player_info_barrier.reset()
     def next_turn_sync(self): 
-        gvar.next_turn_barrier.wait()
-        gvar.next_turn_barrier.reset()
+        self.g.next_turn_barrier.wait()
+        self.g.next_turn_barrier.reset()
         # 这里放松了条件，因为在下一个同步点之前数据是只读的
         self.__update_local_cache()
     
@@ -208,11 +292,23 @@ class Manager(GameStateMachine):
         logger.info(f"Manager: {self.state}")
         return True
 
-    def __init__(self, static_user_order):
+    def resume(self):
+        """
+        牌局已由 server/journal.py 的 restore_game 从日志恢复：下一个状态即广播当前轮次信息，
+        玩家用 cookie 重连后同样从发送轮次信息开始，在 send_round_info_sync 与 Manager 会合。
+        """
+        with self.g.users_info_lock:
+            self.__serving_game_round = self.g.serving_game_round
+        self.__update_local_cache()
+        self.state = GameState.next_turn_sync
+
+    def __init__(self, g: Game_Var, static_user_order, auto_pass: bool = False, journals: JournalWriter = None):
         super().__init__()
+        self.g = g # 本房间的牌局状态
         self.static_user_order = static_user_order
-        # 在游戏还没开始前由manager将其锁住
-        gvar.onlooker_lock.acquire()
-        with gvar.users_info_lock:
-            gvar.init_global_env(self.static_user_order)
+        self.auto_pass = auto_pass # 桌规：自动为压不过上家的玩家过牌
+        self.journals = journals # 牌局日志，见 server/journal.py
+        self.__serving_game_round = 0
+        with self.g.users_info_lock:
+            self.g.init_global_env(self.static_user_order)
         self.__update_local_cache()
@@ -1,6 +1,5 @@
 import core.logger as logger
 from common.console import error
-from server.game_vars import gvar
 from server.state_machine import GameState, GameStateMachine
 
 class Onlooker(GameStateMachine):
@@ -8,35 +7,19 @@ class Onlooker(GameStateMachine):
     def __handle_error(self, e):
         error(f"Onlooker {self.pid}({self.state}) error: {e}")
         self.error = True
-    def __update_local_cache(self):
-        with gvar.game_lock:
-            self.__game_over = gvar.game_over
     # 抽象类方法
     def game_start(self): 
         raise RuntimeError("Unsupport state")
     def game_over(self): 
         print(f"Onlooker {self.pid} exit")
         self.tcp_handler.close()
-    def onlooker_register(self): 
-        assert self.error is False
-        try:
-            while True:
-                with gvar.users_info_lock:
-                    if self.serving_game_round < gvar.serving_game_round:
-                        raise RuntimeError("Game end")
-                if gvar.onlooker_lock.acquire(timeout=1):
-                    gvar.onlooker_number += 1
-                    gvar.onlooker_lock.release()
-                    break
-        except Exception as e:
-            self.__handle_error(e)
     def next_turn(self): 
         raise RuntimeError("Unsupport state")
     def send_waiting_hall_info(self):
         assert self.error is False
         try:
             while True:
-                with gvar.users_info_lock:
+                with self.g.users_info_lock:
                     users_num = self.tcp_handler.update_users_info()
                 self.tcp_handler.send_waiting_hall_info()
                 if users_num == 6:
@@ -54,29 +37,22 @@ class Onlooker(GameStateMachine):
         if self.error:
             return
         try:
-            with gvar.game_lock:
-                self.tcp_handler.send_round_info()
+            # 等待 Manager 发布新的快照，落后时直接取最新的，不阻塞牌局
+            snapshot = self.g.spectators.wait(self.serving_game_round, self.__sent)
+            if snapshot is None:
+                raise RuntimeError("Game end")
+            self.tcp_handler.send_round_info(snapshot)
+            self.__sent = snapshot
         except Exception as e:
             self.__handle_error(e)
     def recv_player_info(self): 
         raise RuntimeError("Unsupport state")
     def init_sync(self): 
         raise RuntimeError("Unsupport state")
-    def onlooker_sync(self): 
-        gvar.onlooker_event.wait()
-        # 这里放松了条件，因为在下一个同步点之前数据是只读的
-        self.__update_local_cache()
-        # 这里保证所有旁观者线程都进入了可发送状态
-        # 不会因为manager线程对event的阻塞导致出问题
-        gvar.onlooker_onlooker_sync_barrier.wait()
     def game_start_sync(self): 
         raise RuntimeError("Unsupport state")
     def send_round_info_sync(self): 
-        if self.error or self.__game_over != 0:
-            assert gvar.onlooker_lock.locked()
-            with gvar.onlooker_local_lock:
-                gvar.onlooker_number -= 1
-        gvar.onlooker_send_round_info_barrier.wait()
+        raise RuntimeError("Unsupport state")
     def recv_player_info_sync(self): 
         raise RuntimeError("Unsupport state")
     def next_turn_sync(self): 
@@ -87,26 +63,15 @@ class Onlooker(GameStateMachine):
         if self.state == GameState.init:
             self.state = GameState.send_waiting_hall_info
         elif self.state == GameState.send_waiting_hall_info:
-            if self.error:
-                self.state = GameState.game_over
-            else:
-                self.state = GameState.onlooker_register
-        elif self.state == GameState.onlooker_register:
             if self.error:
                 self.state = GameState.game_over
             else:
                 self.state = GameState.send_field_info
         elif self.state == GameState.send_field_info:
-            self.state = GameState.onlooker_sync
-        elif self.state == GameState.onlooker_sync:
             self.state = GameState.send_round_info
         elif self.state == GameState.send_round_info:
-            self.state = GameState.send_round_info_sync
-        elif self.state == GameState.send_round_info_sync:
-            if self.error or self.__game_over != 0:
+            if self.error or self.__sent.game_over != 0:
                 self.state = GameState.game_over
-            else:
-                self.state = GameState.onlooker_sync
         elif self.state == GameState.game_over:
             return False
         else:
@@ -124,7 +89,8 @@ class Onlooker(GameStateMachine):
         self.client_player = client_player
         self.serving_game_round = serving_game_round
         self.tcp_handler = tcp_handler
+        self.g = tcp_handler.room.g # 所在房间的牌局状态
         _, self.pid = tcp_handler.client_address
         
         self.error = False
-        self.__update_local_cache()
+        self.__sent = None # 上一次发送的快照
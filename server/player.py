@@ -1,10 +1,13 @@
-import time
 import core.logger as logger
 from common.console import error, warn, success
-from common.card_io import cards_to_strs
-from server.game_vars import gvar
+from core import trace
+from core.network.my_network import is_peer_closed
+from core.network.protocol import PROTOCOL_PLAY_ONLY
+from server.manager import apply_player_reply, apply_player_play
 from server.state_machine import GameState, GameStateMachine
 
+HALL_PROBE_INTERVAL = 1.0 # 等待大厅无变化时检查连接是否断开的间隔（秒）
+
 class Player(GameStateMachine):
     # 私有方法
     def __handle_error(self, e):
@@ -12,41 +15,43 @@ class Player(GameStateMachine):
         self.error = True
     
     def __update_local_cache(self):
-        with gvar.game_lock:
-            self.__game_over = gvar.game_over
-            self.__now_player = gvar.now_player
+        with self.g.game_lock:
+            self.__game_over = self.g.game_over
+            self.__now_player = self.g.now_player
     # 抽象类方法
     
     def game_start(self): 
         raise RuntimeError("Unsupport state")
     def game_over(self): 
         if self.error:
-            with gvar.users_info_lock:
-                gvar.users_error[self.client_player] = True
+            with self.g.users_info_lock:
+                self.g.users_error[self.client_player] = True
+                self.g.notify_users_info_changed()
             warn(f"Player {self.pid}({self.client_player}) error exit -> cookie: {self.tcp_handler.user_cookie}")
         else:
             success(f"Player {self.pid}({self.client_player}) exit successfully")
         self.tcp_handler.close()
-    def onlooker_register(self): 
-        raise RuntimeError("Unsupport state")
     def next_turn(self): 
         raise RuntimeError("Unsupport state")
     def send_waiting_hall_info(self):
         assert self.error is False
         try:
-            users_num = 0
-            send_counter = 10
-            while True:                
-                with gvar.users_info_lock:
-                    new_users_num = self.tcp_handler.update_users_info()
-                send_counter -= 1
-                if new_users_num > users_num or send_counter == 0:
-                    self.tcp_handler.send_waiting_hall_info()
-                    users_num = new_users_num
-                    send_counter = 10
+            sent_version = None
+            while True:
+                with self.g.users_info_changed:
+                    changed = self.g.users_info_changed.wait_for(
+                        lambda: self.g.users_info_version != sent_version, HALL_PROBE_INTERVAL)
+                    if changed:
+                        sent_version = self.g.users_info_version
+                        users_num = self.tcp_handler.update_users_info()
+                if not changed:
+                    # 大厅没有变化时不重发，只检查连接是否已断开，让掉线的玩家尽快可以用 cookie 重连
+                    if is_peer_closed(self.tcp_handler.request):
+                        raise ConnectionError("Connection closed in waiting hall")
+                    continue
+                self.tcp_handler.send_waiting_hall_info()
                 if users_num == 6:
                     break
-                time.sleep(0.1)
         except Exception as e:
             self.__handle_error(e)
     def send_field_info(self): 
@@ -58,8 +63,9 @@ class Player(GameStateMachine):
     def send_round_info(self): 
         assert self.error is False
         try:
-            with gvar.game_lock:
-                self.tcp_handler.send_round_info()
+            with self.g.game_lock:
+                snapshot = self.g.snapshot()
+            self.tcp_handler.send_round_info(snapshot)
         except Exception as e:
             self.__handle_error(e)
     
@@ -70,58 +76,48 @@ class Player(GameStateMachine):
         该函数负责接收客户端发送的玩家信息，包括玩家手牌、已出牌和当前得分。
         同时，它还会更新游戏状态，包括玩家手牌、已出牌和当前得分。
         """
-        print(f"recv_player_info. ID:{self.client_player}, PID:{self.pid}")
         assert self.error is False
         try:
-            with gvar.users_info_lock:
-                print(f"Now round:{self.client_player} -> {gvar.users_info[self.client_player]}")
-
             # 等待客户端的heartbeat返回值为真，意味着出了有效牌
             while not self.tcp_handler.recv_playing_heartbeat():
                 pass
 
-            # 接收客户端发送的玩家信息
-            user_cards, user_played_cards, now_score = self.tcp_handler.recv_player_reply()
-            print(f"recv_player_info. ID:{self.client_player}, PID:{self.pid}. Received cards:{cards_to_strs(user_cards)}")
-            if user_played_cards == ['F']:
-                print(f'Player {self.pid}({self.client_player}) played cards: {user_played_cards}')
+            # 接收客户端发送的玩家信息并更新游戏状态
+            if self.tcp_handler.protocol >= PROTOCOL_PLAY_ONLY:
+                # 只收到所出的牌，手牌与分数由服务端计算，出牌不合法时按出错处理
+                user_played_cards = self.tcp_handler.recv_player_play()
+                with self.g.game_lock:
+                    apply_player_play(self.client_player, user_played_cards, self.g)
             else:
-                print(f"recv_player_info. ID:{self.client_player}, PID:{self.pid}. Received played cards:{cards_to_strs(user_played_cards)}")
-            print(f"recv_player_info. ID:{self.client_player}, PID:{self.pid}. Received score:{now_score}")
-            
-            # 更新游戏状态
-            with gvar.game_lock:
-                assert gvar.users_played_cards[self.client_player] == [], \
-                    gvar.users_played_cards[self.client_player]
-                gvar.users_cards[self.client_player]        = user_cards        # 更新玩家手牌
-                gvar.users_played_cards[self.client_player] = user_played_cards # 更新玩家已出牌
-                gvar.now_score                              = now_score         # 更新当前得分
-                if gvar.users_played_cards[self.client_player] == ['F']:
-                    print(f'Player {self.pid}({self.client_player}) played cards: {gvar.users_played_cards[self.client_player]}')
-                else:
-                    print(f'Player {self.pid}({self.client_player}) played cards:{cards_to_strs(gvar.users_played_cards[self.client_player])}')
+                user_cards, user_played_cards, now_score = self.tcp_handler.recv_player_reply()
+                # 每手牌都会经过这里，只在开启追踪时才格式化
+                trace.trace("recv_player_info", "Player %s(%d) reply: cards=%s played=%s score=%s",
+                            self.pid, self.client_player, trace.lazy_values(user_cards),
+                            trace.lazy_values(user_played_cards), now_score)
+                with self.g.game_lock:
+                    apply_player_reply(self.client_player, user_cards, user_played_cards, now_score, self.g)
+            trace.trace("recv_player_info", "Player %s(%d) played cards: %s", self.pid, self.client_player,
+                        trace.lazy_values(user_played_cards), level=trace.INFO)
         except Exception as e:
             self.__handle_error(e)
     
     def init_sync(self): 
-        gvar.game_init_barrier.wait()
+        self.g.game_init_barrier.wait()
     
-    def onlooker_sync(self): 
-        raise RuntimeError("Unsupport state")
     
     def game_start_sync(self): 
-        gvar.game_start_barrier.wait()
+        self.g.game_start_barrier.wait()
         # 这里放松了条件，因为在下一个同步点之前数据是只读的
         self.__update_local_cache()
     
     def send_round_info_sync(self): 
-        gvar.send_round_info_barrier.wait()
+        self.g.send_round_info_barrier.wait()
     
     def recv_player_info_sync(self): 
-        gvar.recv_player_info_barrier.wait()
+        self.g.recv_player_info_barrier.wait()
     
     def next_turn_sync(self): 
-        gvar.next_turn_barrier.wait()
+        self.g.next_turn_barrier.wait()
         # 这里放松了条件，因为在下一个同步点之前数据是只读的
         self.__update_local_cache()
     
@@ -202,8 +198,8 @@ class Player(GameStateMachine):
         else:
             raise RuntimeError("Unsupport state")
         if recovery is False and self.error is False:
-            with gvar.users_info_lock:
-                gvar.users_his_state[self.client_player] = self.state
+            with self.g.users_info_lock:
+                self.g.users_his_state[self.client_player] = self.state
         logger.info(f"Player {self.client_player}({self.state}, error={self.error})")
         return True
 
@@ -224,6 +220,7 @@ class Player(GameStateMachine):
             GameState.recv_player_info,
         ], self.his_state
         self.tcp_handler = tcp_handler
+        self.g = tcp_handler.room.g # 所在房间的牌局状态
         _, self.pid = tcp_handler.client_address
         
         self.error = False
@@ -0,0 +1,96 @@
+"""
+多房间：每个房间有自己的 Game_Var 与 Manager 线程，同一进程同时进行多局游戏。
+
+新连接由 RoomRegistry 分配房间：优先凑满正在等待的房间，没有时开新房间，
+房间数达到上限后随机旁观一个已满的房间。cookie 在所有房间中唯一，断线重连时据此找回房间与座位。
+开启牌局日志时，启动时先从日志恢复上次进程退出时未结束的牌局，每局一个房间，等待玩家用原来的 cookie 重连。
+"""
+import random
+import secrets
+import string
+import threading
+
+import core.logger as logger
+from common.console import error
+from server.game_vars import Game_Var
+from server.journal import JournalWriter, unfinished_journals
+from server.manager import Manager, restore_game
+
+
+class Room:
+    def __init__(self, rid: int, static_user_order: bool = False, auto_pass: bool = False,
+                 journals: JournalWriter = None):
+        self.rid = rid
+        self.g = Game_Var()
+        self.manager = Manager(self.g, static_user_order, auto_pass, journals)
+        self.thread = threading.Thread(target=self.manager.run, name=f"room-{rid}", daemon=True)
+
+    def has_free_seat(self) -> bool:
+        # 不加房间锁（加锁顺序是 房间锁 -> 注册表锁），只作为分配时的参考，入座时会在房间锁内再次判断
+        return self.g.users_num < 6
+
+
+class RoomRegistry:
+    def __init__(self, static_user_order: bool = False, max_rooms: int = 1, auto_pass: bool = False,
+                 journal_dir: str = None):
+        self.static_user_order = static_user_order
+        self.auto_pass = auto_pass
+        self.max_rooms = max_rooms
+        self.lock = threading.Lock()
+        self.rooms: list[Room] = []
+        self.journals = JournalWriter(journal_dir) if journal_dir is not None else None
+        if self.journals is not None:
+            self.restore_rooms()
+
+    def restore_rooms(self) -> None:
+        """恢复日志中未结束的牌局。恢复的房间不受 max_rooms 限制，但会占用名额。"""
+        for path, records in unfinished_journals(self.journals.directory):
+            room = Room(len(self.rooms), self.static_user_order, self.auto_pass, self.journals)
+            try:
+                restore_game(room.g, records)
+                journal = self.journals.resume(path)
+            except Exception as e: # 非法出牌、缺少字段、其他版本的日志等：跳过这一局，不影响启动
+                error(f"journal {path} restore error: {e}")
+                self.journals.discard(path)
+                continue
+            if room.g.game_over != 0: # 最后一手已经记录，只差 end 记录
+                journal.close(room.g.game_over)
+                continue
+            room.g.journal = journal
+            room.manager.resume()
+            self.rooms.append(room)
+            room.thread.start()
+            logger.info(f"Room {room.rid} restored from {path}: {len(records) - 1} moves")
+
+    def find_room(self) -> Room:
+        """
+        新用户加入的房间。两个连接同时抢同一房间最后一个座位时，后者在房间内按已满处理成为旁观者。
+        """
+        with self.lock:
+            for room in self.rooms:
+                if room.has_free_seat():
+                    return room
+            if len(self.rooms) < self.max_rooms:
+                room = Room(len(self.rooms), self.static_user_order, self.auto_pass, self.journals)
+                self.rooms.append(room)
+                room.thread.start()
+                logger.info(f"Room {room.rid} opened")
+                return room
+            return random.choice(self.rooms)
+
+    def room_of_cookie(self, cookie: str) -> Room:
+        """cookie 所在的房间；每局结束时房间会清空 users_cookie，旧局的 cookie 自然失效。"""
+        with self.lock:
+            for room in self.rooms:
+                if cookie in room.g.users_cookie:
+                    return room
+        return None
+
+    def new_cookie(self, length=8) -> str:
+        """生成在所有房间中都未使用的 cookie。"""
+        characters = string.ascii_letters + string.digits
+        while True:
+            # 使用 secrets 模块生成安全的随机字符串
+            cookie = ''.join(secrets.choice(characters) for _ in range(length))
+            if self.room_of_cookie(cookie) is None:
+                return cookie
@@ -1,6 +1,9 @@
+import time
 from abc import ABC, abstractmethod
 from enum import Enum, auto
 
+from server.instrument import histogram, is_timing_enabled
+
 '''
 设计原则：
 1. 每个状态要么有同步操作(就考虑event,barrier.lock感觉可以不算),要么有网络(socket)
@@ -15,7 +18,6 @@ class GameState(Enum):
     init = auto(),
     game_start = auto(),
     game_over = auto(),
-    onlooker_register = auto(),
     next_turn = auto(),
     # socket
     send_waiting_hall_info = auto(),
@@ -24,7 +26,6 @@ class GameState(Enum):
     recv_player_info = auto(),
     # synchronize
     init_sync = auto(),
-    onlooker_sync = auto(),
     game_start_sync = auto(),
     send_round_info_sync = auto(),
     recv_player_info_sync = auto(),
@@ -39,9 +40,6 @@ class GameStateMachine(ABC):
     def game_over(self): 
         pass
     @abstractmethod
-    def onlooker_register(self): 
-        pass
-    @abstractmethod
     def next_turn(self): 
         pass
     @abstractmethod
@@ -60,9 +58,6 @@ class GameStateMachine(ABC):
     def init_sync(self): 
         pass
     @abstractmethod
-    def onlooker_sync(self): 
-        pass
-    @abstractmethod
     def game_start_sync(self): 
         pass
     @abstractmethod
@@ -80,14 +75,12 @@ class GameStateMachine(ABC):
         self.__state_function_set = {
             GameState.game_start            : self.game_start,
             GameState.game_over             : self.game_over,
-            GameState.onlooker_register     : self.onlooker_register,
             GameState.next_turn             : self.next_turn,
             GameState.send_waiting_hall_info: self.send_waiting_hall_info,
             GameState.send_field_info       : self.send_field_info,
             GameState.send_round_info       : self.send_round_info,
             GameState.recv_player_info      : self.recv_player_info,
             GameState.init_sync             : self.init_sync,
-            GameState.onlooker_sync         : self.onlooker_sync,
             GameState.game_start_sync       : self.game_start_sync,
             GameState.send_round_info_sync  : self.send_round_info_sync,
             GameState.recv_player_info_sync : self.recv_player_info_sync,
@@ -99,5 +92,15 @@ class GameStateMachine(ABC):
         pass
 
     def run(self):
+        hists = {} # 状态 -> 该状态函数耗时的直方图，见 server/instrument.py
         while self.get_next_state():
-            self.__state_function_set[self.state]()
\ No newline at end of file
+            if not is_timing_enabled():
+                self.__state_function_set[self.state]()
+                continue
+            state = self.state
+            start = time.perf_counter()
+            self.__state_function_set[state]()
+            h = hists.get(state)
+            if h is None:
+                h = hists[state] = histogram("state_seconds", machine=type(self).__name__, state=state.name)
+            h.observe(time.perf_counter() - start)